@@ -452,7 +452,8 @@ if __name__ == '__main__':
         input_buffer = [input()]
         while input_buffer[-1] != "--END OF TURN--":
             input_buffer.append(input())
-        game_state_this_turn = json.loads(''.join(input_buffer[:-1]))
+        # the floor tiles are only sent in the initial game state
+        game_state_this_turn = {'FloorTiles': game_state_init['FloorTiles'], **json.loads(''.join(input_buffer[:-1]))}
 
         # get agent action, then send it to the game server
         print(agent.do_turn(game_state_this_turn).to_json())
\ No newline at end of file
@@ -1,5 +1,10 @@
+import os
 import sys
 import json
+import time
+import socket
+import argparse
+import traceback
 import string
 import json
 
@@ -339,31 +344,188 @@ class Agent:
 
 
 # -- DRIVER CODE  --
-if __name__ == '__main__':
-
-    # figure out if we're red or blue
-    team_color = 'r' if input() == "--YOU ARE RED--" else 'b'
 
-    # get initial game state
-    input_buffer = [input()]
-    while input_buffer[-1] != "--END INITIAL GAME STATE--":
-        input_buffer.append(input())
-    game_state_init = json.loads(''.join(input_buffer[:-1]))
+# The backend sends the game state as lines of JSON. It can also send each turn as one message that starts with
+# its length, which is read with one read of stdin instead of line by line: either the same JSON ("framed_json"),
+# or a compact binary encoding ("binary") that is quicker to send and to read. Framed messages can also be put in
+# shared memory (see backend/WireFormat.py).
+# List the formats to ask for here, most wanted first, e.g. ['binary', 'framed_json']. framed_json is read right
+# here, the binary format and shared memory need backend/AgentDriver.py, so they're only asked for when the backend
+# folder is next to the folder this file is in.
+WIRE_FORMATS = []
+# With a framed format, also read the state straight from shared memory if the backend offers it
+USE_SHARED_MEMORY = True
+
+
+# backend/AgentDriver.py, or None if there's no backend folder next to this file's
+def import_agent_driver():
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+    try:
+        import AgentDriver
+    except ImportError:
+        return None
+    return AgentDriver
+
+
+# Next line from a binary stream, without its newline. Raises EOFError once the stream is closed.
+def read_line(reader) -> str:
+    line = reader.readline()
+    if not line:
+        raise EOFError
+    return str(line, 'utf-8').rstrip('\n')
+
+
+# Exactly `size` bytes from a binary stream. Raises EOFError if it's closed first.
+def read_exactly(reader, size: int) -> bytes:
+    data = reader.read(size)
+    if len(data) != size:
+        raise EOFError
+    return data
+
+
+# JSON sent as lines, up to the line `end`, or None if the first line is `new_game` instead
+def read_json_lines(reader, end: str, new_game: str = None) -> dict:
+    lines = [read_line(reader)]
+    if lines[0] == new_game:
+        return None
+    while lines[-1] != end:
+        lines.append(read_line(reader))
+    return json.loads(''.join(lines[:-1]))
+
+
+# This turn's state in the given wire format, or None if a new game is starting instead.
+# A framed message is a uint32 length, then the message. With shared memory, the length is followed by where the
+# message is in it instead (see backend/WireFormat.py).
+def read_game_state(reader, wire_format: str, agent_driver=None, shared_memory=None) -> dict:
+    if wire_format == 'json':
+        return read_json_lines(reader, "--END OF TURN--", "--NEW GAME--")
+
+    length = int.from_bytes(read_exactly(reader, 4), 'little')
+    if length == 0:
+        return None
+    if shared_memory:
+        offset = int.from_bytes(read_exactly(reader, 4), 'little')
+        if offset != agent_driver.IN_PIPE:
+            # decoded where it is, without copying it out first
+            with memoryview(shared_memory)[offset:offset + length] as message:
+                return agent_driver.decode(message) if wire_format == 'binary' else json.loads(str(message, 'utf-8'))
+    message = read_exactly(reader, length)
+    return agent_driver.decode(message) if wire_format == 'binary' else json.loads(message)
+
+
+# Play the games the backend sends on `reader` (a binary stream, like sys.stdin.buffer) with new instances of
+# agent_class, answering on `writer` (a text stream), until the backend hangs up. Asks for the first of
+# `wire_formats` the backend offers and this file can read, JSON lines if there's none, and for shared memory with
+# a framed format if `use_shared_memory`.
+# Everything, the handshake lines included, is read from the one binary stream, so nothing is left behind in a text
+# buffer when a line is followed by a framed message.
+# A backend that plays lots of games can send "--NEW GAME--" when a game is over,
+# followed by the next game's initial state, instead of starting this program again
+def play_games(agent_class, reader, writer, wire_formats: list = WIRE_FORMATS, use_shared_memory: bool = USE_SHARED_MEMORY) -> None:
+    agent_driver = import_agent_driver() if wire_formats else None
+    readable_formats = ['framed_json', 'binary'] if agent_driver else ['framed_json']
+    try:
+        team_line = read_line(reader)
+    except EOFError:
+        return
+    while True:
 
-    # create and initialize agent, set team name
-    agent = Agent()
-    print(agent.initialize_and_set_name(game_state_init, team_color))
+        # figure out if we're red or blue
+        team_color = 'r' if team_line == "--YOU ARE RED--" else 'b'
+
+        # get initial game state, which is always JSON lines
+        game_state_init = read_json_lines(reader, "--END INITIAL GAME STATE--")
+
+        # ask for a wire format, new games and shared memory if the backend offers them, before sending the team name
+        offered_formats = game_state_init.get('WireFormats', [])
+        wire_format = next((f for f in wire_formats if f in readable_formats and f in offered_formats), 'json')
+        if wire_format != 'json':
+            writer.write(f"--WIRE FORMAT: {wire_format}--\n")
+        if game_state_init.get('NewGame'):
+            writer.write("--NEW GAME OK--\n")
+        shared_memory = None
+        if use_shared_memory and agent_driver and wire_format != 'json' and game_state_init.get('SharedMemory'):
+            shared_memory = agent_driver.map_shared_memory(game_state_init['SharedMemory'])
+            if shared_memory:
+                writer.write("--SHARED MEMORY OK--\n")
+
+        # create and initialize agent, set team name, and perform first action
+        agent = agent_class()
+        writer.write(agent.initialize_and_set_name(game_state_init, team_color) + "\n")
+        writer.write(agent.do_turn(game_state_init).to_json() + "\n")
+        writer.flush()
+
+        # loop until the game is over
+        try:
+            while True:
+                game_state_this_turn = read_game_state(reader, wire_format, agent_driver, shared_memory)
+                if game_state_this_turn is None:
+                    break
+                # the floor tiles are only sent in the initial game state
+                game_state_this_turn['FloorTiles'] = game_state_init['FloorTiles']
+
+                # get agent action, then send it to the game server
+                writer.write(agent.do_turn(game_state_this_turn).to_json() + "\n")
+                writer.flush()
+        finally:
+            if shared_memory:
+                shared_memory.close()
+
+        team_line = read_line(reader)
+
+
+# Keep running and play one backend after another over a unix socket, each like it was on stdin and stdout
+# (see backend/AgentSocket.py), with the same arguments as play_games. With `listen`, backends connect to us,
+# otherwise we connect to them.
+def serve(agent_class, socket_path: str, listen: bool, wire_formats: list = WIRE_FORMATS, use_shared_memory: bool = USE_SHARED_MEMORY) -> None:
+    if listen:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        server.listen()
+    while True:
+        if listen:
+            connection, _ = server.accept()
+        else:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                connection.connect(socket_path)
+            except OSError:
+                # No backend waiting for us yet
+                connection.close()
+                time.sleep(0.1)
+                continue
+        reader = connection.makefile('rb')
+        writer = connection.makefile('w', encoding='utf-8')
+        try:
+            play_games(agent_class, reader, writer, wire_formats, use_shared_memory)
+        except (EOFError, OSError):
+            # The backend hung up, on to the next one
+            pass
+        except Exception:
+            # This game is lost like it would be for an agent process that crashed, but the next one is still played
+            traceback.print_exc()
+        finally:
+            for stream in [reader, writer]:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+            connection.close()
 
-    # perform first action
-    print(agent.do_turn(game_state_init).to_json())
 
-    # loop until the game is over
-    while True:
-        # get this turn's state
-        input_buffer = [input()]
-        while input_buffer[-1] != "--END OF TURN--":
-            input_buffer.append(input())
-        game_state_this_turn = json.loads(''.join(input_buffer[:-1]))
-
-        # get agent action, then send it to the game server
-        print(agent.do_turn(game_state_this_turn).to_json())
\ No newline at end of file
+if __name__ == '__main__':
+    # Started by the backend, which talks to us on stdin and stdout. Or start it yourself and leave it running,
+    # to keep what it loaded between games:
+    #   --listen <path>     for backends to connect to (main.py --agent_1_socket <path>)
+    #   --connect <path>    to connect to a backend waiting there (main.py --agent_1_socket <path> --listen)
+    parser = argparse.ArgumentParser()
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument('--listen', metavar='SOCKET')
+    transport.add_argument('--connect', metavar='SOCKET')
+    args = parser.parse_args()
+    if args.listen or args.connect:
+        serve(Agent, args.listen or args.connect, bool(args.listen))
+    else:
+        play_games(Agent, sys.stdin.buffer, sys.stdout)
@@ -0,0 +1,84 @@
+import glob
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+import MegaMinerEnv
+
+# Checks the incremental observation encoder of MegaMinerEnv (_encode_obs) against the reference encoder it replaced
+# (_get_obs), and measures both.
+# Games are played with random valid actions (see MegaMinerEnv.parallel_env.action_mask), and after every turn
+# both encoders have to give exactly the same observations for both agents.
+# The first encoder called after a turn finds less of what it reads in the cache, so they take turns going first.
+
+
+# Random action allowed by an action mask, component by component
+def random_valid_action(rng: np.random.Generator, action_mask: np.ndarray, action_space) -> np.ndarray:
+    component_masks = np.split(action_mask, np.cumsum(action_space.nvec)[:-1])
+    return np.array([rng.choice(np.flatnonzero(component_mask)) for component_mask in component_masks])
+
+
+# Raises an exception with the first difference between two observations of one agent
+def check_parity(observation, reference, agent: str, turn: int) -> None:
+    if observation.dtype != reference.dtype or not np.array_equal(observation, reference):
+        differences = np.argwhere(observation != reference)
+        raise Exception(f'Observation of {agent} differs from the reference after turn {turn}, first at index {differences[0].tolist()}')
+
+
+# Plays `games` games on the map, returning the number of turns, and the seconds spent in each encoder
+def play_and_compare(map_json_file: str, games: int, rng: np.random.Generator) -> tuple:
+    env = MegaMinerEnv.parallel_env(map_json_file)
+    turns = 0
+    encode_time = 0.0
+    reference_time = 0.0
+    for _ in range(games):
+        env.reset(seed=int(rng.integers(1 << 31)))
+        while not env.game.game_state.is_game_over():
+            ai_actions = [env._decode_action(random_valid_action(rng, env.action_mask(agent), env.action_space(agent)))[0] for agent in env.possible_agents]
+            env.game.run_turn(ai_actions[0], ai_actions[1])
+            turns += 1
+
+            if turns % 2:
+                start = time.perf_counter()
+                observations = env._encode_obs()
+                encoded = time.perf_counter()
+                references = env._get_obs()
+                encode_time += encoded - start
+                reference_time += time.perf_counter() - encoded
+            else:
+                start = time.perf_counter()
+                references = env._get_obs()
+                referenced = time.perf_counter()
+                observations = env._encode_obs()
+                reference_time += referenced - start
+                encode_time += time.perf_counter() - referenced
+
+            for agent in env.possible_agents:
+                check_parity(observations[agent], references[agent], agent, turns)
+    return turns, encode_time, reference_time
+
+
+if __name__ == '__main__':
+    maps_directory = Path(__file__).resolve().parent.parent / 'maps'
+    parser = argparse.ArgumentParser(description='Check the incremental observation encoder of MegaMinerEnv against the reference one, and benchmark both.')
+    parser.add_argument('map_json_files', nargs='*', help='Paths to the map JSON files. Defaults to all the maps.')
+    parser.add_argument('-g', '--games', type=int, default=5, help='How many games to play on each map')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    map_json_files = args.map_json_files or sorted(glob.glob(str(maps_directory / '*.json')))
+    rng = np.random.default_rng(args.seed)
+    total_turns = 0
+    total_encode_time = 0.0
+    total_reference_time = 0.0
+    for map_json_file in map_json_files:
+        turns, encode_time, reference_time = play_and_compare(map_json_file, args.games, rng)
+        print(f"{Path(map_json_file).name}: {turns} turns, incremental {encode_time / turns * 1e6:.1f} us, reference {reference_time / turns * 1e6:.1f} us")
+        total_turns += turns
+        total_encode_time += encode_time
+        total_reference_time += reference_time
+
+    print(f"Observations of both agents matched the reference after all {total_turns} turns")
+    print(f"Incremental encoder: {total_encode_time / total_turns * 1e6:10.1f} us per turn")
+    print(f"Reference encoder:   {total_reference_time / total_turns * 1e6:10.1f} us per turn  ({total_reference_time / total_encode_time:.2f}x)")
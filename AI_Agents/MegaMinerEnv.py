@@ -5,8 +5,8 @@
 import gymnasium
 import numpy as np
 from gymnasium.spaces import Box, Dict, Discrete
-from pettingzoo import AECEnv
-from pettingzoo.utils import agent_selector, wrappers
+from pettingzoo import ParallelEnv
+from pettingzoo.utils import parallel_to_aec, wrappers
 import sys
 from pathlib import Path
 
@@ -16,25 +16,38 @@ sys.path.append(str(Path(__file__).resolve().parent.parent / 'backend'))
 from Game import Game
 from AIAction import AIAction
 import Constants
+# The game log is off by default, so the env doesn't pay for formatting log lines; see GameLog.configure
+import GameLog
 
-def env(map_path):
+def env(map_path, compact=False):
     """
     The env function wraps the raw environment in helpful wrappers provided by PettingZoo.
     These wrappers can enforce constraints and perform standard transformations, which is good practice.
     """
     internal_render_mode = "human"
-    env = raw_env(render_mode=internal_render_mode, map_path=map_path)
+    env = raw_env(render_mode=internal_render_mode, map_path=map_path, compact=compact)
     # This wrapper asserts that actions are within the defined action space.
     # It's useful for debugging during development to catch invalid actions.
     env = wrappers.AssertOutOfBoundsWrapper(env)
     return env
 
-class raw_env(AECEnv):
+def raw_env(map_path, render_mode=None, compact=False):
     """
-    The raw environment for MegaMiner, implementing the PettingZoo AECEnv (Agent-Environment-Cycle) API.
+    The AEC (Agent-Environment-Cycle) version of the environment, where the agents act one after the other.
+    MegaMiner is a simultaneous-move game, so this is derived from the parallel environment: the AEC wrapper
+    collects the actions of both agents and passes them to parallel_env.step together.
+    Training should use parallel_env directly, which skips the conversion.
+    """
+    env = parallel_env(render_mode=render_mode, map_path=map_path, compact=compact)
+    env = parallel_to_aec(env)
+    return env
+
+class parallel_env(ParallelEnv):
+    """
+    The environment for MegaMiner, implementing the PettingZoo ParallelEnv API, where both agents act at once.
     This class handles the core logic of the environment, including:
     - State Management: Tracking the positions of all entities, player health, money, etc.
-    - Action Handling: Receiving actions from agents and applying them to the game state.
+    - Action Handling: Receiving both agents' actions and running a game turn with them.
     - Observation Generation: Converting the game state into a format that RL agents can understand.
     - Reward Calculation: Providing a reward signal to the agents based on their performance.
     """
@@ -48,11 +61,37 @@ class raw_env(AECEnv):
     # This ensures a consistent observation shape regardless of the actual map size, which is required by most RL libraries.
     MAX_MAP_WIDTH = 50
     MAX_MAP_HEIGHT = 50
-
-    def __init__(self, map_path, render_mode=None):
+    # Number of channels in the map part of the observation, and number of vector features after it.
+    MAP_CHANNELS = 7
+    VECTOR_SIZE = 5
+    # The compact observation stores health and tower cooldown as whole percentages, so the map fits in small integers.
+    # Multiplying its channels by this gives the values of the padded observation back.
+    COMPACT_MAP_SCALE = np.array([1, 1, 0.01, 1, 1, 0.01, 1], dtype=np.float32)
+    # Values of the tower type and unit state channels, and what tower cooldowns are normalized by
+    TOWER_TYPES = {"crossbow": 1, "cannon": 2, "minigun": 3, "house": 4}
+    TOWER_MAX_COOLDOWNS = {
+        "HOUSE": Constants.HOUSE_MAX_COOLDOWN, "CANNON": Constants.CANNON_MAX_COOLDOWN,
+        "MINIGUN": Constants.MINIGUN_MAX_COOLDOWN, "CROSSBOW": Constants.CROSSBOW_MAX_COOLDOWN,
+    }
+    UNIT_STATES = {"walking": 1, "attacking": 2}
+    # What the vector features are divided by, and where blue's vector features are in red's
+    VECTOR_SCALE = np.array([
+        1000, Constants.PLAYER_BASE_INITIAL_HEALTH if Constants.PLAYER_BASE_INITIAL_HEALTH > 0 else 1,
+        1000, Constants.PLAYER_BASE_INITIAL_HEALTH if Constants.PLAYER_BASE_INITIAL_HEALTH > 0 else 1,
+        Constants.MAX_TURNS if Constants.MAX_TURNS > 0 else 1
+    ], dtype=np.float32)
+    BLUE_VECTOR_ORDER = np.array([2, 3, 0, 1, 4])
+
+    def __init__(self, map_path, render_mode=None, compact=False):
+        """
+        :param map_path: The map to play on.
+        :param render_mode: The render mode, see render.
+        :param compact: Whether to use the compact observation instead of the padded one, see _create_observation_space.
+        """
         super().__init__()
         self.render_mode = render_mode
-        
+        self.compact = compact
+
         # Load the game map and initialize the game state from the backend.
         self.map_path = map_path
         self.game = Game(self.map_path)
@@ -60,27 +99,27 @@ class raw_env(AECEnv):
 
         # --- PettingZoo Setup ---
         # Define the agents that exist in the environment.
-        self.agents = ["player_r", "player_b"]
-        self.possible_agents = self.agents[:]
-        # The agent_selector is a utility that cycles through agents in a round-robin fashion.
-        self._agent_selector = agent_selector(self.agents)
-        
+        self.possible_agents = ["player_r", "player_b"]
+        self.agents = self.possible_agents[:]
+
         # Define the action and observation spaces for the agents. These must be consistent for all agents.
         self._action_space_dict = self._create_action_space()
         self._observation_space_dict = self._create_observation_space()
 
-        # --- Game State Tracking ---
-        # These dictionaries store the current state for each agent.
-        self.rewards = {agent: 0 for agent in self.agents}
-        self._cumulative_rewards = {agent: 0 for agent in self.agents}
-        self.terminations = {agent: False for agent in self.agents} # True if an agent has reached a terminal state (e.g., won/lost).
-        self.truncations = {agent: False for agent in self.agents}   # True if the episode is ended for other reasons (e.g., time limit).
-        self.infos = {agent: {} for agent in self.agents}            # Auxiliary diagnostic information.
-
-        # In this simultaneous-move game, we need to store the action of the first agent
-        # while we wait for the action of the second agent.
-        self.action_r = None
-        self.action_b = None
+        # The terrain channel never changes during a game, so it's made once for each agent.
+        self._terrain = {agent: self._create_terrain(agent) for agent in self.possible_agents}
+        if self.compact:
+            # The compact observation starts from a map with only the terrain on it, see _get_compact_obs.
+            map_w, map_h = self.map_size
+            self._terrain = {agent: terrain[:map_h, :map_w].astype(np.int16) for agent, terrain in self._terrain.items()}
+            self._empty_compact_map = np.zeros(self._observation_space_dict["observation"].shape, dtype=np.int16)
+            self._empty_compact_map[0] = self._terrain["player_r"]
+        # Neither do the parts of the action masks that only depend on the map, see action_mask.
+        self._territory = {agent: self._create_territory(agent) for agent in self.possible_agents}
+        self._merc_directions = {agent: self._create_merc_directions(agent) for agent in self.possible_agents}
+
+        if not self.compact:
+            self._reset_encoder()
 
     def observation_space(self, agent):
         """Returns the observation space for a given agent."""
@@ -110,43 +149,152 @@ class raw_env(AECEnv):
         Defines the observation space for an agent.
         The observation is a flattened vector combining a multi-channel map representation
         and a vector of game state features. This is suitable for an MLP (Multi-Layer Perceptron) policy.
-        A CNN (Convolutional Neural Network) could also be used if the map representation is kept as a 3D tensor.
+        The compact observation instead keeps the map as a 3D tensor (Channels, Height, Width) the size of the
+        actual map, for a CNN (Convolutional Neural Network) policy. The map is under "observation", which is where
+        PettingZoo looks for the observation in a Dict, and the vector features are under "vector".
+        Its map is 16-bit integers, see COMPACT_MAP_SCALE, and a fraction of the size of the padded observation.
         """
+        if self.compact:
+            map_w, map_h = self.map_size
+            return Dict({
+                "observation": Box(low=np.iinfo(np.int16).min, high=np.iinfo(np.int16).max, shape=(self.MAP_CHANNELS, map_h, map_w), dtype=np.int16),
+                "vector": Box(low=-np.inf, high=np.inf, shape=(self.VECTOR_SIZE,), dtype=np.float32),
+            })
+
         # The map is represented as a 3D tensor (Height, Width, Channels).
-        map_shape = (self.MAX_MAP_HEIGHT, self.MAX_MAP_WIDTH, 7)
-        # The vector part contains additional global game state information.
-        vector_size = 5
-        
+        map_shape = (self.MAX_MAP_HEIGHT, self.MAX_MAP_WIDTH, self.MAP_CHANNELS)
+
         # The total observation size is the flattened map plus the vector features.
-        total_obs_size = np.prod(map_shape) + vector_size
+        total_obs_size = np.prod(map_shape) + self.VECTOR_SIZE
 
         return Box(low=-np.inf, high=np.inf, shape=(total_obs_size,), dtype=np.float32)
 
-    def _get_obs(self, agent):
+    def _create_terrain(self, agent):
         """
-        Constructs the observation vector for the current agent.
-        This function gathers all relevant game state information and packs it into the format
-        defined by the observation space. It is crucial that this function is deterministic and
-        accurately reflects the game state.
+        Channel 0 of the observation map for an agent: the type of each tile.
+        1 for Path, 2 for My Territory, 3 for Opponent's Territory, and 0 for the padding around the map.
         """
         is_red_agent = agent == "player_r"
+        my_territory_char = 'R' if is_red_agent else 'B'
+        opp_territory_char = 'B' if is_red_agent else 'R'
+        terrain = np.zeros((self.MAX_MAP_HEIGHT, self.MAX_MAP_WIDTH), dtype=np.float32)
+        for r_idx, row in enumerate(self.game.game_state.floor_tiles):
+            for c_idx, tile in enumerate(row):
+                if tile == 'P': terrain[r_idx, c_idx] = 1
+                elif tile == my_territory_char: terrain[r_idx, c_idx] = 2
+                elif tile == opp_territory_char: terrain[r_idx, c_idx] = 3
+        return terrain
+
+    def _create_territory(self, agent):
+        """
+        The tiles an agent can build on when they're empty, for its action mask: its own territory.
+        Padded to the maximum map size like the observation.
+        """
+        team = 'r' if agent == "player_r" else 'b'
+        map_w, map_h = self.map_size
+        territory = np.zeros((self.MAX_MAP_HEIGHT, self.MAX_MAP_WIDTH), dtype=bool)
+        territory[:map_h, :map_w] = [[tile == team for tile in row] for row in self.game.game_state.floor_tiles]
+        return territory
+
+    def _create_merc_directions(self, agent):
+        """
+        The merc directions an agent can buy mercs in when it has the money, for its action mask:
+        no merc, and the directions with a path tile next to its base (see BuyMercenaryPhase.py).
+        """
+        game_state = self.game.game_state
+        base = game_state.player_base_r if agent == "player_r" else game_state.player_base_b
+        # Same order as merc_dir_map in _decode_action: "", N, S, E, W
+        directions = np.zeros(5, dtype=bool)
+        directions[0] = True
+        for index, (dx, dy) in [(1, (0, -1)), (2, (0, 1)), (3, (1, 0)), (4, (-1, 0))]:
+            x, y = base.x + dx, base.y + dy
+            directions[index] = not game_state.is_out_of_bounds(x, y) and game_state.floor_tiles[y][x] == 'O'
+        return directions
+
+    def action_mask(self, agent):
+        """
+        Which values of each component of the action space are valid for an agent right now, as one flat boolean
+        vector: the masks of the components one after the other, which is how MaskablePPO takes MultiDiscrete masks.
+        - action_type: "nothing" always, "build" if it can afford a tower and has an empty tile, "destroy" if it has a tower
+        - x, y: the columns and rows of the tiles it can build on or destroy, so never outside the map
+        - tower_type: the towers it can afford
+        - merc_direction: no merc always, and the directions with a path next to its base if it can pay for a merc
+        The components are masked separately, so some combinations of valid values are still invalid (an x and a y
+        that are each valid for a different tile, say). The game ignores those like any other invalid action.
+        """
+        game_state = self.game.game_state
+        is_red_agent = agent == "player_r"
+        team = 'r' if is_red_agent else 'b'
+        money = game_state.money_r if is_red_agent else game_state.money_b
+
+        # The only entities on territory tiles are towers, of the team the territory belongs to.
+        own_towers = np.zeros((self.MAX_MAP_HEIGHT, self.MAX_MAP_WIDTH), dtype=bool)
+        for t in game_state.towers:
+            if t.team == team:
+                own_towers[t.y, t.x] = True
+        buildable = self._territory[agent] & ~own_towers
+
+        # Same order as tower_type_map in _decode_action: crossbow, cannon, minigun, house
+        if is_red_agent:
+            prices = [game_state.crossbow_price_r, game_state.cannon_price_r, game_state.minigun_price_r, game_state.house_price_r]
+        else:
+            prices = [game_state.crossbow_price_b, game_state.cannon_price_b, game_state.minigun_price_b, game_state.house_price_b]
+        affordable = money >= np.array(prices)
+
+        can_build = affordable.any() and buildable.any()
+        can_destroy = own_towers.any()
+        targets = np.zeros_like(own_towers)
+        if can_build:
+            targets |= buildable
+        if can_destroy:
+            targets |= own_towers
+        x_mask = targets.any(axis=0)
+        y_mask = targets.any(axis=1)
+        if not (can_build or can_destroy):
+            # "nothing" still needs some coordinates
+            x_mask[0] = y_mask[0] = True
+
+        merc_mask = self._merc_directions[agent].copy()
+        # A merc needs at least 20 money, see BuyMercenaryPhase.py
+        if money < 20:
+            merc_mask[1:] = False
+
+        return np.concatenate([
+            [True, can_build, can_destroy],
+            x_mask,
+            y_mask,
+            affordable if can_build else np.ones(4, dtype=bool),
+            merc_mask
+        ])
+
+    def _get_infos(self):
+        """
+        The infos for both agents, which carry their action masks (see action_mask) for MaskablePPO.
+        They're under "action_masks", named like MaskablePPO's method: PettingZoo takes an "action_mask" to be
+        the tuple of masks Gymnasium samples a MultiDiscrete action with, not one flat vector.
+        """
+        return {agent: {"action_masks": self.action_mask(agent)} for agent in self.agents}
+
+    def _get_obs(self):
+        """
+        Constructs the observation vectors for both agents, in one pass over the game state.
+        The map is drawn once from red's point of view. Blue's observation is a copy of it with its own terrain,
+        the team affiliation channel negated, and the vector features swapped to its side.
+        It is crucial that this function is deterministic and accurately reflects the game state.
+        """
+        game_state = self.game.game_state
         map_h, map_w = self.map_size[1], self.map_size[0]
 
         # --- Map Representation (Multi-channel) ---
         # We use a multi-channel map to represent spatial information. Each channel represents a different aspect of the game state.
         # This is a common technique in RL for games with a spatial component.
-        obs_map = np.zeros((self.MAX_MAP_HEIGHT, self.MAX_MAP_WIDTH, 7), dtype=np.float32)
-        map_view = obs_map[:map_h, :map_w, :] # A view for easier indexing into the non-padded area.
+        # The map is written straight into the observation vector, followed by the vector features.
+        obs_r = np.zeros(self._observation_space_dict.shape, dtype=np.float32)
+        obs_map_r = obs_r[:-self.VECTOR_SIZE].reshape(self.MAX_MAP_HEIGHT, self.MAX_MAP_WIDTH, self.MAP_CHANNELS)
+        map_view = obs_map_r[:map_h, :map_w, :] # A view for easier indexing into the non-padded area.
 
-        # Channel 0: Terrain Type
-        # Encodes the type of each tile: 1 for Path, 2 for My Territory, 3 for Opponent's Territory.
-        my_territory_char = 'R' if is_red_agent else 'B'
-        opp_territory_char = 'B' if is_red_agent else 'R'
-        for r_idx, row in enumerate(self.game.game_state.floor_tiles):
-            for c_idx, tile in enumerate(row):
-                if tile == 'P': map_view[r_idx, c_idx, 0] = 1
-                elif tile == my_territory_char: map_view[r_idx, c_idx, 0] = 2
-                elif tile == opp_territory_char: map_view[r_idx, c_idx, 0] = 3
+        # Channel 0: Terrain Type, see _create_terrain
+        obs_map_r[:, :, 0] = self._terrain["player_r"]
 
         # --- Entity Channels ---
         # Channel 1: Entity Type (1: Tower, 2: Merc, 3: Demon, 4: Base)
@@ -155,223 +303,368 @@ class raw_env(AECEnv):
         # Channel 4: Tower Type (1-4 for different tower types)
         # Channel 5: Tower Cooldown (normalized)
         # Channel 6: Unit State (1: walking, 2: attacking)
-        
-        tower_type_map = {"crossbow": 1, "cannon": 2, "minigun": 3, "house": 4}
-        for t in self.game.game_state.towers:
-            my_team = (is_red_agent and t.team == 'r') or (not is_red_agent and t.team == 'b')
+
+        tower_type_map = self.TOWER_TYPES
+        tower_cooldown_map = self.TOWER_MAX_COOLDOWNS
+        for t in game_state.towers:
             map_view[t.y, t.x, 1] = 1
             map_view[t.y, t.x, 2] = t.health
-            map_view[t.y, t.x, 3] = 1 if my_team else -1
+            map_view[t.y, t.x, 3] = 1 if t.team == 'r' else -1
             map_view[t.y, t.x, 4] = tower_type_map.get(t.name.lower(), 0)
-            tower_cooldown_map = {
-                "HOUSE": Constants.HOUSE_MAX_COOLDOWN, "CANNON": Constants.CANNON_MAX_COOLDOWN,
-                "MINIGUN": Constants.MINIGUN_MAX_COOLDOWN, "CROSSBOW": Constants.CROSSBOW_MAX_COOLDOWN,
-            }
             max_cd = tower_cooldown_map.get(t.name.upper(), 1)
             map_view[t.y, t.x, 5] = t.current_cooldown / max_cd if max_cd > 0 else 0
 
-        merc_state_map = {"walking": 1, "attacking": 2}
-        for m in self.game.game_state.mercs:
-            my_team = (is_red_agent and m.team == 'r') or (not is_red_agent and m.team == 'b')
+        merc_state_map = self.UNIT_STATES
+        for m in game_state.mercs:
             y, x = int(m.y), int(m.x)
             map_view[y, x, 1] = 2
             map_view[y, x, 2] = m.health / Constants.MERCENARY_INITIAL_HEALTH if Constants.MERCENARY_INITIAL_HEALTH > 0 else 0
-            map_view[y, x, 3] = 1 if my_team else -1
+            map_view[y, x, 3] = 1 if m.team == 'r' else -1
             map_view[y, x, 6] = merc_state_map.get(m.state, 0)
 
-        demon_state_map = {"walking": 1, "attacking": 2}
-        for d in self.game.game_state.demons:
+        demon_state_map = self.UNIT_STATES
+        for d in game_state.demons:
             y, x = int(d.y), int(d.x)
             map_view[y, x, 1] = 3
             map_view[y, x, 2] = d.health / Constants.DEMON_INITIAL_HEALTH if Constants.DEMON_INITIAL_HEALTH > 0 else 0
             map_view[y, x, 3] = 0
             map_view[y, x, 6] = demon_state_map.get(d.state, 0)
 
-        base_r = self.game.game_state.player_base_r
-        base_b = self.game.game_state.player_base_b
-        my_base = base_r if is_red_agent else base_b
-        opp_base = base_b if is_red_agent else base_r
-        map_view[my_base.y, my_base.x, 1] = 4
-        map_view[my_base.y, my_base.x, 2] = my_base.health / Constants.PLAYER_BASE_INITIAL_HEALTH if Constants.PLAYER_BASE_INITIAL_HEALTH > 0 else 0
-        map_view[my_base.y, my_base.x, 3] = 1
-        map_view[opp_base.y, opp_base.x, 1] = 4
-        map_view[opp_base.y, opp_base.x, 2] = opp_base.health / Constants.PLAYER_BASE_INITIAL_HEALTH if Constants.PLAYER_BASE_INITIAL_HEALTH > 0 else 0
-        map_view[opp_base.y, opp_base.x, 3] = -1
+        for base, team in [(game_state.player_base_r, 1), (game_state.player_base_b, -1)]:
+            map_view[base.y, base.x, 1] = 4
+            map_view[base.y, base.x, 2] = base.health / Constants.PLAYER_BASE_INITIAL_HEALTH if Constants.PLAYER_BASE_INITIAL_HEALTH > 0 else 0
+            map_view[base.y, base.x, 3] = team
 
-        # --- Vector Features ---
-        # These are global, non-spatial game state variables.
-        my_money = self.game.game_state.money_r if is_red_agent else self.game.game_state.money_b
-        my_base_health = self.game.game_state.player_base_r.health if is_red_agent else self.game.game_state.player_base_b.health
-        opp_money = self.game.game_state.money_b if is_red_agent else self.game.game_state.money_r
-        opp_base_health = self.game.game_state.player_base_b.health if is_red_agent else self.game.game_state.player_base_r.health
-        turns_remaining = self.game.game_state.turns_remaining
+        # --- Blue's Observation ---
+        # Everything but the terrain and the team affiliation is the same for both agents.
+        obs_b = obs_r.copy()
+        obs_map_b = obs_b[:-self.VECTOR_SIZE].reshape(obs_map_r.shape)
+        obs_map_b[:, :, 0] = self._terrain["player_b"]
+        np.negative(obs_map_r[:, :, 3], out=obs_map_b[:, :, 3])
 
+        # --- Vector Features ---
+        # These are global, non-spatial game state variables:
+        # my money, my base health, opponent's money, opponent's base health, turns remaining.
+        # They're made from red's side, blue's has the two sides swapped.
+        # Normalize vector features to be roughly in the range [0, 1]. This helps with model training.
         vector_features = np.array([
-            my_money, my_base_health, opp_money, opp_base_health, turns_remaining
+            game_state.money_r, game_state.player_base_r.health,
+            game_state.money_b, game_state.player_base_b.health,
+            game_state.turns_remaining
         ], dtype=np.float32)
+        base_health_scale = Constants.PLAYER_BASE_INITIAL_HEALTH if Constants.PLAYER_BASE_INITIAL_HEALTH > 0 else 1
+        vector_features /= np.array([1000, base_health_scale, 1000, base_health_scale, Constants.MAX_TURNS if Constants.MAX_TURNS > 0 else 1], dtype=np.float32)
+        obs_r[-self.VECTOR_SIZE:] = vector_features
+        obs_b[-self.VECTOR_SIZE:] = vector_features[[2, 3, 0, 1, 4]]
 
-        # Normalize vector features to be roughly in the range [0, 1]. This helps with model training.
-        vector_features[0] /= 1000
-        vector_features[1] /= Constants.PLAYER_BASE_INITIAL_HEALTH if Constants.PLAYER_BASE_INITIAL_HEALTH > 0 else 1
-        vector_features[2] /= 1000
-        vector_features[3] /= Constants.PLAYER_BASE_INITIAL_HEALTH if Constants.PLAYER_BASE_INITIAL_HEALTH > 0 else 1
-        vector_features[4] /= Constants.MAX_TURNS if Constants.MAX_TURNS > 0 else 1
-        
-        # --- Flatten and Concatenate ---
-        # Flatten the map and concatenate it with the vector features to create a single, long observation vector.
-        flat_map = obs_map.flatten()
-        return np.concatenate([flat_map, vector_features])
+        return {"player_r": obs_r, "player_b": obs_b}
+
+    def _get_compact_obs(self):
+        """
+        Constructs the compact observations for both agents, see _create_observation_space.
+        The channels are the same as in _get_obs, with health and tower cooldown as whole percentages.
+        """
+        game_state = self.game.game_state
+
+        # Indexed [channel, y, x]
+        map_r = self._empty_compact_map.copy()
+
+        tower_type_map = self.TOWER_TYPES
+        tower_cooldown_map = self.TOWER_MAX_COOLDOWNS
+        for t in game_state.towers:
+            map_r[1, t.y, t.x] = 1
+            map_r[2, t.y, t.x] = t.health * 100
+            map_r[3, t.y, t.x] = 1 if t.team == 'r' else -1
+            map_r[4, t.y, t.x] = tower_type_map.get(t.name.lower(), 0)
+            max_cd = tower_cooldown_map.get(t.name.upper(), 1)
+            map_r[5, t.y, t.x] = t.current_cooldown * 100 // max_cd if max_cd > 0 else 0
+
+        unit_state_map = self.UNIT_STATES
+        for m in game_state.mercs:
+            y, x = int(m.y), int(m.x)
+            map_r[1, y, x] = 2
+            map_r[2, y, x] = m.health * 100 // Constants.MERCENARY_INITIAL_HEALTH if Constants.MERCENARY_INITIAL_HEALTH > 0 else 0
+            map_r[3, y, x] = 1 if m.team == 'r' else -1
+            map_r[6, y, x] = unit_state_map.get(m.state, 0)
+
+        for d in game_state.demons:
+            y, x = int(d.y), int(d.x)
+            map_r[1, y, x] = 3
+            map_r[2, y, x] = d.health * 100 // Constants.DEMON_INITIAL_HEALTH if Constants.DEMON_INITIAL_HEALTH > 0 else 0
+            map_r[3, y, x] = 0
+            map_r[6, y, x] = unit_state_map.get(d.state, 0)
+
+        for base, team in [(game_state.player_base_r, 1), (game_state.player_base_b, -1)]:
+            map_r[1, base.y, base.x] = 4
+            map_r[2, base.y, base.x] = base.health * 100 // Constants.PLAYER_BASE_INITIAL_HEALTH if Constants.PLAYER_BASE_INITIAL_HEALTH > 0 else 0
+            map_r[3, base.y, base.x] = team
+
+        # Blue's map has its own terrain and the team affiliation negated, like in _get_obs
+        map_b = map_r.copy()
+        map_b[0] = self._terrain["player_b"]
+        np.negative(map_r[3], out=map_b[3])
+
+        # The vector features of _get_obs, each agent's made straight from the game state
+        base_health_scale = Constants.PLAYER_BASE_INITIAL_HEALTH if Constants.PLAYER_BASE_INITIAL_HEALTH > 0 else 1
+        money_r, money_b = game_state.money_r / 1000, game_state.money_b / 1000
+        health_r, health_b = game_state.player_base_r.health / base_health_scale, game_state.player_base_b.health / base_health_scale
+        turns = game_state.turns_remaining / (Constants.MAX_TURNS if Constants.MAX_TURNS > 0 else 1)
+
+        return {
+            "player_r": {"observation": map_r, "vector": np.array([money_r, health_r, money_b, health_b, turns], dtype=np.float32)},
+            "player_b": {"observation": map_b, "vector": np.array([money_b, health_b, money_r, health_r, turns], dtype=np.float32)},
+        }
+
+    def _reset_encoder(self):
+        """
+        Sets up the incremental observation encoder (see _encode_obs) for the map.
+        Its one buffer is red's observation, with the terrain and the entities of the last call on it.
+        Nothing in it depends on the game, so it carries over reset: a new game's entities are all new.
+        """
+        self._entity_buffer = np.zeros(self._observation_space_dict.shape, dtype=np.float32)
+        buffer_map = self._entity_buffer[:-self.VECTOR_SIZE].reshape(self.MAX_MAP_HEIGHT, self.MAX_MAP_WIDTH, self.MAP_CHANNELS)
+        buffer_map[:, :, 0] = self._terrain["player_r"]
+        # The buffer as a flat memoryview, which takes single values faster than indexing the array
+        self._entity_flat = memoryview(self._entity_buffer).cast('B').cast('f')
+        # Entity -> (index of channel 0 of its tile in the buffer, the attributes it was drawn from), for the
+        # entities drawn by the last call, and whether two of them shared a tile
+        self._drawn_entities = {}
+        self._drawn_shared_tile = False
+
+        # Blue's map is red's times _blue_scale plus _blue_offset, over the rows the map covers:
+        # its own terrain instead of red's, and the team affiliation negated.
+        map_h = self.map_size[1]
+        self._blue_map_size = map_h * self.MAX_MAP_WIDTH * self.MAP_CHANNELS
+        self._blue_scale = np.ones(self._blue_map_size, dtype=np.float32)
+        blue_scale_map = self._blue_scale.reshape(map_h, self.MAX_MAP_WIDTH, self.MAP_CHANNELS)
+        blue_scale_map[:, :, 0] = 0
+        blue_scale_map[:, :, 3] = -1
+        self._blue_offset = np.zeros(self._blue_map_size, dtype=np.float32)
+        self._blue_offset.reshape(blue_scale_map.shape)[:, :, 0] = self._terrain["player_b"][:map_h]
+
+    def _encode_obs(self):
+        """
+        Constructs the observations for both agents incrementally: the same observations as _get_obs, which stays
+        as the reference (see BenchmarkObservation.py).
+        The terrain is drawn once. After that, only the entities that spawned, moved, died, or whose health,
+        cooldown or state changed since the last call are written, into red's observation. Blue's is made from
+        red's with a transform, see _reset_encoder.
+        """
+        game_state = self.game.game_state
+        flat = self._entity_flat
+        # Index of channel 0 of tile (y, x) in the flat buffer is y * row_stride + x * MAP_CHANNELS
+        row_stride = self.MAX_MAP_WIDTH * self.MAP_CHANNELS
+        map_channels = self.MAP_CHANNELS
+        base_r, base_b = game_state.player_base_r, game_state.player_base_b
+
+        # What every entity is drawn from, in the order _get_obs draws them
+        entities = {}
+        for t in game_state.towers:
+            entities[t] = (t.y * row_stride + t.x * map_channels, t.health, t.current_cooldown)
+        for m in game_state.mercs:
+            entities[m] = (int(m.y) * row_stride + int(m.x) * map_channels, m.health, m.state)
+        for d in game_state.demons:
+            entities[d] = (int(d.y) * row_stride + int(d.x) * map_channels, d.health, d.state)
+        for base in (base_r, base_b):
+            entities[base] = (base.y * row_stride + base.x * map_channels, base.health)
+
+        # Entities on the same tile overwrite each other's channels, so while any share a tile, all of them are
+        # drawn again in order. Otherwise the tiles entities left are cleared, and only the new and changed
+        # entities are drawn.
+        drawn = self._drawn_entities
+        shared_tile = len({drawn_from[0] for drawn_from in entities.values()}) < len(entities)
+        redraw = shared_tile or self._drawn_shared_tile
+        for entity, drawn_from in drawn.items():
+            if redraw or entities.get(entity, (None,))[0] != drawn_from[0]:
+                index = drawn_from[0]
+                flat[index + 1] = flat[index + 2] = flat[index + 3] = flat[index + 4] = flat[index + 5] = flat[index + 6] = 0
+        if redraw:
+            drawn = {}
+
+        tower_types, tower_max_cooldowns, unit_states = self.TOWER_TYPES, self.TOWER_MAX_COOLDOWNS, self.UNIT_STATES
+        for t in game_state.towers:
+            drawn_from = entities[t]
+            if drawn.get(t) != drawn_from:
+                index = drawn_from[0]
+                max_cd = tower_max_cooldowns.get(t.name.upper(), 1)
+                flat[index + 1] = 1
+                flat[index + 2] = t.health
+                flat[index + 3] = 1 if t.team == 'r' else -1
+                flat[index + 4] = tower_types.get(t.name.lower(), 0)
+                flat[index + 5] = t.current_cooldown / max_cd if max_cd > 0 else 0
+        for m in game_state.mercs:
+            drawn_from = entities[m]
+            if drawn.get(m) != drawn_from:
+                index = drawn_from[0]
+                flat[index + 1] = 2
+                flat[index + 2] = m.health / Constants.MERCENARY_INITIAL_HEALTH if Constants.MERCENARY_INITIAL_HEALTH > 0 else 0
+                flat[index + 3] = 1 if m.team == 'r' else -1
+                flat[index + 6] = unit_states.get(m.state, 0)
+        for d in game_state.demons:
+            drawn_from = entities[d]
+            if drawn.get(d) != drawn_from:
+                index = drawn_from[0]
+                flat[index + 1] = 3
+                flat[index + 2] = d.health / Constants.DEMON_INITIAL_HEALTH if Constants.DEMON_INITIAL_HEALTH > 0 else 0
+                flat[index + 3] = 0
+                flat[index + 6] = unit_states.get(d.state, 0)
+        for base, team in [(base_r, 1), (base_b, -1)]:
+            drawn_from = entities[base]
+            if drawn.get(base) != drawn_from:
+                index = drawn_from[0]
+                flat[index + 1] = 4
+                flat[index + 2] = base.health / Constants.PLAYER_BASE_INITIAL_HEALTH if Constants.PLAYER_BASE_INITIAL_HEALTH > 0 else 0
+                flat[index + 3] = team
+        self._drawn_entities = entities
+        self._drawn_shared_tile = shared_tile
+
+        # The vector features of _get_obs, normalized the same way so they're exactly the same
+        obs_r = self._entity_buffer.copy()
+        vector_features = obs_r[-self.VECTOR_SIZE:]
+        vector_features[:] = (
+            game_state.money_r, base_r.health,
+            game_state.money_b, base_b.health,
+            game_state.turns_remaining
+        )
+        vector_features /= self.VECTOR_SCALE
+
+        obs_b = obs_r.copy()
+        obs_map_b = obs_b[:self._blue_map_size]
+        obs_map_b *= self._blue_scale
+        obs_map_b += self._blue_offset
+        obs_b[-self.VECTOR_SIZE:] = vector_features[self.BLUE_VECTOR_ORDER]
+        return {"player_r": obs_r, "player_b": obs_b}
 
     def observe(self, agent):
         """
         Returns the observation for the specified agent.
-        This is the public method called by the agent to get its observation.
         """
-        return self._get_obs(agent)
+        return (self._get_compact_obs() if self.compact else self._encode_obs())[agent]
 
     def reset(self, seed=None, options=None):
         """
-        Resets the environment to its initial state for a new episode and returns the initial observation.
+        Resets the environment to its initial state for a new episode and returns the initial observations.
         """
         # Reset the underlying game engine to a fresh state.
-        self.game = Game(self.map_path)
+        self.game = Game(self.map_path, seed=seed)
 
         # Reset the PettingZoo-specific state for the new episode.
         self.agents = self.possible_agents[:]
-        self._agent_selector.reinit(self.agents)
-        self.agent_selection = self._agent_selector.next()
-
-        self.rewards = {agent: 0 for agent in self.agents}
-        self._cumulative_rewards = {agent: 0 for agent in self.agents}
-        self.terminations = {agent: False for agent in self.agents}
-        self.truncations = {agent: False for agent in self.agents}
-        self.infos = {agent: {} for agent in self.agents}
-        
-        self.action_r = None
-        self.action_b = None
-
-        # Get the initial observation for the first agent to act.
-        observation = self._get_obs(self.agent_selection)
-        info = self.infos[self.agent_selection]
-        
-        return observation, info
-
-    def step(self, action):
-        """
-        Takes a step in the environment for the current agent.
-        This involves storing the agent's action, and if all agents have acted,
-        running a game turn, calculating rewards, and checking for termination.
-        """
-        if self.terminations[self.agent_selection] or self.truncations[self.agent_selection]:
-            # If the agent is done, it shouldn't be able to act. Handle this gracefully.
-            self._was_dead_step(action)
-            return
-
-        agent = self.agent_selection
-        
-        # --- Decode and Validate Action ---
+
+        observations = self._get_compact_obs() if self.compact else self._encode_obs()
+        infos = self._get_infos()
+
+        return observations, infos
+
+    def _decode_action(self, action):
+        """
+        Converts an action vector from the action space into an AIAction.
+        Returns the action and whether its coordinates were outside the map.
+        """
         action_type_map = {0: "nothing", 1: "build", 2: "destroy"}
         tower_type_map = {0: "crossbow", 1: "cannon", 2: "minigun", 3: "house"}
         merc_dir_map = {0: "", 1: "N", 2: "S", 3: "E", 4: "W"}
 
-        act_type, x, y, tower_type, merc_dir = action
-        
+        act_type, original_x, original_y, tower_type, merc_dir = action
+
         map_w, map_h = self.map_size
-        original_x, original_y = action[1], action[2] 
 
         # Clamp coordinates to be within the map boundaries.
         x = np.clip(original_x, 0, map_w - 1)
         y = np.clip(original_y, 0, map_h - 1)
 
-        # If the agent chose an action outside the map, penalize it and force a "nothing" action.
-        # This encourages the agent to learn the map boundaries.
-        if original_x >= map_w or original_y >= map_h:
-            self.rewards[agent] -= 0.1  # Small penalty for invalid action.
-            act_type = 0 # Force "nothing" action.
+        # If the agent chose an action outside the map, force a "nothing" action.
+        out_of_bounds = original_x >= map_w or original_y >= map_h
+        if out_of_bounds:
+            act_type = 0
 
         ai_action = AIAction(
             action=action_type_map[act_type], x=x, y=y,
             tower_type=tower_type_map[tower_type], merc_direction=merc_dir_map[merc_dir]
         )
+        return ai_action, out_of_bounds
 
-        # --- Store action and wait for the other agent ---
-        if agent == "player_r":
-            self.action_r = ai_action
-        else:
-            self.action_b = ai_action
-
-        # --- Cycle agent selection for the next turn ---
-        self.agent_selection = self._agent_selector.next()
-
-        # --- If both agents have acted, run the game turn ---
-        if self.action_r is not None and self.action_b is not None:
-            # Store state before the turn to calculate rewards based on the change in state.
-            old_health_r = self.game.game_state.player_base_r.health
-            old_health_b = self.game.game_state.player_base_b.health
-            old_money_r = self.game.game_state.money_r
-            old_money_b = self.game.game_state.money_b
-
-            # Run the game turn with the actions from both agents.
-            self.game.run_turn(self.action_r, self.action_b)
-
-            # Reset stored actions for the next turn.
-            self.action_r = None
-            self.action_b = None
-
-            # --- Calculate Rewards ---
-            # Reward shaping is crucial for training RL agents effectively.
-            # We use a sparse reward for winning/losing and a dense reward for in-game events.
-            health_r = self.game.game_state.player_base_r.health
-            health_b = self.game.game_state.player_base_b.health
-            money_r = self.game.game_state.money_r
-            money_b = self.game.game_state.money_b
-
-            # --- Reward Components ---
-            # 1. Health Delta: A zero-sum reward for damaging the opponent's base vs. taking damage.
-            # This is a primary objective, so it has a high weight.
-            health_delta_r = (old_health_b - health_b) - (old_health_r - health_r)
-            health_delta_b = (old_health_r - health_r) - (old_health_b - health_b)
-
-            # 2. Economic Delta: A small reward for increasing one's money.
-            # This encourages building houses and managing the economy.
-            income_r = money_r - old_money_r
-            income_b = money_b - old_money_b
-
-            # 3. Time Penalty: A small negative reward each turn to encourage faster wins and prevent passive behavior.
-            time_penalty = -0.01
-
-            # --- Total Reward ---
-            # The final reward is a weighted sum of the components.
-            # Tuning these weights is a key part of training a successful agent.
-            w_health = 1.0  # Health is the most important factor.
-            w_econ = 0.05   # Economy is a secondary concern.
-
-            reward_r = (w_health * health_delta_r) + (w_econ * income_r) + time_penalty
-            reward_b = (w_health * health_delta_b) + (w_econ * income_b) + time_penalty
-            
-            self.rewards["player_r"] += reward_r
-            self.rewards["player_b"] += reward_b
-
-            # --- Check for Termination (Game Over) ---
-            if self.game.game_state.is_game_over():
-                # A large, sparse reward for winning and a penalty for losing.
-                if self.game.game_state.victory == 'r':
-                    self.rewards["player_r"] += 100
-                    self.rewards["player_b"] -= 100
-                elif self.game.game_state.victory == 'b':
-                    self.rewards["player_b"] += 100
-                    self.rewards["player_r"] -= 100
-                
-                self.terminations = {a: True for a in self.agents}
-
-            # Update cumulative rewards for logging and debugging.
-            for a in self.agents:
-                self._cumulative_rewards[a] = self.rewards[a]
+    def step(self, actions):
+        """
+        Takes a step in the environment with the actions of both agents.
+        This involves running a game turn with both actions, calculating rewards, and checking for termination.
+        """
+        rewards = {agent: 0 for agent in self.agents}
+
+        # --- Decode and Validate Actions ---
+        ai_actions = {}
+        for agent in self.agents:
+            ai_actions[agent], out_of_bounds = self._decode_action(actions[agent])
+            # Penalize actions outside the map. This encourages the agent to learn the map boundaries.
+            if out_of_bounds:
+                rewards[agent] -= 0.1  # Small penalty for invalid action.
+
+        # Store state before the turn to calculate rewards based on the change in state.
+        old_health_r = self.game.game_state.player_base_r.health
+        old_health_b = self.game.game_state.player_base_b.health
+        old_money_r = self.game.game_state.money_r
+        old_money_b = self.game.game_state.money_b
+
+        # Run the game turn with the actions from both agents.
+        self.game.run_turn(ai_actions["player_r"], ai_actions["player_b"])
+
+        # --- Calculate Rewards ---
+        # Reward shaping is crucial for training RL agents effectively.
+        # We use a sparse reward for winning/losing and a dense reward for in-game events.
+        health_r = self.game.game_state.player_base_r.health
+        health_b = self.game.game_state.player_base_b.health
+        money_r = self.game.game_state.money_r
+        money_b = self.game.game_state.money_b
+
+        # --- Reward Components ---
+        # 1. Health Delta: A zero-sum reward for damaging the opponent's base vs. taking damage.
+        # This is a primary objective, so it has a high weight.
+        health_delta_r = (old_health_b - health_b) - (old_health_r - health_r)
+        health_delta_b = (old_health_r - health_r) - (old_health_b - health_b)
+
+        # 2. Economic Delta: A small reward for increasing one's money.
+        # This encourages building houses and managing the economy.
+        income_r = money_r - old_money_r
+        income_b = money_b - old_money_b
+
+        # 3. Time Penalty: A small negative reward each turn to encourage faster wins and prevent passive behavior.
+        time_penalty = -0.01
+
+        # --- Total Reward ---
+        # The final reward is a weighted sum of the components.
+        # Tuning these weights is a key part of training a successful agent.
+        w_health = 1.0  # Health is the most important factor.
+        w_econ = 0.05   # Economy is a secondary concern.
+
+        rewards["player_r"] += (w_health * health_delta_r) + (w_econ * income_r) + time_penalty
+        rewards["player_b"] += (w_health * health_delta_b) + (w_econ * income_b) + time_penalty
+
+        # --- Check for Termination (Game Over) ---
+        game_over = self.game.game_state.is_game_over()
+        if game_over:
+            # A large, sparse reward for winning and a penalty for losing.
+            if self.game.game_state.victory == 'r':
+                rewards["player_r"] += 100
+                rewards["player_b"] -= 100
+            elif self.game.game_state.victory == 'b':
+                rewards["player_b"] += 100
+                rewards["player_r"] -= 100
+
+        observations = self._get_compact_obs() if self.compact else self._encode_obs()
+        terminations = {agent: game_over for agent in self.agents}
+        truncations = {agent: False for agent in self.agents}
+        infos = self._get_infos()
+
+        # Both agents are done at the same time once the game is over.
+        if game_over:
+            self.agents = []
 
         # Handle rendering if enabled.
         if self.render_mode == "human":
             self.render()
 
+        return observations, rewards, terminations, truncations, infos
+
     def render(self):
         """
         The game has a Godot-based visualizer, which is a separate process.
@@ -387,11 +680,16 @@ class raw_env(AECEnv):
 
 if __name__ == '__main__':
     # This block is for testing the environment to ensure it conforms to the PettingZoo API.
-    from pettingzoo.test import api_test
+    from pettingzoo.test import api_test, parallel_api_test
 
     map_file = str(Path(__file__).resolve().parent.parent / 'maps' / 'map0.json')
+
+    print("Running PettingZoo parallel API test...")
+    parallel_api_test(parallel_env(map_path=map_file), num_cycles=1000)
+    print("Parallel API test passed!")
+
     env = env(map_path=map_file)
-    
+
     print("Running PettingZoo API test...")
     # The API test runs a series of checks to ensure the environment is correctly implemented.
     api_test(env, num_cycles=1000, verbose_progress=True)
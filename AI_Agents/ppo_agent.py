@@ -3,6 +3,7 @@
 # This script is designed to be run as a separate process by the game engine.
 
 import json
+import argparse
 import numpy as np
 import sys
 from pathlib import Path
@@ -143,6 +144,10 @@ def _convert_state_to_obs(game_state: dict, team_color: str) -> np.ndarray:
     return np.concatenate([flat_map, vector_features])
 
 
+# The PPO model, loaded by the first game this process plays and kept for any later ones.
+loaded_model = None
+
+
 class Agent:
     """
     The main agent class that the game engine interacts with.
@@ -159,14 +164,18 @@ class Agent:
         from stable_baselines3 import PPO
 
         # Load the trained PPO model. The path points to the best model saved during training.
-        model_path = Path(__file__).resolve().parent.parent / "training" / "models" / "best_model" / "best_model.zip"
-        print(f"DEBUG: Attempting to load model from: {model_path}", file=sys.stderr)
-        try:
-            self.model = PPO.load(model_path)
-            print("DEBUG: Model loaded successfully.", file=sys.stderr)
-        except Exception as e:
-            print(f"ERROR: Failed to load PPO model: {e}", file=sys.stderr)
-            raise # Re-raise the exception to crash the agent process if the model can't be loaded.
+        # When the backend reuses this process for another game, the model loaded for the first game is kept.
+        global loaded_model
+        if loaded_model is None:
+            model_path = Path(__file__).resolve().parent.parent / "training" / "models" / "best_model" / "best_model.zip"
+            print(f"DEBUG: Attempting to load model from: {model_path}", file=sys.stderr)
+            try:
+                loaded_model = PPO.load(model_path)
+                print("DEBUG: Model loaded successfully.", file=sys.stderr)
+            except Exception as e:
+                print(f"ERROR: Failed to load PPO model: {e}", file=sys.stderr)
+                raise # Re-raise the exception to crash the agent process if the model can't be loaded.
+        self.model = loaded_model
         
         # Return the name of the agent.
         return "PPO_Agent"
@@ -219,37 +228,23 @@ class Agent:
         return ai_action
 
 # -- DRIVER CODE (DO NOT ALTER) --
-# This part of the script handles the communication with the game engine.
+# This part of the script handles the communication with the game engine, through the driver code in AgentTemplate.py.
 # It reads the game state from standard input and writes the agent's actions to standard output.
 if __name__ == '__main__':
-    # Determine team color from the first line of input.
-    team_color = 'r' if input() == "--YOU ARE RED--" else 'b'
-    
-    # Read the initial game state.
-    initial_state_json = ""
-    while True:
-        line = input()
-        if line == "--END INITIAL GAME STATE--":
-            break
-        initial_state_json += line
-    game_state_init = json.loads(initial_state_json)
-
-    # Initialize the agent.
-    agent = Agent()
-    # The first output must be the agent's name.
-    print(agent.initialize_and_set_name(game_state_init, team_color))
-    # The second output is the action for the first turn.
-    print(agent.do_turn(game_state_init).to_json())
-
-    # Main game loop.
-    while True:
-        # Read the game state for the current turn.
-        turn_state_json = ""
-        while True:
-            line = input()
-            if line == "--END OF TURN--":
-                break
-            turn_state_json += line
-        game_state_this_turn = json.loads(turn_state_json)
-        # Output the agent's action for this turn.
-        print(agent.do_turn(game_state_this_turn).to_json())
\ No newline at end of file
+    # Normally started by the backend, which talks to us on stdin and stdout. It can also be started on its own
+    # and left running, so the model stays loaded between games:
+    #   --listen <path>     for backends to connect to (main.py --agent_1_socket <path>)
+    #   --connect <path>    to connect to a backend waiting there (main.py --agent_1_socket <path> --listen)
+    parser = argparse.ArgumentParser()
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument('--listen', metavar='SOCKET')
+    transport.add_argument('--connect', metavar='SOCKET')
+    args = parser.parse_args()
+    # The game state is read as JSON lines. A backend that plays lots of games can send "--NEW GAME--" after a game,
+    # followed by another initial state, instead of restarting us.
+    sys.path.append(str(Path(__file__).resolve().parent))
+    import AgentTemplate
+    if args.listen or args.connect:
+        AgentTemplate.serve(Agent, args.listen or args.connect, bool(args.listen), wire_formats=[])
+    else:
+        AgentTemplate.play_games(Agent, sys.stdin.buffer, sys.stdout, wire_formats=[])
@@ -1,17 +1,23 @@
 # This script is used to train a Proximal Policy Optimization (PPO) agent for the MegaMiner game.
 # It uses the Stable Baselines3 library for the PPO implementation and PettingZoo for the environment.
+# With --maskable, it trains with MaskablePPO from sb3-contrib instead, which only picks actions the game allows.
+# With --compact-obs or --cnn, the agents see the compact, map-sized observation of MegaMinerEnv instead of the padded one.
 # The script can be run from the command line with various arguments to control the training process.
 
 import os
 import time
 import torch
 import argparse
+import numpy as np
+from torch import nn
 from pathlib import Path
 import supersuit as ss
 from stable_baselines3 import PPO
 from stable_baselines3.common.callbacks import BaseCallback, EvalCallback, CallbackList
-from stable_baselines3.common.vec_env import VecMonitor
-from pettingzoo.utils.conversions import aec_to_parallel
+from stable_baselines3.common.vec_env import VecMonitor, VecEnvWrapper
+from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
+from sb3_contrib import MaskablePPO
+from sb3_contrib.common.maskable.callbacks import MaskableEvalCallback
 
 # Add the backend directory to the Python path if it's not already.
 # This is necessary to ensure that the MegaMinerEnv can be imported correctly.
@@ -50,6 +56,173 @@ class TimeLimitCallback(BaseCallback):
             return False
         return True
 
+class ThroughputCallback(BaseCallback):
+    """
+    A custom callback that measures how many environment steps per second are collected.
+    Only the time spent collecting rollouts is counted, not the time spent updating the model, so this shows
+    how well collection scales with --num-envs and --num-cpus. The rate is logged with the other training
+    stats as "time/collection_fps", and the overall rate is printed when training ends.
+    """
+    def __init__(self, verbose: int = 0):
+        """
+        Initializes the callback.
+        :param verbose: The verbosity level.
+        """
+        super(ThroughputCallback, self).__init__(verbose)
+        self.collection_time = 0.0
+        self.collected_steps = 0
+        self.rollout_start_time = None
+        self.rollout_start_steps = 0
+
+    def _on_rollout_start(self) -> None:
+        """
+        This method is called before collecting each rollout.
+        """
+        self.rollout_start_time = time.perf_counter()
+        self.rollout_start_steps = self.num_timesteps
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_rollout_end(self) -> None:
+        """
+        This method is called after each rollout is collected, before the model is updated on it.
+        """
+        rollout_time = time.perf_counter() - self.rollout_start_time
+        rollout_steps = self.num_timesteps - self.rollout_start_steps
+        self.collection_time += rollout_time
+        self.collected_steps += rollout_steps
+        if rollout_time > 0:
+            self.logger.record("time/collection_fps", int(rollout_steps / rollout_time))
+
+    def _on_training_end(self) -> None:
+        """
+        This method is called when training ends, and prints the measured throughput.
+        """
+        if self.collection_time > 0:
+            print(f"Collected {self.collected_steps} steps in {self.collection_time:.1f}s of rollouts: "
+                  f"{self.collected_steps / self.collection_time:.0f} steps/s with {self.training_env.num_envs} envs")
+
+class ActionMaskVecEnv(VecEnvWrapper):
+    """
+    A wrapper that gives MaskablePPO the action masks of the vectorized MegaMiner environments.
+    MaskablePPO asks for them with `env_method("action_masks")`, which the SuperSuit vector environments don't pass on
+    to the games, so the environment sends them in the infos of every step and reset instead (see
+    MegaMinerEnv.action_mask), and this wrapper keeps the latest ones. That also works when the games are stepped
+    in other processes. When a game ends, SuperSuit resets it and its infos already have the masks of the new game.
+    """
+    def __init__(self, venv):
+        """
+        Initializes the wrapper.
+        :param venv: The vectorized environment, made by SuperSuit from MegaMinerEnv.
+        """
+        super(ActionMaskVecEnv, self).__init__(venv)
+        # Everything is allowed until the first masks come in
+        self.masks = np.ones((self.num_envs, int(np.sum(self.action_space.nvec))), dtype=bool)
+
+    def _update_masks(self, infos):
+        if len(infos) != self.num_envs:
+            # When the games are stepped in other processes, SuperSuit returns the infos of a reset the way the
+            # processes sent them instead of one per environment. Nothing is masked until the first step then.
+            self.masks[:] = True
+            return
+        for i, info in enumerate(infos):
+            if "action_masks" in info:
+                self.masks[i] = info["action_masks"]
+            else:
+                self.masks[i] = True
+
+    def reset(self):
+        observations = self.venv.reset()
+        # SB3 vector environments keep the infos of a reset instead of returning them
+        self._update_masks(self.venv.reset_infos)
+        if len(self.venv.reset_infos) == self.num_envs:
+            self.reset_infos = self.venv.reset_infos
+        return observations
+
+    def step_wait(self):
+        observations, rewards, dones, infos = self.venv.step_wait()
+        self._update_masks(infos)
+        return observations, rewards, dones, infos
+
+    def action_masks(self):
+        """
+        :return: The action masks of all the environments, one row each.
+        """
+        return self.masks.copy()
+
+    def has_attr(self, attr_name):
+        if attr_name == "action_masks":
+            return True
+        return super(ActionMaskVecEnv, self).has_attr(attr_name)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        if method_name == "action_masks":
+            return list(self.masks[self._get_indices(indices)])
+        return super(ActionMaskVecEnv, self).env_method(method_name, *method_args, indices=indices, **method_kwargs)
+
+class CompetenceCallback(BaseCallback):
+    """
+    A custom callback that measures the time to competence: how many timesteps and how much training time it takes
+    until the mean reward of an evaluation first reaches a threshold. Running the same threshold with and without
+    --maskable compares MaskablePPO to PPO. It's called after every evaluation of the EvalCallback it's given to.
+    """
+    def __init__(self, reward_threshold: float, verbose: int = 0):
+        """
+        Initializes the callback.
+        :param reward_threshold: The mean evaluation reward that counts as competent.
+        :param verbose: The verbosity level.
+        """
+        super(CompetenceCallback, self).__init__(verbose)
+        self.reward_threshold = reward_threshold
+        self.start_time = time.time()
+        self.reached = False
+
+    def _on_step(self) -> bool:
+        """
+        This method is called after each evaluation, with the EvalCallback as its parent.
+        """
+        if not self.reached and self.parent.last_mean_reward >= self.reward_threshold:
+            self.reached = True
+            elapsed_time = time.time() - self.start_time
+            self.logger.record("eval/timesteps_to_competence", self.num_timesteps)
+            print(f"Mean evaluation reward reached {self.reward_threshold} after {self.num_timesteps} timesteps "
+                  f"and {elapsed_time / 60:.1f} minutes of training.")
+        return True
+
+class MegaMinerCNN(BaseFeaturesExtractor):
+    """
+    A custom features extractor for the compact observation of MegaMinerEnv, for --cnn.
+    The map goes through a small CNN, whose 3x3 convolutions keep it at the size of the map (the maps are too small
+    for the default NatureCNN of Stable Baselines3), and its output is joined with the vector features.
+    Since the map is the size of the actual map, a model only works on maps of the size it was trained on.
+    """
+    def __init__(self, observation_space, features_dim: int = 256):
+        """
+        Initializes the features extractor.
+        :param observation_space: The compact observation space, a Dict with the map under "observation" and "vector".
+        :param features_dim: The number of features passed on to the policy and value networks.
+        """
+        super(MegaMinerCNN, self).__init__(observation_space, features_dim)
+        channels, height, width = observation_space["observation"].shape
+        # Health and cooldown are whole percentages in the compact map, this scales them back to fractions
+        self.register_buffer("map_scale", torch.as_tensor(MegaMinerEnv.parallel_env.COMPACT_MAP_SCALE).view(-1, 1, 1))
+        self.cnn = nn.Sequential(
+            nn.Conv2d(channels, 32, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.Conv2d(32, 32, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.Flatten(),
+        )
+        self.linear = nn.Sequential(
+            nn.Linear(32 * height * width + observation_space["vector"].shape[0], features_dim),
+            nn.ReLU(),
+        )
+
+    def forward(self, observations):
+        map_features = self.cnn(observations["observation"] * self.map_scale)
+        return self.linear(torch.cat([map_features, observations["vector"]], dim=1))
+
 def main(args):
     """
     Main function to set up and run the PPO training.
@@ -58,7 +231,9 @@ def main(args):
     # --- 0. Configure Logging ---
     # Enable or disable logging from the game engine. This can be useful for debugging.
     if args.enable_logging:
+        # The variable is for environments created in other processes, which read it when the backend is imported
         os.environ["MEGAMINER_LOGGING"] = "ON"
+        MegaMinerEnv.GameLog.configure(MegaMinerEnv.GameLog.DEBUG)
     
     # --- 1. Set Device ---
     # Set the device for training. It will use a CUDA-enabled GPU if available, otherwise an Apple Silicon GPU (MPS),
@@ -76,22 +251,38 @@ def main(args):
     # --- 2. Setup Environment ---
     # Create the MegaMiner environment. The map file can be specified as a command-line argument.
     map_file = str(Path(__file__).resolve().parent.parent / 'maps' / args.map_path)
-    env = MegaMinerEnv.env(map_path=map_file)
-    # Convert the AEC (Agent-Environment-Cycle) environment to a parallel environment.
-    # This is required for compatibility with Stable Baselines3.
-    env = aec_to_parallel(env)
+    # The parallel version of the environment takes both agents' actions in one step, which is what the
+    # Stable Baselines3 wrappers below need, so it's used directly instead of converting the AEC version.
+    # The CNN policy needs the map as a tensor, which only the compact observation keeps.
+    compact = args.compact_obs or args.cnn
+    env = MegaMinerEnv.parallel_env(map_path=map_file, compact=compact)
 
     # --- 3. Wrap Environment for SB3 ---
     # Wrap the PettingZoo environment to be compatible with Stable Baselines3.
-    # This involves vectorizing the environment and concatenating multiple environments if needed.
+    # This involves vectorizing the environment and concatenating multiple copies of the game, which are stepped
+    # in `num_cpus` worker processes. The workers write their observations into shared memory instead of sending
+    # them back through a pipe, so collection scales with the number of cores.
+    # Each game has two agents, so SB3 sees twice as many environments as there are games.
     env = ss.pettingzoo_env_to_vec_env_v1(env)
-    env = ss.concat_vec_envs_v1(env, num_vec_envs=1, num_cpus=1, base_class="stable_baselines3")
+    env = ss.concat_vec_envs_v1(env, num_vec_envs=args.num_envs, num_cpus=args.num_cpus, base_class="stable_baselines3")
+    print(f"Collecting experience from {args.num_envs} games on {min(args.num_cpus, args.num_envs)} cores.")
+    if args.maskable:
+        env = ActionMaskVecEnv(env)
     
     # --- 4. Setup PPO Model ---
     # Define the directories for saving logs and models.
     log_dir = "training/logs/"
     os.makedirs(log_dir, exist_ok=True)
+    # MaskablePPO models are kept apart, since neither algorithm can load the other's,
+    # and so are models for the compact observation and the CNN policy.
+    algorithm = MaskablePPO if args.maskable else PPO
     model_dir = "training/models/"
+    if args.maskable:
+        model_dir = os.path.join(model_dir, "maskable")
+    if args.cnn:
+        model_dir = os.path.join(model_dir, "cnn")
+    elif compact:
+        model_dir = os.path.join(model_dir, "compact")
     os.makedirs(model_dir, exist_ok=True)
     
     # Path to the best model. This is used to continue training from a previous session.
@@ -101,16 +292,26 @@ def main(args):
     # Otherwise, create a new PPO model.
     if os.path.exists(best_model_path):
         print("--- Loading existing model and continuing training ---")
-        model = PPO.load(best_model_path, env=env, tensorboard_log=log_dir, device=device)
+        model = algorithm.load(best_model_path, env=env, tensorboard_log=log_dir, device=device)
         # Reset the logger to continue logging without resetting the number of timesteps.
         from stable_baselines3.common import utils
         model.set_logger(utils.configure_logger(verbose=1, tensorboard_log=log_dir, reset_num_timesteps=False))
     else:
         print("--- No existing model found, starting new training ---")
         # Create a new PPO model with the specified hyperparameters.
-        model = PPO(
-            "MlpPolicy", # Use the Multi-Layer Perceptron policy.
+        # Note that n_steps is per environment, so each rollout grows with the number of environments.
+        # The compact observation is a Dict, which takes the multi-input policy. By default it flattens the map
+        # into an MLP, with --cnn the map goes through MegaMinerCNN first.
+        if args.cnn:
+            policy, policy_kwargs = "MultiInputPolicy", dict(features_extractor_class=MegaMinerCNN)
+        elif compact:
+            policy, policy_kwargs = "MultiInputPolicy", None
+        else:
+            policy, policy_kwargs = "MlpPolicy", None # Use the Multi-Layer Perceptron policy.
+        model = algorithm(
+            policy,
             env,
+            policy_kwargs=policy_kwargs,
             verbose=1,
             tensorboard_log=log_dir,
             n_steps=2048,
@@ -128,28 +329,42 @@ def main(args):
     max_training_time_seconds = args.train_minutes * 60
     time_callback = TimeLimitCallback(max_time=max_training_time_seconds, verbose=1)
 
+    # Throughput callback to report how fast experience is collected.
+    throughput_callback = ThroughputCallback()
+
     # Evaluation callback to evaluate the model periodically and save the best one.
-    eval_env = MegaMinerEnv.env(map_path=map_file)
-    eval_env = aec_to_parallel(eval_env)
+    eval_env = MegaMinerEnv.parallel_env(map_path=map_file, compact=compact)
     eval_env = ss.pettingzoo_env_to_vec_env_v1(eval_env)
     eval_env = ss.concat_vec_envs_v1(eval_env, num_vec_envs=1, num_cpus=1, base_class="stable_baselines3")
+    if args.maskable:
+        eval_env = ActionMaskVecEnv(eval_env)
+
+    # Competence callback to report when the evaluation reward first reaches --competence-reward.
+    competence_callback = None
+    if args.competence_reward is not None:
+        competence_callback = CompetenceCallback(reward_threshold=args.competence_reward)
 
-    eval_callback = EvalCallback(
+    # The maskable version also uses the masks when evaluating.
+    eval_callback_class = MaskableEvalCallback if args.maskable else EvalCallback
+    eval_callback = eval_callback_class(
         eval_env,
         best_model_save_path=os.path.join(model_dir, "best_model"),
         log_path=f"{log_dir}/eval",
-        eval_freq=10000,
+        # eval_freq counts steps of the vectorized environment, which are num_envs steps each.
+        # This evaluates every 20000 agent steps, whatever the number of environments.
+        eval_freq=max(20000 // env.num_envs, 1),
         deterministic=True,
-        render=False
+        render=False,
+        callback_after_eval=competence_callback
     )
     
     # Combine the callbacks into a single list.
-    callback_list = CallbackList([eval_callback, time_callback])
+    callback_list = CallbackList([eval_callback, time_callback, throughput_callback])
 
     # --- 6. Train the Model ---
     # Start training the model. The total number of timesteps is set to a large number,
     # so the training will be stopped by the time limit callback.
-    print(f"--- Starting PPO Training for {args.train_minutes} minutes ---")
+    print(f"--- Starting {algorithm.__name__} Training for {args.train_minutes} minutes ---")
     model.learn(total_timesteps=10_000_000, callback=callback_list)
     print("--- Finished Training ---")
 
@@ -167,5 +382,11 @@ if __name__ == '__main__':
     parser.add_argument("--enable-logging", action="store_true", help="Enable game engine logging during training.")
     parser.add_argument("--map-path", type=str, default="map0.json", help="Specify the map file to use for training (e.g., 'map0.json').")
     parser.add_argument("--train-minutes", type=int, default=20, help="Specify the number of minutes to train the PPO agent.")
+    parser.add_argument("--num-envs", type=int, default=1, help="Number of games to collect experience from at once.")
+    parser.add_argument("--num-cpus", type=int, default=1, help="Number of worker processes to step the games in (e.g., the number of cores). 1 steps them all in this process.")
+    parser.add_argument("--maskable", action="store_true", help="Train with MaskablePPO, which only picks valid actions, instead of PPO.")
+    parser.add_argument("--compact-obs", action="store_true", help="Use the compact observation, sized to the map, instead of the padded one.")
+    parser.add_argument("--cnn", action="store_true", help="Use a CNN policy on the compact observation (implies --compact-obs).")
+    parser.add_argument("--competence-reward", type=float, default=None, help="Report how long it takes until the mean evaluation reward reaches this value.")
     args = parser.parse_args()
     main(args)
\ No newline at end of file
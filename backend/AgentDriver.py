@@ -0,0 +1,125 @@
+import mmap
+import struct
+
+# The agent's side of the binary wire format and of shared memory in WireFormat.py: the message layout, a decoder,
+# and mapping the shared memory. Only uses the standard library, so agents can import it too, with the backend
+# folder on their path. The driver code in AgentTemplate.py does, for the formats it can't read by itself.
+# WireFormat.py takes the layout from here, so the backend and the agents can't get out of step.
+
+FORMATS = ['json', 'binary', 'framed_json']
+# Formats where every message starts with its LENGTH
+FRAMED_FORMATS = ['binary', 'framed_json']
+
+LENGTH = struct.Struct('<I')
+OFFSET = struct.Struct('<I')
+IN_PIPE = 0xFFFFFFFF
+HEADER = struct.Struct('<BHHHHiiHHii5i5iHHIHHHHHH')
+UNIT = struct.Struct('<HBHHiiB')        # name, team, x, y, health, damage, state
+TOWER = struct.Struct('<HBBHHiH')       # name, type, team, x, y, cooldown, number of targets
+SPAWNER = struct.Struct('<HHBii')       # x, y, target team, reload time, max reload time
+GRID = struct.Struct('<HHH')            # x, y, name
+
+# Codes used in the records, a value's code is its index
+VICTORY = [None, 'r', 'b', 'tie']
+TEAMS = ['r', 'b']
+STATES = ['moving', 'fighting', 'waiting', 'dead']
+TOWER_TYPES = ['House', 'Crossbow', 'Cannon', 'Minigun', 'Church']
+
+
+# Game state dict for one message, without its length prefix.
+# body can be a memoryview of the shared memory, nothing in the state refers back to it.
+def decode(body: bytes) -> dict:
+    (
+        victory, turns_remaining, current_turn,
+        base_r_x, base_r_y, base_r_health, money_r,
+        base_b_x, base_b_y, base_b_health, money_b,
+        house_r, crossbow_r, cannon_r, minigun_r, church_r,
+        house_b, crossbow_b, cannon_b, minigun_b, church_b,
+        width, height,
+        strings_length, n_mercs, n_demons, n_towers, n_targets, n_spawners, n_occupied
+    ) = HEADER.unpack_from(body, 0)
+    offset = HEADER.size
+
+    strings = str(body[offset:offset + strings_length], 'utf-8').split('\n')
+    offset += strings_length
+
+    units = []
+    for name, team, x, y, health, damage, state in UNIT.iter_unpack(body[offset:offset + UNIT.size * (n_mercs + n_demons)]):
+        units.append({
+            "Name" : strings[name],
+            "Team" : TEAMS[team],
+            "x" : x,
+            "y" : y,
+            "Health" : health,
+            "Damage" : damage,
+            "State" : STATES[state]
+        })
+    offset += UNIT.size * (n_mercs + n_demons)
+
+    tower_records = list(TOWER.iter_unpack(body[offset:offset + TOWER.size * n_towers]))
+    offset += TOWER.size * n_towers
+    target_coords = struct.unpack_from(f'<{n_targets * 2}H', body, offset)
+    offset += 4 * n_targets
+    towers = []
+    target_index = 0
+    for name, tower_type, team, x, y, cooldown, tower_targets in tower_records:
+        towers.append({
+            "Name" : strings[name],
+            "Type" : TOWER_TYPES[tower_type],
+            "Team" : TEAMS[team],
+            "x" : x,
+            "y" : y,
+            "Targets" : [
+                [target_coords[i], target_coords[i + 1]]
+                for i in range(target_index, target_index + 2 * tower_targets, 2)
+            ],
+            "Cooldown" : cooldown
+        })
+        target_index += 2 * tower_targets
+
+    spawners = []
+    for x, y, target, reload_time, max_reload_time in SPAWNER.iter_unpack(body[offset:offset + SPAWNER.size * n_spawners]):
+        spawners.append({
+            "x" : x,
+            "y" : y,
+            "Target" : TEAMS[target],
+            "ReloadTime" : reload_time,
+            "MaxReloadTime" : max_reload_time
+        })
+    offset += SPAWNER.size * n_spawners
+
+    entity_grid = [[''] * width for _ in range(height)]
+    for x, y, name in GRID.iter_unpack(body[offset:offset + GRID.size * n_occupied]):
+        entity_grid[y][x] = strings[name]
+
+    return {
+        "TeamNameR" : strings[0],
+        "TeamNameB" : strings[1],
+        "Victory" : VICTORY[victory],
+        "VictoryReason" : strings[2],
+        "TurnsRemaining" : turns_remaining,
+        "CurrentTurn" : current_turn,
+
+        "PlayerBaseR" : {"Team" : 'r', "Health" : base_r_health, "Money" : money_r, "x" : base_r_x, "y" : base_r_y},
+        "PlayerBaseB" : {"Team" : 'b', "Health" : base_b_health, "Money" : money_b, "x" : base_b_x, "y" : base_b_y},
+        "RedTeamMoney" : money_r,
+        "BlueTeamMoney" : money_b,
+
+        "EntityGrid" : entity_grid,
+        "Towers" : towers,
+        "Mercenaries" : units[:n_mercs],
+        "Demons" : units[n_mercs:],
+        "DemonSpawners" : spawners,
+
+        "TowerPricesR" : {"House" : house_r, "Crossbow" : crossbow_r, "Cannon" : cannon_r, "Minigun" : minigun_r, "Church" : church_r},
+        "TowerPricesB" : {"House" : house_b, "Crossbow" : crossbow_b, "Cannon" : cannon_b, "Minigun" : minigun_b, "Church" : church_b}
+    }
+
+
+# The shared memory offered in the initial state, mapped read-only, or None if it can't be mapped from here
+def map_shared_memory(path: str) -> mmap.mmap:
+    try:
+        with open(path, 'rb') as shared_memory_file:
+            return mmap.mmap(shared_memory_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,45 @@
+from AgentProcess import AgentProcess
+
+# Warm agent processes for one agent file, reused from game to game instead of starting a new interpreter
+# (and, for agents like ppo_agent.py, loading a model) for every game.
+# Only agents that accepted "--NEW GAME--" in their last handshake are kept. A process is stopped instead
+# of reused once it has started max_games games, or if it uses more than max_memory_bytes.
+# New processes are forked from `zygote` if it's given, see Zygote.py, and offered shared memory with `shared_memory`.
+class AgentPool:
+    def __init__(self, agent_file: str, max_games: int = None, max_memory_bytes: int = None, zygote: str = None, shared_memory: bool = False) -> None:
+        self.agent_file = agent_file
+        self.zygote = zygote
+        self.shared_memory = shared_memory
+        self.max_games = max_games
+        self.max_memory_bytes = max_memory_bytes
+        self.idle_agents = []
+
+    # An agent process ready to be sent the initial state of a game, as agent `agent_number`
+    def acquire(self, agent_number: int, stderr_log_path: str = None) -> AgentProcess:
+        while self.idle_agents:
+            ai_agent = self.idle_agents.pop()
+            if ai_agent.process.poll() is not None:
+                continue
+            try:
+                ai_agent.new_game(agent_number, stderr_log_path)
+                return ai_agent
+            except Exception:
+                # It exited while it was waiting
+                ai_agent.terminate()
+        return AgentProcess(self.agent_file, agent_number, stderr_log_path, zygote=self.zygote, shared_memory=self.shared_memory)
+
+    # Hand an agent back once its game is over
+    def release(self, ai_agent: AgentProcess) -> None:
+        if not ai_agent.can_start_new_game():
+            ai_agent.terminate()
+        elif self.max_games is not None and ai_agent.games_started >= self.max_games:
+            ai_agent.terminate()
+        elif self.max_memory_bytes is not None and (ai_agent.memory_usage() or 0) > self.max_memory_bytes:
+            ai_agent.terminate()
+        else:
+            self.idle_agents.append(ai_agent)
+
+    def close(self) -> None:
+        for ai_agent in self.idle_agents:
+            ai_agent.terminate()
+        self.idle_agents = []
@@ -0,0 +1,393 @@
+import os
+import json
+import sys
+import math
+import time
+import queue
+import collections
+import threading
+import subprocess
+import Zygote
+import AgentSocket
+import GameLog
+import WireFormat
+from AIAction import AIAction
+from SharedMemoryRing import SharedMemoryRing
+
+# An AI agent running as a sub-process, talking to the backend over its stdin and stdout.
+# A thread reads the agent's output as it comes in, so the backend can send the game state to both agents
+# and then wait for their answers, and a turn takes as long as the slower agent instead of the sum of both.
+# (Threads rather than select(), which doesn't work on pipes on Windows.)
+#
+# Answers can have a deadline, counted from when the agent was sent the state it's answering.
+# An answer that comes in after its deadline is thrown away, so it isn't taken as the answer to the next turn.
+#
+# Another thread drains the agent's stderr as it's written, into stderr_log_path if one is given. Otherwise an
+# agent that prints a lot to stderr fills the pipe and blocks, and the game waits on it forever.
+# The last STDERR_TAIL_BYTES are also kept to report when the agent dies.
+#
+# An agent that answers the initial state with "--NEW GAME OK--" can be reused for another game after this one,
+# see new_game and AgentPool.
+#
+# With `zygote`, the path of a running Zygote.py's socket, the agent is forked from there instead of started as a
+# new interpreter.
+#
+# With `shared_memory`, the agent is offered a SharedMemoryRing to be sent the game state through, see WireFormat.py.
+#
+# With `agent_socket`, the agent isn't started at all: it's an agent that's already running, connected to over that
+# unix socket, or waited for on it with `listen`. See AgentSocket.py. A listened for agent has to connect within
+# `init_timeout` of the AgentProcess being made, and is disqualified if it doesn't, like one that misses the
+# initialization deadline. It's waited for when it's sent the initial state.
+class AgentProcess:
+    STDERR_TAIL_BYTES = 8192
+
+    def __init__(self, agent_file: str, agent_number: int, stderr_log_path: str = None, stderr_log_max_bytes: int = 1000000, zygote: str = None, shared_memory: bool = False, agent_socket: str = None, listen: bool = False, init_timeout: float = None) -> None:
+        self.agent_file = agent_file
+        self.agent_number = agent_number
+        self.games_started = 1
+        self.reset_game_stats()
+        # When the agent was sent what it's thinking about, or when it sent its last answer if it wasn't sent anything since
+        self.sent_time = time.perf_counter()
+        self.listener = None
+        if agent_socket and listen:
+            self.listener = AgentSocket.AgentListener(agent_socket)
+            self.init_timeout = init_timeout
+            self.process = None
+        elif agent_socket:
+            self.process = AgentSocket.connect(agent_socket)
+        elif zygote:
+            self.process = Zygote.launch(zygote, agent_file)
+        else:
+            self.process = subprocess.Popen(
+                [sys.executable, agent_file],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1
+            )
+        # Made when it's first offered, and kept for the agent's later games
+        self.shared_memory_ring = SharedMemoryRing() if shared_memory else None
+        self.output_lines = queue.Queue()
+        self.output_closed = False
+
+        self.stderr_log_max_bytes = stderr_log_max_bytes
+        self.stderr_log = RotatingLogFile(stderr_log_path, stderr_log_max_bytes) if stderr_log_path else None
+        # The log is switched to another file when the agent starts a new game
+        self.stderr_log_lock = threading.Lock()
+        self.stderr_tail = collections.deque()
+        self.stderr_tail_length = 0
+        if self.process:
+            self.start_readers()
+
+    # Start the threads reading the agent's output and stderr
+    def start_readers(self) -> None:
+        threading.Thread(target=self.read_output, daemon=True).start()
+        self.stderr_reader = threading.Thread(target=self.drain_stderr, daemon=True)
+        self.stderr_reader.start()
+
+    # Wait for a listened for agent to connect, up to init_timeout after it started being listened for
+    def accept_connection(self) -> None:
+        timeout = None if self.init_timeout is None else max(self.sent_time + self.init_timeout - time.perf_counter(), 0)
+        listener, self.listener = self.listener, None
+        connection = listener.accept(timeout)
+        self.process = connection or AgentSocket.NoConnection()
+        self.start_readers()
+        if connection is None:
+            self.disqualify(f'did not connect within {self.init_timeout}s')
+
+    # Everything that's kept per game
+    def reset_game_stats(self) -> None:
+        # Answers that missed their deadline and haven't come in yet
+        self.late_answers = 0
+        # Seconds the agent took to send its team name, and to answer each turn
+        self.init_time = None
+        self.think_times = []
+        self.missed_deadlines = 0
+        # Set once the agent is stopped for missing deadlines, it does nothing for the rest of the game
+        self.disqualified = False
+        # Set by the handshake, see read_team_name
+        self.wire_format = 'json'
+        self.accepts_new_game = False
+        self.uses_shared_memory = False
+
+    # Runs on its own thread until the agent's output is closed
+    def read_output(self) -> None:
+        for line in self.process.stdout:
+            self.output_lines.put((line.strip(), time.perf_counter()))
+        self.output_closed = True
+        self.output_lines.put(None)
+
+    # Runs on its own thread until the agent's stderr is closed
+    def drain_stderr(self) -> None:
+        for line in self.process.stderr:
+            with self.stderr_log_lock:
+                if self.stderr_log:
+                    self.stderr_log.write(line)
+            self.stderr_tail.append(line)
+            self.stderr_tail_length += len(line)
+            while self.stderr_tail_length > AgentProcess.STDERR_TAIL_BYTES and len(self.stderr_tail) > 1:
+                self.stderr_tail_length -= len(self.stderr_tail.popleft())
+        with self.stderr_log_lock:
+            if self.stderr_log:
+                self.stderr_log.close()
+                self.stderr_log = None
+
+    # Next line the agent printed, waiting for it if needed, up to `timeout` seconds after sent_time.
+    # Returns an empty string once the agent's output is closed (it died or exited), and None if the time ran out.
+    def read_line(self, timeout: float = None) -> str:
+        while True:
+            try:
+                if timeout is None:
+                    output = self.output_lines.get()
+                else:
+                    output = self.output_lines.get(timeout=max(self.sent_time + timeout - time.perf_counter(), 0))
+            except queue.Empty:
+                return None
+            if output is None:
+                # Leave the marker for the next call
+                self.output_lines.put(None)
+                return ""
+            line, arrival_time = output
+            if self.late_answers > 0:
+                self.late_answers -= 1
+                continue
+            self.last_line_time = arrival_time
+            return line
+
+    # This turn's action, or None if the agent missed the deadline.
+    # Missing `max_missed_deadlines` deadlines disqualifies the agent.
+    def read_action(self, timeout: float = None, max_missed_deadlines: int = None) -> str:
+        line = self.read_line(timeout)
+        if line is None:
+            self.late_answers += 1
+            self.missed_deadlines += 1
+            GameLog.error(GameLog.AGENT, 'Agent {} missed the {}s deadline! Agent {} forfeits their turn!', self.agent_number, timeout, self.agent_number)
+            if max_missed_deadlines is not None and self.missed_deadlines >= max_missed_deadlines:
+                self.disqualify(f'missed {self.missed_deadlines} deadlines')
+            return None
+        if line:
+            self.think_times.append(self.last_line_time - self.sent_time)
+            # If the agent isn't sent anything before its next answer (the first turn), that's timed from here
+            self.sent_time = self.last_line_time
+        return line
+
+    # Wait for the agent's action for this turn. If it doesn't send a valid one, it does nothing this turn.
+    def get_action(self, timeout: float = None, max_missed_deadlines: int = None) -> AIAction:
+        if self.disqualified:
+            return AIAction('nothing',0,0)
+        action_string = ""
+        try:
+            action_string = self.read_action(timeout, max_missed_deadlines)
+
+            # The agent took too long, it already forfeits this turn
+            if action_string is None:
+                return AIAction('nothing',0,0)
+
+            # Check if agent died (an empty line means the process ended)
+            if not action_string:
+                GameLog.error(GameLog.AGENT, 'Agent {} process died or produced no output!', self.agent_number)
+                # Read stderr to see what went wrong
+                stderr_output = self.read_stderr()
+                if stderr_output:
+                    GameLog.error(GameLog.AGENT, 'Agent {} stderr: {}', self.agent_number, stderr_output)
+        except Exception as e:
+            GameLog.error(GameLog.AGENT, 'Error reading from Agent {}: {}', self.agent_number, e)
+            action_string = ""
+
+        action = AIAction('nothing',0,0)
+        try:
+            action = AIAction.from_json(action_string)
+        except Exception as e:
+            GameLog.error(GameLog.AGENT, 'Agent {} produced invalid JSON! Agent {} forfeits their turn! Error: {}', self.agent_number, self.agent_number, e)
+        return action
+
+    # Stop the agent, it does nothing for the rest of the game
+    def disqualify(self, reason: str) -> None:
+        GameLog.error(GameLog.AGENT, 'Agent {} is disqualified, it {}!', self.agent_number, reason)
+        self.disqualified = True
+        self.terminate()
+
+    # The last few KB the agent wrote to stderr since this was last called. Meant for after it died,
+    # this waits up to a second for stderr to close so the end of a traceback isn't cut off.
+    def read_stderr(self) -> str:
+        self.stderr_reader.join(timeout=1)
+        stderr_output = ''.join(self.stderr_tail)
+        self.stderr_tail.clear()
+        self.stderr_tail_length = 0
+        return stderr_output
+
+    # Times are taken before writing, since the agent can answer before the write returns
+    def send_initial_state(self, team_line: str, initial_state_json: str) -> None:
+        if self.listener:
+            self.accept_connection()
+            if self.disqualified:
+                return
+        if self.shared_memory_ring:
+            # Only this agent's copy has the path of its ring
+            initial_state_json = initial_state_json[:-1] + ', "SharedMemory": ' + json.dumps(self.shared_memory_ring.path) + '}'
+        self.sent_time = time.perf_counter()
+        self.process.stdin.write(team_line + "\n")
+        self.process.stdin.write(initial_state_json + "\n--END INITIAL GAME STATE--\n")
+        self.process.stdin.flush()
+
+    # Read the agent's answer to the initial game state. Before its team name, an agent can send
+    #   "--WIRE FORMAT: <format>--" to ask for a wire format other than JSON, see WireFormat.py
+    #   "--NEW GAME OK--" if it can be sent "--NEW GAME--" after this game, see new_game
+    #   "--SHARED MEMORY OK--" to be sent the game state through shared memory, see WireFormat.py
+    # if the initial state offered them ("WireFormats", "NewGame" and "SharedMemory").
+    # Returns the team name, which is empty if the agent didn't answer or missed the deadline, which disqualifies it.
+    def read_team_name(self, timeout: float = None) -> str:
+        line = self.read_line(timeout)
+        while line:
+            if line.startswith('--WIRE FORMAT: ') and line.endswith('--'):
+                wire_format = line[len('--WIRE FORMAT: '):-2]
+                if wire_format in WireFormat.FORMATS:
+                    self.wire_format = wire_format
+                else:
+                    GameLog.error(GameLog.AGENT, 'Agent {} asked for unknown wire format {}! Sending JSON instead.', self.agent_number, wire_format)
+            elif line == '--NEW GAME OK--':
+                self.accepts_new_game = True
+            elif line == '--SHARED MEMORY OK--' and self.shared_memory_ring:
+                self.uses_shared_memory = True
+            else:
+                break
+            line = self.read_line(timeout)
+        if line is None:
+            self.disqualify(f'took longer than {timeout}s to initialize')
+            return ""
+        if self.uses_shared_memory and self.wire_format not in WireFormat.FRAMED_FORMATS:
+            GameLog.error(GameLog.AGENT, 'Agent {} asked for shared memory without a framed wire format! Sending it through the pipe instead.', self.agent_number)
+            self.uses_shared_memory = False
+        if line:
+            self.init_time = self.last_line_time - self.sent_time
+            self.sent_time = self.last_line_time
+        return line
+
+    # Wait for the agent's team name, once it has been sent the initial game state
+    def get_team_name(self, team_description: str, timeout: float = None) -> str:
+        try:
+            team_name = self.read_team_name(timeout)
+            if not team_name:
+                GameLog.error(GameLog.AGENT, 'Agent {} failed to provide team name!', self.agent_number)
+                stderr_output = self.read_stderr()
+                if stderr_output:
+                    GameLog.error(GameLog.AGENT, 'Agent {} stderr: {}', self.agent_number, stderr_output)
+                team_name = f"Agent {self.agent_number} ({team_description}) - ERROR"
+        except Exception as e:
+            GameLog.error(GameLog.AGENT, 'Error initializing Agent {}: {}', self.agent_number, e)
+            team_name = f"Agent {self.agent_number} ({team_description}) - ERROR"
+        return team_name
+
+    # Send this turn's game state, in the wire format the agent asked for.
+    # The JSON is the same string that was printed for the visualizer at the end of last turn.
+    def send_game_state(self, game) -> None:
+        self.sent_time = time.perf_counter()
+        if self.wire_format in WireFormat.FRAMED_FORMATS:
+            message = game.game_state_to_binary() if self.wire_format == 'binary' else game.game_state_to_framed_json()
+            if self.uses_shared_memory:
+                # The length, then where the rest of the message is
+                offset = self.shared_memory_ring.write(memoryview(message)[WireFormat.LENGTH.size:])
+                if offset is None:
+                    message = message[:WireFormat.LENGTH.size] + WireFormat.OFFSET.pack(WireFormat.IN_PIPE) + message[WireFormat.LENGTH.size:]
+                else:
+                    message = message[:WireFormat.LENGTH.size] + WireFormat.OFFSET.pack(offset)
+            self.process.stdin.buffer.write(message)
+            self.process.stdin.buffer.flush()
+        else:
+            self.process.stdin.write(game.game_state_to_json() + "\n--END OF TURN--\n")
+            self.process.stdin.flush()
+
+    # Whether the agent can be sent new_game: it accepted it in the handshake, is still running,
+    # and isn't in the middle of answering a turn it missed the deadline for.
+    # A closed output also counts as not running, the process can take a moment to be reported as exited after that.
+    def can_start_new_game(self) -> bool:
+        return self.accepts_new_game and not self.disqualified and self.late_answers == 0 and not self.output_closed and self.process.poll() is None
+
+    # Tell the agent to get ready for another game, instead of starting a new process.
+    # It's sent "--NEW GAME--" where it expects the next turn's state (an empty message in the framed formats),
+    # then the initial state of the next game like a newly started agent.
+    def new_game(self, agent_number: int, stderr_log_path: str = None) -> None:
+        if self.wire_format in WireFormat.FRAMED_FORMATS:
+            self.process.stdin.buffer.write(WireFormat.LENGTH.pack(0))
+            self.process.stdin.buffer.flush()
+        else:
+            self.process.stdin.write("--NEW GAME--\n")
+            self.process.stdin.flush()
+        self.agent_number = agent_number
+        self.games_started += 1
+        self.reset_game_stats()
+        self.stderr_tail.clear()
+        self.stderr_tail_length = 0
+        with self.stderr_log_lock:
+            if self.stderr_log:
+                self.stderr_log.close()
+            self.stderr_log = RotatingLogFile(stderr_log_path, self.stderr_log_max_bytes) if stderr_log_path else None
+
+    # Resident memory of the agent process in bytes, or None where that can't be read (only Linux has /proc)
+    def memory_usage(self) -> int:
+        try:
+            with open(f'/proc/{self.process.pid}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    # Summary of how long the agent took to answer, in seconds
+    def think_time_stats(self) -> dict:
+        times = sorted(self.think_times)
+        stats = {
+            "InitTime" : self.init_time,
+            "Turns" : len(times),
+            "Min" : None,
+            "Mean" : None,
+            "P95" : None,
+            "Max" : None,
+            "MissedDeadlines" : self.missed_deadlines,
+            "Disqualified" : self.disqualified
+        }
+        if times:
+            stats["Min"] = times[0]
+            stats["Mean"] = sum(times) / len(times)
+            # nearest-rank 95th percentile
+            stats["P95"] = times[max(math.ceil(len(times) * 0.95) - 1, 0)]
+            stats["Max"] = times[-1]
+        return stats
+
+    def terminate(self) -> None:
+        if self.listener:
+            # Never sent the initial state
+            self.listener.close()
+            self.listener = None
+            self.process = AgentSocket.NoConnection()
+        self.process.terminate()
+        self.process.wait()
+        if self.shared_memory_ring:
+            self.shared_memory_ring.close()
+
+
+# Text file that's moved to <path>.1 and started over once it reaches max_bytes,
+# so a chatty agent can't fill the disk. Overwrites the files from the previous match.
+class RotatingLogFile:
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.file = open(path, 'w', buffering=1)
+        self.size = 0
+
+    def write(self, text: str) -> None:
+        if self.size > 0 and self.size + len(text) > self.max_bytes:
+            self.file.close()
+            os.replace(self.path, self.path + '.1')
+            self.file = open(self.path, 'w', buffering=1)
+            self.size = 0
+        self.file.write(text)
+        self.size += len(text)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
@@ -0,0 +1,130 @@
+import io
+import os
+import socket
+import struct
+
+# Agents that are already running, instead of started by the backend: a long-lived agent (say one that keeps a
+# model loaded) plays one game after another, each on its own connection to a unix socket, in the same format
+# as the agents started by the backend get on their stdin and stdout. Either side can be the one listening:
+#   python3 AgentTemplate.py --listen agent.sock
+#   python3 main.py map.json --agent_1_socket agent.sock -a2 ...            connects to the agent
+# or
+#   python3 main.py map.json --agent_1_socket agent.sock --listen -a2 ...   waits for the agent to connect
+#   python3 AgentTemplate.py --connect agent.sock
+#
+# The agent's stderr stays with the agent, the backend only sees what it sends on the socket.
+# Only works where Python has unix sockets (not on Windows).
+
+# Struct ucred, for the pid of the agent on the other end
+PEER_CREDENTIALS = struct.Struct('3i')
+
+
+# Connect to an agent listening on socket_path
+def connect(socket_path: str) -> 'AgentConnection':
+    if not hasattr(socket, 'AF_UNIX'):
+        raise Exception('Connecting to agents needs unix sockets, which this platform doesn\'t have')
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except Exception:
+        connection.close()
+        raise
+    return AgentConnection(connection)
+
+
+# Listens on a unix socket for one agent to connect, from when it's made, so the agent can connect before it's
+# waited for (main.py listens for both agents before waiting for either).
+class AgentListener:
+    def __init__(self, socket_path: str) -> None:
+        if not hasattr(socket, 'AF_UNIX'):
+            raise Exception('Connecting to agents needs unix sockets, which this platform doesn\'t have')
+        self.socket_path = socket_path
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.server.bind(socket_path)
+            self.server.listen(1)
+        except Exception:
+            self.server.close()
+            raise
+
+    # Wait for the agent to connect, up to `timeout` seconds. Returns None if it didn't.
+    # Stops listening either way.
+    def accept(self, timeout: float = None) -> 'AgentConnection':
+        self.server.settimeout(timeout)
+        try:
+            connection, _ = self.server.accept()
+        except socket.timeout:
+            return None
+        finally:
+            self.close()
+        connection.settimeout(None)
+        return AgentConnection(connection)
+
+    def close(self) -> None:
+        if self.server.fileno() != -1:
+            self.server.close()
+            # Nobody else should connect to it, the next game makes it again
+            os.unlink(self.socket_path)
+
+
+# Stands in for the subprocess.Popen of an agent on a socket, with the parts of it AgentProcess uses.
+# Stopping it only hangs up, the agent keeps running for its next game.
+class AgentConnection:
+    def __init__(self, connection: socket.socket) -> None:
+        self.connection = connection
+        self.stdin = connection.makefile('w', encoding='utf-8', newline='\n')
+        self.stdout = connection.makefile('r', encoding='utf-8')
+        self.stderr = io.StringIO()
+        self.pid = None
+        self.returncode = None
+        if hasattr(socket, 'SO_PEERCRED'):
+            # Linux only, for AgentProcess.memory_usage
+            self.pid, _, _ = PEER_CREDENTIALS.unpack(connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, PEER_CREDENTIALS.size))
+
+    def poll(self) -> int:
+        return self.returncode
+
+    def wait(self, timeout: float = None) -> int:
+        return self.returncode
+
+    def terminate(self) -> None:
+        if self.returncode is None:
+            try:
+                # Wakes up AgentProcess.read_output, which is still reading
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                self.stdin.close()
+            except OSError:
+                pass
+            # The socket is closed once read_output is done with stdout too
+            self.connection.close()
+            self.returncode = 0
+
+    def kill(self) -> None:
+        self.terminate()
+
+
+# Stands in for the subprocess.Popen of an agent that never connected, like one that exited without printing anything
+class NoConnection:
+    def __init__(self) -> None:
+        self.stdin = io.StringIO()
+        self.stdout = io.StringIO()
+        self.stderr = io.StringIO()
+        self.pid = None
+        self.returncode = 0
+
+    def poll(self) -> int:
+        return self.returncode
+
+    def wait(self, timeout: float = None) -> int:
+        return self.returncode
+
+    def terminate(self) -> None:
+        pass
+
+    def kill(self) -> None:
+        pass
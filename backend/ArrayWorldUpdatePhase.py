@@ -0,0 +1,270 @@
+# Phase 3, numpy engine | Same rules as WorldUpdatePhase.py, resolved as array operations over an EntityStore
+# CheckEngines.py plays both engines side by side and checks that every turn comes out the same.
+
+import numpy as np
+from GameState import GameState
+from EntityStore import (
+    EntityStore,
+    KIND_MERC, KIND_DEMON, TEAM_R, TEAM_B,
+    STATE_MOVING, STATE_FIGHTING, STATE_WAITING, STATE_DEAD
+)
+from WorldUpdatePhase import check_wincon
+from SpawnMercenaries import spawn_mercenaries
+from SpawnDemons import spawn_demons
+from Tower import Tower
+from House import House
+from Church import Church
+from Cannon import Cannon
+from Minigun import Minigun
+import GameLog
+import Constants
+
+
+def array_world_update_phase(game_state: GameState, provoke_demons: bool):
+    # check_wincon() writes victory_reason and its result goes into victory.
+    # The store itself isn't journaled, Game.undo_turn drops it and it is rebuilt from the objects.
+    if game_state.journal is not None: game_state.journal.attrs(game_state, ('mercs', 'demons', 'victory', 'victory_reason'))
+
+    # remove dead entities from respective lists
+    game_state.mercs = [m for m in game_state.mercs if m.state != "dead"]
+    game_state.demons = [d for d in game_state.demons if d.state != "dead"]
+
+    if getattr(game_state, 'entity_store', None) is None:
+        game_state.entity_store = EntityStore(game_state)
+    store: EntityStore = game_state.entity_store
+    store.pull(game_state)
+    grid_before = store.id_grid.copy()
+
+    update_units(game_state, store, KIND_MERC)
+    array_mortal_wound_check(store)
+    if base_destroyed(game_state):
+        store.push(game_state, grid_before)
+        game_state.victory = check_wincon(game_state)
+        return
+
+    update_units(game_state, store, KIND_DEMON)
+    array_mortal_wound_check(store)
+    if base_destroyed(game_state):
+        store.push(game_state, grid_before)
+        game_state.victory = check_wincon(game_state)
+        return
+
+    # Spawning is a handful of objects per turn, so it goes through the regular spawn functions
+    # against an up-to-date entity grid, and the new units are then registered with the store
+    store.push_grid(game_state, grid_before)
+    spawn_mercenaries(game_state)
+    spawn_demons(game_state, provoke_demons)
+    store.register(game_state.mercs + game_state.demons)
+    grid_before = store.id_grid.copy()
+
+    if len(store.tower_tiles) > len(game_state.towers):
+        store.tower_tiles = {}
+    for tower in game_state.towers:
+        update_tower(game_state, store, tower)
+    array_mortal_wound_check(store)
+    store.push(game_state, grid_before)
+    game_state.victory = None
+
+
+# check_wincon() only ever returns a winner once a base is at 0 health
+def base_destroyed(game_state: GameState) -> bool:
+    return game_state.player_base_r.health <= 0 or game_state.player_base_b.health <= 0
+
+
+def update_units(game_state: GameState, store: EntityStore, kind: int):
+    deciding = np.flatnonzero(store.listed & (store.kind == kind) & (store.state != STATE_DEAD))
+    if len(deciding) == 0: return
+
+    # Whatever stands 1 and 2 tiles ahead; a unit at the end of its lane sees itself
+    ahead1 = store.occupants_ahead(deciding, 1)
+    ahead2 = store.occupants_ahead(deciding, 2)
+    has1 = ahead1 >= 0
+    has2 = ahead2 >= 0
+    kind1 = np.where(has1, store.kind[ahead1], -1)
+    kind2 = np.where(has2, store.kind[ahead2], -1)
+    same_team1 = store.team[ahead1] == store.team[deciding]
+    same_team2 = store.team[ahead2] == store.team[deciding]
+    at_base = store.next_to_enemy_base(deciding)
+
+    if kind == KIND_MERC:
+        # fighting if rival merc or demon targeting us is within 1 space,
+        # waiting behind a demon that targets the other team
+        fighting = has1 & (((kind1 == KIND_DEMON) & same_team1) | ((kind1 == KIND_MERC) & ~same_team1))
+        blocked = has1 & (kind1 == KIND_DEMON) & ~same_team1
+        blocked_state = STATE_WAITING
+        rival2 = (kind2 == KIND_MERC) & ~same_team2
+    else:
+        # fighting if a rival demon or any merc is within 1 space
+        fighting = has1 & (((kind1 == KIND_DEMON) & ~same_team1) | (kind1 == KIND_MERC))
+        blocked = np.zeros(len(deciding), dtype=bool)
+        blocked_state = STATE_FIGHTING
+        rival2 = (kind2 == KIND_DEMON) & ~same_team2
+    # fighting if there is no enemy 1 space away, and the base or an enemy is within 2 spaces
+    fighting |= ~has1 & (at_base | (has2 & rival2))
+
+    # A unit that stops blocks the contiguous run of teammates behind it (block_entity_behind).
+    # Every row on the grid takes part in the run, including provoked demons that were never removed.
+    # Each row points at the teammate directly ahead of it, pointer jumping then finds the run's front.
+    grid_rows = np.flatnonzero((store.kind == kind) & store.on_grid())
+    front = np.arange(store.size)
+    grid_ahead = store.occupants_ahead(grid_rows, 1)
+    follows = (
+        (grid_ahead >= 0) & (grid_ahead != grid_rows) &
+        (store.kind[grid_ahead] == kind) & (store.team[grid_ahead] == store.team[grid_rows])
+    )
+    front[grid_rows[follows]] = grid_ahead[follows]
+    while True:
+        next_front = front[front]
+        if np.array_equal(next_front, front): break
+        front = next_front
+
+    stopped = np.zeros(store.size, dtype=bool)
+    stopped[deciding] = fighting | blocked
+    chained = np.zeros(store.size, dtype=bool)
+    chained[grid_rows[follows]] = stopped[front[grid_rows[follows]]]
+
+    new_state = np.where(fighting, STATE_FIGHTING, np.where(blocked, blocked_state, STATE_MOVING))
+    new_state = np.where(chained[deciding] & (new_state == STATE_MOVING), blocked_state, new_state)
+    store.state[deciding] = new_state
+    # provoked demons left on the grid get dragged into the run as well
+    ghosts = grid_rows[chained[grid_rows] & ~store.listed[grid_rows]]
+    store.state[ghosts] = blocked_state
+
+    # Move all units in moving state
+    movers = deciding[new_state == STATE_MOVING]
+    if len(movers) != 0:
+        new_x, new_y, new_pos = store.tiles_ahead(movers, 1)
+        store.id_grid[store.y[movers], store.x[movers]] = -1
+        store.id_grid[new_y, new_x] = movers
+        store.x[movers] = new_x
+        store.y[movers] = new_y
+        store.pos[movers] = new_pos
+
+    # Apply combat effects for all units in fighting state, against the grid after moving
+    attackers = deciding[new_state == STATE_FIGHTING]
+    if len(attackers) == 0: return
+    target1 = store.occupants_ahead(attackers, 1)
+    target2 = store.occupants_ahead(attackers, 2)
+    target = np.where(target1 >= 0, target1, target2)
+    hits = target >= 0
+    np.subtract.at(store.health, target[hits], store.attack_pow[attackers[hits]])
+
+    # attack the player base if we have reached the end of the path, and there is nobody else to fight
+    sieging = attackers[~hits & store.next_to_enemy_base(attackers)]
+    if len(sieging) == 0: return
+    if kind == KIND_MERC:
+        damage = np.full(len(sieging), Constants.MERCENARY_ATTACK_POWER)
+    else:
+        damage = store.attack_pow[sieging]
+    heading_b = store.dir[sieging] == 1
+    if game_state.journal is not None:
+        game_state.journal.attr(game_state.player_base_b, 'health')
+        game_state.journal.attr(game_state.player_base_r, 'health')
+    if heading_b.any():
+        game_state.player_base_b.health -= int(damage[heading_b].sum())
+        GameLog.info(GameLog.COMBAT, '{} was attacked by {} units', game_state.player_base_b.name, int(heading_b.sum()))
+    if (~heading_b).any():
+        game_state.player_base_r.health -= int(damage[~heading_b].sum())
+        GameLog.info(GameLog.COMBAT, '{} was attacked by {} units', game_state.player_base_r.name, int((~heading_b).sum()))
+
+
+def array_mortal_wound_check(store: EntityStore):
+    dying = np.flatnonzero(store.listed & (store.health <= 0) & (store.state != STATE_DEAD))
+    if len(dying) == 0: return
+    store.id_grid[store.y[dying], store.x[dying]] = -1
+    store.state[dying] = STATE_DEAD
+    for row in dying.tolist():
+        GameLog.info(GameLog.COMBAT, "{} has suffered mortal wounds", store.objects[row].name)
+
+
+def update_tower(game_state: GameState, store: EntityStore, tower: Tower):
+    # Houses only produce money
+    if isinstance(tower, House):
+        tower.update(game_state)
+        return
+
+    if game_state.journal is not None: game_state.journal.tower(tower)
+
+    if tower.current_cooldown > 0:
+        tower.current_cooldown -= 1
+        if not isinstance(tower, Church):
+            tower.targets = []
+        return
+
+    tiles = tower_tile_arrays(store, tower)
+    occupants = store.id_grid[tiles[1], tiles[0]]
+    occupants = occupants[occupants >= 0]
+
+    if isinstance(tower, Church):
+        buffed = occupants[
+            (store.kind[occupants] == KIND_MERC) &
+            (store.state[occupants] != STATE_DEAD) &
+            (store.team[occupants] == team_code(tower.team))
+        ]
+        if len(buffed) == 0: return
+        store.health[buffed] += Constants.CHURCH_BUFF_HEALTH
+        store.attack_pow[buffed] += Constants.CHURCH_BUFF_DAMAGE
+        buffed_targets = list(zip(store.x[buffed].tolist(), store.y[buffed].tolist()))
+        tower.targets.extend(buffed_targets)
+        tower.last_buffed_targets = buffed_targets
+        tower.current_cooldown = tower.cooldown_max
+        GameLog.debug(GameLog.TOWER, 'Church {} buffed {} mercs', tower.name, len(buffed))
+        return
+
+    # Enemy mercs, and demons that target the tower's team
+    is_merc = store.kind[occupants] == KIND_MERC
+    same_team = store.team[occupants] == team_code(tower.team)
+    targets = occupants[(is_merc & ~same_team) | (~is_merc & same_team)]
+
+    if isinstance(tower, Minigun):
+        if len(tiles[0]) != 0:
+            tower.current_cooldown = tower.cooldown_max
+        if len(targets) == 0: return
+        store.health[targets] -= tower.attack_pow
+        hit_targets = list(zip(store.x[targets].tolist(), store.y[targets].tolist()))
+        tower.targets.extend(hit_targets)
+        tower.last_hit_targets = hit_targets
+        GameLog.debug(GameLog.TOWER, 'Tower {} hit {} targets for {} damage', tower.name, len(targets), tower.attack_pow)
+        return
+
+    if len(targets) == 0: return
+
+    # Same priority as Tower.shoot_single_priority_target: closest to the base, most health,
+    # highest attack power, then a random tiebreaker drawn per candidate in path order
+    progress = store.pos[targets] if tower.team == 'r' else -store.pos[targets]
+    if game_state.journal is not None: game_state.journal.rng(game_state.rng)
+    tiebreak = [game_state.rng.random() for _ in range(len(targets))]
+    order = np.lexsort((tiebreak, -store.attack_pow[targets], -store.health[targets], progress))
+    target = int(targets[order[0]])
+
+    store.health[target] -= tower.attack_pow
+    tower.current_cooldown = tower.cooldown_max
+    tower.targets.append((int(store.x[target]), int(store.y[target])))
+
+    if isinstance(tower, Cannon):
+        # Splash hits the tiles ahead of and behind the target, along the target's own lane
+        target_rows = np.array([target, target])
+        xs, ys, _ = store.tiles_ahead(target_rows, 1)
+        back_xs, back_ys, _ = store.tiles_ahead(target_rows, -1)
+        for splashed in (int(store.id_grid[ys[0], xs[0]]), int(store.id_grid[back_ys[0], back_xs[0]])):
+            if splashed < 0: continue
+            if store.kind[splashed] == KIND_DEMON or store.team[splashed] != team_code(tower.team):
+                store.health[splashed] -= tower.attack_pow
+
+    tower.last_hit_targets = [(int(store.x[target]), int(store.y[target]))]
+    GameLog.debug(GameLog.TOWER, 'Tower {} hit {} for {} damage', tower.name, store.objects[target].name, tower.attack_pow)
+
+
+def team_code(team_color: str) -> int:
+    return TEAM_R if team_color == 'r' else TEAM_B
+
+
+# Path tiles in a tower's range as (xs, ys) arrays, cached per tower object
+def tower_tile_arrays(store: EntityStore, tower: Tower):
+    cached = store.tower_tiles.get(id(tower))
+    if cached is None or cached[0] is not tower:
+        xs = np.array([path[0] for path in tower.path], dtype=np.int64)
+        ys = np.array([path[1] for path in tower.path], dtype=np.int64)
+        cached = (tower, (xs, ys))
+        store.tower_tiles[id(tower)] = cached
+    return cached[1]
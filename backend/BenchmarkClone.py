@@ -0,0 +1,81 @@
+from Game import Game
+from AIAction import AIAction
+import os
+import sys
+import copy
+import time
+import random
+import argparse
+import contextlib
+
+# Measures GameState.clone() and apply_turn/undo_turn against one run_turn, copy.deepcopy and loading a fresh Game.
+# The state is taken from the middle of a real game between two agents, so it has units and towers.
+
+import RunMatches
+
+
+# Plays agent 1 against agent 2 until `turns` turns have passed, or the game ends, and returns the game
+def play_until(agent_file_1: str, agent_file_2: str, map_json_file: str, turns: int, seed: int) -> Game:
+    random.seed(seed)
+    game = Game(map_json_file, seed=seed)
+    agents = [RunMatches.load_agent_module(agent_file_1).Agent(), RunMatches.load_agent_module(agent_file_2).Agent()]
+    for agent, team_color in zip(agents, ['r', 'b']):
+        agent.initialize_and_set_name(game.game_state_to_dict(), team_color)
+
+    for _ in range(turns):
+        if game.game_state.is_game_over(): break
+        actions = []
+        for agent in agents:
+            try:
+                actions.append(AIAction.from_dict(agent.do_turn(game.game_state_to_dict()).to_dict()))
+            except Exception:
+                actions.append(AIAction('nothing', 0, 0))
+        game.run_turn(actions[0], actions[1])
+    return game
+
+
+# Average seconds per call of fn over `repeat` calls
+def time_per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark GameState.clone() and apply_turn/undo_turn against one run_turn.')
+    parser.add_argument('map_json_file', help='Path to the map JSON file')
+    parser.add_argument('-a1', '--ai_agent_file_1', default='../AI_Agents/ExampleAgentRuleBased.py')
+    parser.add_argument('-a2', '--ai_agent_file_2', default='../AI_Agents/ExampleAgentRuleBased.py')
+    parser.add_argument('-t', '--turns', type=int, default=40, help='How many turns to play before measuring')
+    parser.add_argument('-r', '--repeat', type=int, default=1000, help='How many times to repeat each measurement')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+        game = play_until(args.ai_agent_file_1, args.ai_agent_file_2, args.map_json_file, args.turns, args.seed)
+        state = game.game_state
+
+        clone_time = time_per_call(state.clone, args.repeat)
+        deepcopy_time = time_per_call(lambda: copy.deepcopy(state), max(args.repeat // 100, 1))
+        load_time = time_per_call(lambda: Game(args.map_json_file), max(args.repeat // 10, 1))
+
+        # Each turn is played on a fresh clone, so every measurement starts from the same state
+        nothing = AIAction('nothing', 0, 0)
+        clones = [game.clone() for _ in range(args.repeat)]
+        start = time.perf_counter()
+        for cloned_game in clones:
+            cloned_game.run_turn(nothing, nothing)
+        turn_time = (time.perf_counter() - start) / args.repeat
+
+        def apply_and_undo():
+            game.apply_turn(nothing, nothing)
+            game.undo_turn()
+        journal_time = time_per_call(apply_and_undo, args.repeat)
+
+    print(f"State after {args.turns} turns: {len(state.mercs)} mercenaries, {len(state.demons)} demons, {len(state.towers)} towers")
+    print(f"run_turn:            {turn_time * 1e6:10.1f} us")
+    print(f"GameState.clone():   {clone_time * 1e6:10.1f} us  ({clone_time / turn_time:.2f}x run_turn)")
+    print(f"apply + undo_turn:   {journal_time * 1e6:10.1f} us  ({journal_time / turn_time:.2f}x run_turn)")
+    print(f"copy.deepcopy():     {deepcopy_time * 1e6:10.1f} us  ({deepcopy_time / turn_time:.2f}x run_turn)")
+    print(f"Game(map_json_file): {load_time * 1e6:10.1f} us  ({load_time / turn_time:.2f}x run_turn)")
@@ -6,7 +6,7 @@ from Crossbow import Crossbow
 from House import House
 from Minigun import Minigun
 from Church import Church
-from Utils import log_msg
+import GameLog
 import Constants
 
 # Phase 1: Build or Destroy Towers
@@ -44,15 +44,15 @@ def _build_tower(game_state: GameState, action: AIAction, is_red_player: bool) -
     
     # Validate placement
     if game_state.is_out_of_bounds(x,y):
-        log_msg(f"{player_name} player tried to build out-of-bounds at ({x}, {y})")
+        GameLog.warning(GameLog.ACTION, "{} player tried to build out-of-bounds at ({}, {})", player_name, x, y)
         return
 
     if game_state.floor_tiles[y][x] != current_team:
-        log_msg(f"{player_name} player tried to build outside their territory at ({x}, {y})")
+        GameLog.warning(GameLog.ACTION, "{} player tried to build outside their territory at ({}, {})", player_name, x, y)
         return
     
     if game_state.entity_grid[y][x] is not None:
-        log_msg(f"{player_name} player tried to build on occupied space at ({x}, {y})")
+        GameLog.warning(GameLog.ACTION, "{} player tried to build on occupied space at ({}, {})", player_name, x, y)
         return
     
     # Create the tower
@@ -61,22 +61,28 @@ def _build_tower(game_state: GameState, action: AIAction, is_red_player: bool) -
 
     # Check money
     if money < tower.get_price(game_state, current_team):
-        log_msg(f"{player_name} player doesn't have enough money to build {action.tower_type} (costs {tower.get_price(game_state, current_team)}, has {money})")
+        GameLog.warning(GameLog.ACTION, "{} player doesn't have enough money to build {} (costs {}, has {})", player_name, action.tower_type, tower.get_price(game_state, current_team), money)
         return
     
     # Build the tower
+    journal = game_state.journal
+    if journal is not None:
+        journal.extend(game_state.towers)
+        journal.tile(game_state.entity_grid, x, y)
     game_state.towers.append(tower)
     game_state.entity_grid[y][x] = tower
     
     # Deduct money
     if is_red_player:
+        if journal is not None: journal.attr(game_state, 'money_r')
         game_state.money_r -= tower.get_price(game_state, current_team)
     else:
+        if journal is not None: journal.attr(game_state, 'money_b')
         game_state.money_b -= tower.get_price(game_state, current_team)
 
     tower.increase_price(game_state, "r" if is_red_player else "b")
     
-    log_msg(f"{player_name} built a {action.tower_type} tower at ({x},{y})")
+    GameLog.info(GameLog.ACTION, "{} built a {} tower at ({},{})", player_name, action.tower_type, x, y)
 
 
 def _destroy_tower(game_state: GameState, action: AIAction, is_red_player: bool) -> None:
@@ -89,20 +95,20 @@ def _destroy_tower(game_state: GameState, action: AIAction, is_red_player: bool)
     
     # Validate destruction
     if game_state.is_out_of_bounds(x,y):
-        log_msg(f"{player_name} player tried to destroy out-of-bounds at ({x}, {y})")
+        GameLog.warning(GameLog.ACTION, "{} player tried to destroy out-of-bounds at ({}, {})", player_name, x, y)
         return
 
     if game_state.floor_tiles[y][x] != current_team:
-        log_msg(f"{player_name} player tried to destroy tower outside their territory at ({x}, {y})")
+        GameLog.warning(GameLog.ACTION, "{} player tried to destroy tower outside their territory at ({}, {})", player_name, x, y)
         return
     
     tower = game_state.entity_grid[y][x]
     if tower is None:
-        log_msg(f"{player_name} player tried to destroy tower at empty location ({x}, {y})")
+        GameLog.warning(GameLog.ACTION, "{} player tried to destroy tower at empty location ({}, {})", player_name, x, y)
         return
     
     if not isinstance(tower, Tower):
-        log_msg(f"{player_name} player tried to destroy non-tower entity at ({x}, {y})")
+        GameLog.warning(GameLog.ACTION, "{} player tried to destroy non-tower entity at ({}, {})", player_name, x, y)
         return
     
     # Destroy the tower
@@ -118,16 +124,22 @@ def _destroy_tower(game_state: GameState, action: AIAction, is_red_player: bool)
     elif isinstance(tower, Church):
         refund = Constants.CHURCH_BASE_PRICE
 
+    journal = game_state.journal
+    if journal is not None:
+        journal.remove(game_state.towers, tower)
+        journal.tile(game_state.entity_grid, x, y)
     game_state.towers.remove(tower)
     game_state.entity_grid[y][x] = None
     
     # Refund money
     if is_red_player:
+        if journal is not None: journal.attr(game_state, 'money_r')
         game_state.money_r += refund
     else:
+        if journal is not None: journal.attr(game_state, 'money_b')
         game_state.money_b += refund
     
-    log_msg(f"{player_name} destroyed a tower at ({x},{y}) and was refunded ${refund}")
+    GameLog.info(GameLog.ACTION, "{} destroyed a tower at ({},{}) and was refunded ${}", player_name, x, y, refund)
 
 
 def _create_tower(tower_type: str, x: int, y: int, team_color: str, game_state: GameState) -> Tower:
@@ -146,5 +158,5 @@ def _create_tower(tower_type: str, x: int, y: int, team_color: str, game_state:
         return Church(x, y, team_color, game_state)
     else:
         team_name = 'Red' if team_color == 'r' else 'Blue'
-        log_msg(f"{team_name} team tried to build an invalid type of tower: {tower_type}")
+        GameLog.warning(GameLog.ACTION, "{} team tried to build an invalid type of tower: {}", team_name, tower_type)
         return None
\ No newline at end of file
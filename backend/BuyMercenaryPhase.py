@@ -1,6 +1,6 @@
 from GameState import GameState
 from AIAction import AIAction
-from Utils import log_msg
+import GameLog
 import Constants
 
 # Phase 2: Buy Mercenaries
@@ -35,7 +35,7 @@ def _process_mercenary_purchase(game_state: GameState, action: AIAction, is_red_
 
     # Check if player has enough money
     if money < 20:
-        log_msg(f"{player_name} tried to buy a merc, but had no money")
+        GameLog.warning(GameLog.ACTION, "{} tried to buy a merc, but had no money", player_name)
         return
     
     # Direction offsets: (dy, dx) since coordinates are (y, x) in tile_grid
@@ -47,7 +47,7 @@ def _process_mercenary_purchase(game_state: GameState, action: AIAction, is_red_
     }
     
     if action.merc_direction not in directions:
-        log_msg(f"Invalid direction specified by {player_name}: {action.merc_direction}")
+        GameLog.warning(GameLog.ACTION, "Invalid direction specified by {}: {}", player_name, action.merc_direction)
         return
     
     dx, dy = directions[action.merc_direction]
@@ -57,22 +57,29 @@ def _process_mercenary_purchase(game_state: GameState, action: AIAction, is_red_
     # Check if there's a path tile in that direction
     if (game_state.is_out_of_bounds(target_x, target_y) or
         game_state.floor_tiles[target_y][target_x] != "O"):
-        log_msg(f"{player_name} player tried to queue in direction {action.merc_direction}, but there was no path there")
+        GameLog.warning(GameLog.ACTION, "{} player tried to queue in direction {}, but there was no path there", player_name, action.merc_direction)
         return
     
     # Queue the mercenary and deduct money
+    journal = game_state.journal
     if action.merc_direction == "N":
+        if journal is not None: journal.attr(base, 'mercenary_queued_up')
         base.mercenary_queued_up += 1
     elif action.merc_direction == "S":
+        if journal is not None: journal.attr(base, 'mercenary_queued_down')
         base.mercenary_queued_down += 1
     elif action.merc_direction == "W":
+        if journal is not None: journal.attr(base, 'mercenary_queued_left')
         base.mercenary_queued_left += 1
     elif action.merc_direction == "E":
+        if journal is not None: journal.attr(base, 'mercenary_queued_right')
         base.mercenary_queued_right += 1
     
     if is_red_player:
+        if journal is not None: journal.attr(game_state, 'money_r')
         game_state.money_r -= Constants.MERCENARY_PRICE
     else:
+        if journal is not None: journal.attr(game_state, 'money_b')
         game_state.money_b -= Constants.MERCENARY_PRICE
     
-    log_msg(f"{player_name} queued a mercenary in direction {action.merc_direction}")
\ No newline at end of file
+    GameLog.info(GameLog.ACTION, "{} queued a mercenary in direction {}", player_name, action.merc_direction)
\ No newline at end of file
@@ -1,7 +1,6 @@
 import Constants
 from Tower import Tower
 from GameState import GameState
-from NameSelector import select_tower_name
 from Utils import get_increased_tower_price
 
 class Cannon(Tower):
@@ -17,15 +16,17 @@ class Cannon(Tower):
 
         self.radius = 2 # Cannon shots have a splash radius, this variable shows that
         
-        self.name = select_tower_name('CA', self.team)
+        self.name = game_state.name_selector.select_tower_name('CA', self.team)
 
     def get_price(self, game_state: GameState, team_color: str):
         return (game_state.cannon_price_r if team_color == "r" else game_state.cannon_price_b)
     
     def increase_price(self, game_state: GameState, team_color: str):
         if team_color == "r":
+            if game_state.journal is not None: game_state.journal.attr(game_state, 'cannon_price_r')
             game_state.cannon_price_r = get_increased_tower_price(game_state.cannon_price_r, Constants.TOWER_PRICE_PERCENT_INCREASE_PER_BUY)
         else:
+            if game_state.journal is not None: game_state.journal.attr(game_state, 'cannon_price_b')
             game_state.cannon_price_b = get_increased_tower_price(game_state.cannon_price_b, Constants.TOWER_PRICE_PERCENT_INCREASE_PER_BUY)
     
     def tower_activation(self, game_state: GameState):
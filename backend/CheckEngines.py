@@ -0,0 +1,60 @@
+from Game import Game
+from AIAction import AIAction
+import GameLog
+import glob
+import random
+import argparse
+
+# Checks the numpy world update engine (ArrayWorldUpdatePhase.py) against the python one (WorldUpdatePhase.py).
+# Both play the same map with the same seed and the same stream of random actions, and the game state JSON
+# has to be the same after every turn.
+
+TOWER_TYPES = ['crossbow', 'cannon', 'minigun', 'house', 'church']
+MERC_DIRECTIONS = ['N', 'S', 'E', 'W']
+
+
+# Random action for a team. Builds and destroys are on the team's own tiles, so most of them go through.
+# Mercenaries and provokes are rare enough that games usually last long enough to fill the map.
+def random_action(rng: random.Random, team_tiles: list) -> AIAction:
+    x, y = rng.choice(team_tiles)
+    merc_direction = rng.choice(MERC_DIRECTIONS) if rng.random() < 0.2 else ''
+    provoke_demons = rng.random() < 0.01
+    roll = rng.random()
+    if roll < 0.3:
+        return AIAction('build', x, y, rng.choice(TOWER_TYPES), merc_direction, provoke_demons)
+    if roll < 0.35:
+        return AIAction('destroy', x, y, '', merc_direction, provoke_demons)
+    return AIAction('nothing', 0, 0, '', merc_direction, provoke_demons)
+
+
+# Plays one game on each engine, raising an exception on the first turn their game states differ.
+# Returns the number of turns played.
+def check_game(map_json_file: str, seed: int, turns: int) -> int:
+    games = [Game(map_json_file, engine='python', seed=seed), Game(map_json_file, engine='numpy', seed=seed)]
+    floor_tiles = games[0].game_state.floor_tiles
+    team_tiles = {team: [(x, y) for y, row in enumerate(floor_tiles) for x, tile in enumerate(row) if tile == team] for team in ['r', 'b']}
+    rng = random.Random(seed)
+
+    for turn in range(1, turns + 1):
+        if games[0].game_state.is_game_over(): return turn - 1
+        action_r, action_b = random_action(rng, team_tiles['r']), random_action(rng, team_tiles['b'])
+        for game in games:
+            game.run_turn(action_r, action_b)
+        python_json, numpy_json = games[0].game_state_to_json(), games[1].game_state_to_json()
+        if python_json != numpy_json:
+            first_difference = next(i for i, (a, b) in enumerate(zip(python_json, numpy_json)) if a != b)
+            raise Exception(f'{map_json_file} seed {seed}: the engines differ after turn {turn}, python has {python_json[first_difference - 60:first_difference + 60]!r}, numpy has {numpy_json[first_difference - 60:first_difference + 60]!r}')
+    return turns
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that the numpy world update engine plays exactly like the python one.')
+    parser.add_argument('map_json_files', nargs='*', help='Paths to the map JSON files. Defaults to all the maps.')
+    parser.add_argument('-s', '--seeds', type=int, default=10, help='How many seeds to play on each map')
+    parser.add_argument('-t', '--turns', type=int, default=300, help='Most turns to play in each game')
+    args = parser.parse_args()
+
+    GameLog.configure(level=GameLog.OFF)
+    for map_json_file in args.map_json_files or sorted(glob.glob('../maps/*.json')):
+        turns_played = [check_game(map_json_file, seed, args.turns) for seed in range(args.seeds)]
+        print(f"{map_json_file}: both engines matched over {sum(turns_played)} turns of {args.seeds} games")
@@ -0,0 +1,61 @@
+from Game import Game
+import TowerCoverage
+import glob
+import math
+import argparse
+
+# Checks the precomputed TowerCoverage tables against the per-tile distance scan towers used to run when they were
+# built (Tower.find_all_paths_in_range), on every buildable tile of every map and for every tower range.
+# The old scan stopped one tile short on the +x/+y sides (range(x - r, x + r)); the reference here includes the
+# upper bound, like the table, and the number of tiles the old bound missed is reported.
+
+
+# The old sqrt-based circle scan over the floor grid, with the upper bound included when `inclusive`
+def scan_paths_in_range(game_state, x: int, y: int, tower_range: int, inclusive: bool = True) -> list:
+    paths = []
+    end = tower_range + 1 if inclusive else tower_range
+    for xi in range(x - tower_range, x + end):
+        for yi in range(y - tower_range, y + end):
+            if xi == x and yi == y: continue
+            if game_state.is_out_of_bounds(xi, yi): continue
+            if math.sqrt((xi - x) * (xi - x) + (yi - y) * (yi - y)) <= tower_range:
+                if game_state.floor_tiles[yi][xi] == 'O':
+                    paths.append((xi, yi))
+    return paths
+
+
+# Returns (tiles and ranges checked, path tiles the old exclusive scan missed) for one map, raising an exception
+# on the first table entry that differs from the scan
+def check_map(map_json_file: str) -> tuple:
+    game_state = Game(map_json_file).game_state
+    coverage = game_state.tower_coverage
+    lane_count = len(game_state.lanes)
+    checked = 0
+    missed_before = 0
+    for y, row in enumerate(game_state.floor_tiles):
+        for x, tile in enumerate(row):
+            if tile not in ['r', 'b']: continue
+            for tower_range in TowerCoverage.TOWER_RANGES:
+                table_paths = coverage.paths_in_range(x, y, tower_range)
+                scanned_paths = scan_paths_in_range(game_state, x, y, tower_range)
+                if sorted(table_paths) != sorted(scanned_paths):
+                    raise Exception(f'{map_json_file}: coverage of ({x}, {y}) with range {tower_range} is {sorted(table_paths)}, the scan finds {sorted(scanned_paths)}')
+
+                # Sorted by lane then position along the lane, dead ends last
+                lane_positions = [game_state.tile_lanes.get(path, (lane_count, 0)) for path in table_paths]
+                if lane_positions != sorted(lane_positions):
+                    raise Exception(f'{map_json_file}: coverage of ({x}, {y}) with range {tower_range} is not in lane order')
+
+                missed_before += len(scanned_paths) - len(scan_paths_in_range(game_state, x, y, tower_range, inclusive=False))
+                checked += 1
+    return checked, missed_before
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the precomputed tower coverage tables against a per-tile distance scan.')
+    parser.add_argument('map_json_files', nargs='*', help='Paths to the map JSON files. Defaults to all the maps.')
+    args = parser.parse_args()
+
+    for map_json_file in args.map_json_files or sorted(glob.glob('../maps/*.json')):
+        checked, missed_before = check_map(map_json_file)
+        print(f"{map_json_file}: {checked} tiles and ranges match the scan ({missed_before} path tiles were out of reach with the old exclusive bound)")
@@ -1,8 +1,8 @@
 import Constants
 from Tower import Tower
 from GameState import GameState
-from NameSelector import select_tower_name
-from Utils import log_msg, get_increased_tower_price
+from Utils import get_increased_tower_price
+import GameLog
 
 class Church(Tower):
     def __init__(self, x: int, y: int, team_color: str, game_state: GameState):
@@ -16,18 +16,21 @@ class Church(Tower):
         )
 
         self.angle = 0
-        self.name = select_tower_name('CH', self.team)
+        self.name = game_state.name_selector.select_tower_name('CH', self.team)
 
     def get_price(self, game_state: GameState, team_color: str):
         return (game_state.church_price_r if team_color == "r" else game_state.church_price_b)
 
     def increase_price(self, game_state: GameState, team_color: str):
         if team_color == "r":
+            if game_state.journal is not None: game_state.journal.attr(game_state, 'church_price_r')
             game_state.church_price_r = get_increased_tower_price(game_state.church_price_r, Constants.TOWER_PRICE_PERCENT_INCREASE_PER_BUY)
         else:
+            if game_state.journal is not None: game_state.journal.attr(game_state, 'church_price_b')
             game_state.church_price_b = get_increased_tower_price(game_state.church_price_b, Constants.TOWER_PRICE_PERCENT_INCREASE_PER_BUY)
     
     def update(self, game_state):
+        if game_state.journal is not None: game_state.journal.tower(self)
         if self.current_cooldown > 0:
             self.current_cooldown -= 1
         else:
@@ -36,7 +39,7 @@ class Church(Tower):
     def tower_activation(self, game_state : GameState):
         if self.team == "r":
             super().buff_nearby_targets(game_state)
-            log_msg(f'Church {self.name} buffed mercs for the Red team.')
+            GameLog.debug(GameLog.TOWER, 'Church {} buffed mercs for the Red team.', self.name)
         elif self.team == "b":
             super().buff_nearby_targets(game_state)
-            log_msg(f'Church {self.name} buffed mercs for the Blue team.')
\ No newline at end of file
+            GameLog.debug(GameLog.TOWER, 'Church {} buffed mercs for the Blue team.', self.name)
\ No newline at end of file
@@ -1,7 +1,6 @@
 import Constants
 from Tower import Tower
 from GameState import GameState
-from NameSelector import select_tower_name
 from Utils import get_increased_tower_price
 
 class Crossbow(Tower):
@@ -20,10 +19,12 @@ class Crossbow(Tower):
         
     def increase_price(self, game_state: GameState, team_color: str):
         if team_color == "r":
+            if game_state.journal is not None: game_state.journal.attr(game_state, 'crossbow_price_r')
             game_state.crossbow_price_r = get_increased_tower_price(game_state.crossbow_price_r, Constants.TOWER_PRICE_PERCENT_INCREASE_PER_BUY)
         else:
+            if game_state.journal is not None: game_state.journal.attr(game_state, 'crossbow_price_b')
             game_state.crossbow_price_b = get_increased_tower_price(game_state.crossbow_price_b, Constants.TOWER_PRICE_PERCENT_INCREASE_PER_BUY)
-        self.name = select_tower_name('CR', self.team)
+        self.name = game_state.name_selector.select_tower_name('CR', self.team)
     
     def tower_activation(self, game_state: GameState):
         super().shoot_single_priority_target(game_state)
\ No newline at end of file
@@ -2,7 +2,6 @@ import Constants
 from Entity import Entity
 from GameState import GameState
 from PlayerBase import PlayerBase
-from NameSelector import select_demon_name
 import Utils
 
 
@@ -14,37 +13,32 @@ class Demon:
         self.y = y
         self.target_team = target_team
         self.state = 'moving'
-        self.name = select_demon_name()
+        self.name = game_state.name_selector.select_demon_name()
+
+        # Which lane we are on, and how far along it. Kept up to date whenever we move.
+        self.lane, self.lane_pos = game_state.tile_lanes.get((self.x, self.y), (None, None))
+        self.current_path = game_state.lanes[self.lane] if self.lane != None else []
 
-        self.current_path = []
-        possible_paths = [
-            game_state.mercenary_path_down, 
-            game_state.mercenary_path_left,
-            game_state.mercenary_path_right,
-            game_state.mercenary_path_up
-        ]
-        # Assumes no overlapping paths. If merc is on any path tile in path, we are on that path
-        for path in possible_paths:
-            if path == None: #<- in case there aren't 4 paths, it will skip iterating over a none value (which cases an error)
-                continue 
-            if (self.x, self.y) in path:
-                self.current_path = path
-                
     # Helper function do find what path this merc is on. 
     def get_current_path(self):
         # return current path and position along current path
-        return (self.current_path, self.current_path.index((self.x, self.y)))
+        return (self.current_path, self.lane_pos)
     
     # Helper function that returns coordinates of the path tile forward or back from the merc's pos
     def get_adjacent_path_tile(self, game_state: GameState, delta: int):
-        path_data = self.get_current_path()
-        path = path_data[0]
-        path_pos = path_data[1]
+        return self.current_path[self.get_adjacent_path_pos(delta)]
 
+    # Helper function that returns the lane position forward or back from the merc's pos
+    def get_adjacent_path_pos(self, delta: int) -> int:
         # if we are at the end of path, return last tile 
         # otherwise, return next tiles
         delta *= 1 if self.target_team == 'b' else -1
-        return path[Utils.clamp(path_pos + delta, 0, len(path)-1)]
+        return Utils.clamp(self.lane_pos + delta, 0, len(self.current_path)-1)
+
+    # Step to the path tile `delta` tiles forward along our lane
+    def move_along_path(self, delta: int):
+        self.lane_pos = self.get_adjacent_path_pos(delta)
+        self.x, self.y = self.current_path[self.lane_pos]
     
     def block_entity_behind(self, game_state: GameState):
         behind_pos = self.get_adjacent_path_tile(game_state, -1)
@@ -57,6 +51,7 @@ class Demon:
             return
         else:
             if isinstance(behind_entity, Demon) and behind_entity.target_team == self.target_team:
+                if game_state.journal is not None: game_state.journal.attr(behind_entity, 'state')
                 behind_entity.state = 'fighting'
                 behind_entity.block_entity_behind(game_state)
             # No need to block mercenaries in this phase, since Demons and mercs don't move in tandem
@@ -64,10 +59,10 @@ class Demon:
     # If in range to attack a player base, return a reference to that player base,
     # Otherwise, return None
     def get_attackable_player_base(self, game_state: GameState) -> PlayerBase:
-        if (self.current_path.index((self.x,self.y)) == len(self.current_path) - 2
+        if (self.lane_pos == len(self.current_path) - 2
             and self.target_team == 'b'):
             return game_state.player_base_b
-        elif (self.current_path.index((self.x,self.y)) == 1
+        elif (self.lane_pos == 1
               and self.target_team == 'r'):
             return game_state.player_base_r
         else:
@@ -0,0 +1,198 @@
+import numpy as np
+from GameState import GameState
+from Mercenary import Mercenary
+from Demon import Demon
+
+# Struct-of-arrays mirror of the mercenaries and demons in a GameState, used by the numpy engine.
+# The Mercenary/Demon objects stay the public view of the game (JSON, agents, envs); the store is
+# the working set that the array world update reads and writes, then copies back onto the objects.
+
+KIND_MERC = 0
+KIND_DEMON = 1
+
+STATE_MOVING = 0
+STATE_FIGHTING = 1
+STATE_WAITING = 2
+STATE_DEAD = 3
+STATE_NAMES = ('moving', 'fighting', 'waiting', 'dead')
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+
+TEAM_R = 0
+TEAM_B = 1
+
+# Object attributes that push() writes back
+PUSHED_ATTRIBUTES = ('x', 'y', 'lane_pos', 'health', 'attack_pow', 'state')
+
+
+class EntityStore:
+    def __init__(self, game_state: GameState) -> None:
+        height = len(game_state.floor_tiles)
+        width = len(game_state.floor_tiles[0])
+
+        # Lane tables: lane_x[lane, pos], lane_y[lane, pos] are the coordinates of a lane position
+        max_len = max([len(path) for path in game_state.lanes], default=1)
+        self.lane_len = np.array([len(path) for path in game_state.lanes], dtype=np.int64)
+        self.lane_x = np.zeros((max(len(game_state.lanes), 1), max_len), dtype=np.int64)
+        self.lane_y = np.zeros((max(len(game_state.lanes), 1), max_len), dtype=np.int64)
+        for lane, path in enumerate(game_state.lanes):
+            for pos, (x, y) in enumerate(path):
+                self.lane_x[lane, pos] = x
+                self.lane_y[lane, pos] = y
+
+        # Int id grid of the units on the map, -1 where there is no mercenary or demon.
+        # Towers never stand on path tiles, so they are not part of this grid.
+        self.id_grid = np.full((height, width), -1, dtype=np.int64)
+
+        # Row -> object, and id(object) -> row. The objects list keeps every registered object alive,
+        # so an id() in row_of can never be reused by a different object while its row exists.
+        self.objects = []
+        self.row_of = {}
+
+        # id(tower) -> (tower, (xs, ys)) of the path tiles in its range, filled by the array world update
+        self.tower_tiles = {}
+
+        self.size = 0
+        self.kind = np.zeros(0, dtype=np.int64)
+        self.team = np.zeros(0, dtype=np.int64)      # mercenary team, or the team a demon targets
+        self.dir = np.zeros(0, dtype=np.int64)       # +1 when walking towards the blue base, -1 towards red
+        self.lane = np.zeros(0, dtype=np.int64)
+        self.pos = np.zeros(0, dtype=np.int64)
+        self.x = np.zeros(0, dtype=np.int64)
+        self.y = np.zeros(0, dtype=np.int64)
+        self.health = np.zeros(0, dtype=np.int64)
+        self.attack_pow = np.zeros(0, dtype=np.int64)
+        self.state = np.zeros(0, dtype=np.int64)
+        self.listed = np.zeros(0, dtype=bool)        # present in game_state.mercs / game_state.demons
+
+        # Demons wiped by provoking are marked dead but stay on the entity grid, pick them up too
+        listed_ids = set(id(ent) for ent in game_state.mercs + game_state.demons)
+        ghosts = []
+        for row in game_state.entity_grid:
+            for ent in row:
+                if isinstance(ent, (Mercenary, Demon)) and id(ent) not in listed_ids:
+                    ghosts.append(ent)
+        self.register(game_state.mercs + game_state.demons + ghosts)
+        self.pull(game_state)
+
+    # Append rows for objects the store has not seen yet (newly spawned units)
+    def register(self, objs: list) -> None:
+        new_objs = [obj for obj in objs if id(obj) not in self.row_of]
+        if len(new_objs) == 0: return
+
+        for obj in new_objs:
+            self.row_of[id(obj)] = len(self.objects)
+            self.objects.append(obj)
+
+        kind = [KIND_MERC if isinstance(obj, Mercenary) else KIND_DEMON for obj in new_objs]
+        team = [
+            (obj.team if isinstance(obj, Mercenary) else obj.target_team)
+            for obj in new_objs
+        ]
+        team = [TEAM_R if t == 'r' else TEAM_B for t in team]
+        xs = np.array([obj.x for obj in new_objs], dtype=np.int64)
+        ys = np.array([obj.y for obj in new_objs], dtype=np.int64)
+        kind = np.array(kind, dtype=np.int64)
+        team = np.array(team, dtype=np.int64)
+        heading_b = np.where(kind == KIND_MERC, team == TEAM_R, team == TEAM_B)
+
+        self.kind = np.concatenate([self.kind, kind])
+        self.team = np.concatenate([self.team, team])
+        self.dir = np.concatenate([self.dir, np.where(heading_b, 1, -1)])
+        self.lane = np.concatenate([self.lane, [obj.lane for obj in new_objs]]).astype(np.int64)
+        self.pos = np.concatenate([self.pos, [obj.lane_pos for obj in new_objs]]).astype(np.int64)
+        self.x = np.concatenate([self.x, xs])
+        self.y = np.concatenate([self.y, ys])
+        self.health = np.concatenate([self.health, [obj.health for obj in new_objs]]).astype(np.int64)
+        self.attack_pow = np.concatenate([self.attack_pow, [obj.attack_pow for obj in new_objs]]).astype(np.int64)
+        self.state = np.concatenate([self.state, [STATE_CODES[obj.state] for obj in new_objs]]).astype(np.int64)
+        self.listed = np.concatenate([self.listed, np.ones(len(new_objs), dtype=bool)])
+
+        new_rows = np.arange(self.size, self.size + len(new_objs))
+        self.id_grid[ys, xs] = new_rows
+        self.size += len(new_objs)
+
+    # Refresh the store from the objects at the start of a world update.
+    # Outside of the world update only the provoke phase touches units (it marks demons dead).
+    def pull(self, game_state: GameState) -> None:
+        listed_objs = game_state.mercs + game_state.demons
+        self.register(listed_objs)
+        rows = np.array([self.row_of[id(obj)] for obj in listed_objs], dtype=np.int64)
+
+        self.listed[:] = False
+        self.listed[rows] = True
+        self.health[rows] = [obj.health for obj in listed_objs]
+        self.attack_pow[rows] = [obj.attack_pow for obj in listed_objs]
+        self.state[rows] = [STATE_CODES[obj.state] for obj in listed_objs]
+
+        self.compact()
+
+    # True for rows that occupy a tile of the id grid
+    def on_grid(self) -> np.ndarray:
+        on_grid = np.zeros(self.size, dtype=bool)
+        on_grid[self.id_grid[self.id_grid >= 0]] = True
+        return on_grid
+
+    # Drop rows that are neither listed nor still standing on the grid
+    def compact(self) -> None:
+        keep = self.listed | self.on_grid()
+        if keep.all(): return
+
+        for row in np.flatnonzero(~keep).tolist():
+            del self.row_of[id(self.objects[row])]
+        keep_rows = np.flatnonzero(keep)
+        remap = np.full(self.size + 1, -1, dtype=np.int64)  # last slot maps the empty marker -1 to -1
+        remap[keep_rows] = np.arange(len(keep_rows))
+
+        self.objects = [self.objects[row] for row in keep_rows.tolist()]
+        for row, obj in enumerate(self.objects):
+            self.row_of[id(obj)] = row
+        for name in ('kind', 'team', 'dir', 'lane', 'pos', 'x', 'y', 'health', 'attack_pow', 'state', 'listed'):
+            setattr(self, name, getattr(self, name)[keep_rows])
+        self.id_grid = remap[self.id_grid]
+        self.size = len(keep_rows)
+
+    # Coordinates and lane position of the tile `delta` steps ahead of each row, clamped to its lane
+    def tiles_ahead(self, rows: np.ndarray, delta: int):
+        lane = self.lane[rows]
+        pos = np.clip(self.pos[rows] + self.dir[rows] * delta, 0, self.lane_len[lane] - 1)
+        return self.lane_x[lane, pos], self.lane_y[lane, pos], pos
+
+    # Row id of whatever stands `delta` tiles ahead of each row, -1 if the tile is empty
+    def occupants_ahead(self, rows: np.ndarray, delta: int) -> np.ndarray:
+        xs, ys, _ = self.tiles_ahead(rows, delta)
+        return self.id_grid[ys, xs]
+
+    # True for rows standing next to the base they are walking towards
+    def next_to_enemy_base(self, rows: np.ndarray) -> np.ndarray:
+        pos = self.pos[rows]
+        heading_b = self.dir[rows] == 1
+        return (heading_b & (pos == self.lane_len[self.lane[rows]] - 2)) | (~heading_b & (pos == 1))
+
+    # Copy the store back onto the Mercenary/Demon objects and onto the entity grid.
+    # `grid_before` is the id grid from the last sync, only tiles that differ are rewritten.
+    def push(self, game_state: GameState, grid_before: np.ndarray) -> None:
+        journal = game_state.journal
+        for obj, x, y, pos, health, attack_pow, state in zip(
+            self.objects,
+            self.x.tolist(),
+            self.y.tolist(),
+            self.pos.tolist(),
+            self.health.tolist(),
+            self.attack_pow.tolist(),
+            self.state.tolist()
+        ):
+            if journal is not None: journal.attrs(obj, PUSHED_ATTRIBUTES)
+            obj.x = x
+            obj.y = y
+            obj.lane_pos = pos
+            obj.health = health
+            obj.attack_pow = attack_pow
+            obj.state = STATE_NAMES[state]
+        self.push_grid(game_state, grid_before)
+
+    def push_grid(self, game_state: GameState, grid_before: np.ndarray) -> None:
+        changed_y, changed_x = np.nonzero(self.id_grid != grid_before)
+        journal = game_state.journal
+        for y, x, row in zip(changed_y.tolist(), changed_x.tolist(), self.id_grid[changed_y, changed_x].tolist()):
+            if journal is not None: journal.tile(game_state.entity_grid, x, y)
+            game_state.entity_grid[y][x] = self.objects[row] if row >= 0 else None
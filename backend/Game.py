@@ -1,8 +1,11 @@
+import os
+import copy
 import json
 import subprocess
 from pathlib import Path
-from Utils import log_msg
+import GameLog
 import Constants
+import WireFormat
 
 # GameState and related imports
 from GameState import GameState
@@ -21,6 +24,19 @@ from BuildPhase import build_tower_phase
 from BuyMercenaryPhase import buy_mercenary_phase
 from WorldUpdatePhase import world_update_phase
 from ProvokeDemonsPhase import provoke_demons_phase
+from TurnJournal import TurnJournal
+
+
+# Parsed map files, keyed by path and modification time, so a process playing many games only reads each map once.
+# Games only read their map data, so they can share it.
+map_json_cache = {}
+
+def load_map_json(map_json_file_path: str) -> dict:
+    key = (os.path.abspath(map_json_file_path), os.path.getmtime(map_json_file_path))
+    if key not in map_json_cache:
+        with open(map_json_file_path, 'r') as map_json_file:
+            map_json_cache[key] = json.load(map_json_file)
+    return map_json_cache[key]
 
 
 # Contain the GameState, and run logic for progressing turns
@@ -28,30 +44,122 @@ class Game:
     def __init__(
         self,
         # Path to map JSON file, which has tile locations, base locations, etc
-        map_json_file_path: str
+        map_json_file_path: str,
+        # "python" runs the world update over the entity objects, "numpy" resolves it as array operations
+        engine: str = "python",
+        # Send the floor tiles every turn instead of only in the initial state, for agents written against the old format
+        full_state: bool = False,
+        # Seed for the game's random tiebreakers, the same seed and actions always play out the same way
+        seed: int = None
     ):
 
-        map_json_data = json.load(open(map_json_file_path, 'r'))
-        self.game_state = GameState(map_json_data)
+        map_json_data = load_map_json(map_json_file_path)
+        self.game_state = GameState(map_json_data, seed)
+
+        if engine == "python":
+            self.world_update_phase = world_update_phase
+        elif engine == "numpy":
+            # Imported here so numpy is only needed when this engine is selected
+            from ArrayWorldUpdatePhase import array_world_update_phase
+            self.world_update_phase = array_world_update_phase
+        else:
+            raise Exception(f"Unknown engine: {engine}")
+
+        self.full_state = full_state
+
+        # Per-turn JSON strings and binary messages, cleared whenever the game state changes
+        self.json_cache = {}
+
+        # Journals of the turns played with apply_turn, most recent last
+        self.turn_journals = []
 
     # set from main.py
     team_name_r = ""
     team_name_b = ""
 
+    # Copy of this game that can be played forward without touching the original, see GameState.clone.
+    # For depth-first search, apply_turn / undo_turn on a single game avoids copying at every node.
+    def clone(self) -> 'Game':
+        cloned = copy.copy(self)
+        cloned.game_state = self.game_state.clone()
+        cloned.json_cache = {}
+        cloned.turn_journals = []
+        return cloned
+
     # Perform updates to GameState based on two AI Actions
     def run_turn(self, action_r: AIAction, action_b: AIAction):
         
-        log_msg(f"-- TURN: {Constants.MAX_TURNS - self.game_state.turns_remaining}, REMAINING TURNS: {self.game_state.turns_remaining}, BLUE: ${self.game_state.money_b}, RED: ${self.game_state.money_r} --")
+        GameLog.info(GameLog.TURN, "-- TURN: {}, REMAINING TURNS: {}, BLUE: ${}, RED: ${} --", Constants.MAX_TURNS - self.game_state.turns_remaining, self.game_state.turns_remaining, self.game_state.money_b, self.game_state.money_r)
         buy_mercenary_phase(self.game_state, action_r, action_b)
         build_tower_phase(self.game_state, action_r, action_b)
         provoked_demons = provoke_demons_phase(self.game_state, action_r, action_b)
-        world_update_phase(self.game_state, provoked_demons)
+        self.world_update_phase(self.game_state, provoked_demons)
+        if self.game_state.journal is not None: self.game_state.journal.attr(self.game_state, 'turns_remaining')
         self.game_state.turns_remaining -= 1
-        log_msg("")
+        self.json_cache = {}
+        GameLog.info(GameLog.TURN, "")
+        GameLog.flush()
+
+    # run_turn, recording every write the turn makes so undo_turn can take it back.
+    # Meant for search agents; regular matches use run_turn and don't record anything.
+    def apply_turn(self, action_r: AIAction, action_b: AIAction):
+        journal = TurnJournal(self.game_state)
+        self.turn_journals.append(journal)
+        self.game_state.journal = journal
+        try:
+            self.run_turn(action_r, action_b)
+        finally:
+            self.game_state.journal = None
 
+    # Restore the game state from before the last apply_turn
+    def undo_turn(self):
+        if len(self.turn_journals) == 0:
+            raise Exception("No turn to undo")
+        self.turn_journals.pop().undo()
+        # The numpy engine's store mirrors the unit objects, it is rebuilt from the restored objects on the next update
+        self.game_state.entity_store = None
+        self.json_cache = {}
 
-    # Converts the game state to a json string that'll be usable by the AI's
+
+    # Converts the game state to a json string that'll be usable by the AI's.
+    # The floor tiles never change, so they're only in the initial state unless full_state is set.
+    # The string is built once per turn and reused for both agents and the visualizer.
     def game_state_to_json(self) -> str:
+        return self.cached_json(self.full_state)
+
+    # The complete game state, sent before the first turn
+    def initial_state_to_json(self) -> str:
+        return self.cached_json(True)
+
+    def cached_json(self, include_static: bool) -> str:
+        # team names are set from main.py after the agents answer, so they're part of the key
+        key = (include_static, self.team_name_r, self.team_name_b)
+        if key not in self.json_cache:
+            self.json_cache[key] = json.dumps(self.game_state_to_dict(include_static))
+        return self.json_cache[key]
+
+    # game_state_to_json with its length in front, for agents that asked for the framed_json wire format (see WireFormat.py)
+    def game_state_to_framed_json(self) -> bytes:
+        key = ('framed_json', self.team_name_r, self.team_name_b)
+        if key not in self.json_cache:
+            message = self.game_state_to_json().encode('utf-8')
+            self.json_cache[key] = WireFormat.LENGTH.pack(len(message)) + message
+        return self.json_cache[key]
+
+    # The same state as game_state_to_json in the binary wire format, for agents that asked for it (see WireFormat.py)
+    def game_state_to_binary(self) -> bytes:
+        key = ('binary', self.team_name_r, self.team_name_b)
+        if key not in self.json_cache:
+            self.json_cache[key] = WireFormat.encode(self)
+        return self.json_cache[key]
+
+    # Parts of the game state that never change after the map is loaded
+    def static_state_to_dict(self) -> dict:
+        return {
+            "FloorTiles" : self.game_state.floor_tiles
+        }
+
+    def game_state_to_dict(self, include_static: bool = True) -> dict:
 
         dict_player_base_r : dict = {
             "Team" : self.game_state.player_base_r.team,
@@ -179,7 +287,6 @@ class Game:
             "RedTeamMoney" : self.game_state.money_r,
             "BlueTeamMoney" : self.game_state.money_b,
 
-            "FloorTiles" : self.game_state.floor_tiles,
             "EntityGrid" : list_entity_grid,
             "Towers" : list_towers,
             "Mercenaries" : list_mercenary,
@@ -188,8 +295,9 @@ class Game:
 
             "TowerPricesR" : dict_tower_prices_r,
             "TowerPricesB" : dict_tower_prices_b
-        } 
+        }
 
-        json_string : str = json.dumps(data)
+        if include_static:
+            data.update(self.static_state_to_dict())
 
-        return json_string
\ No newline at end of file
+        return data
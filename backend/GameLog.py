@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import atexit
+import signal
+
+# Level-gated game log. Callers pass the message template and its arguments separately,
+#     GameLog.debug(GameLog.MOVE, "Mercenary {} moved to ({},{})", merc.name, merc.x, merc.y)
+# and the message is only formatted when its category is enabled at that level, so a disabled
+# log line costs a function call and a dict lookup. Lines are collected in a buffer and written out
+# at the end of every turn (Game.run_turn calls flush), when the process exits, and right away for
+# ERROR lines, so a crash or a kill loses at most the current turn.
+#
+# Nothing is logged until configure() turns it on, main.py does that for log.txt.
+# Setting the MEGAMINER_LOGGING environment variable to ON turns everything on for other entry points.
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR', OFF: 'OFF'}
+
+# Categories
+TURN = 'turn'       # turn headers
+MOVE = 'move'       # units walking along their lanes
+COMBAT = 'combat'   # units attacking, dying and hitting bases
+TOWER = 'tower'     # towers shooting, buffing and producing money
+SPAWN = 'spawn'     # mercenaries and demons entering the map
+ACTION = 'action'   # builds, destroys, purchases and provokes, including invalid ones
+AGENT = 'agent'     # agent processes misbehaving
+GAME = 'game'       # victory and engine errors
+CATEGORIES = (TURN, MOVE, COMBAT, TOWER, SPAWN, ACTION, AGENT, GAME)
+
+# category -> lowest level that gets logged
+thresholds = {category: OFF for category in CATEGORIES}
+
+
+class BufferedSink:
+    def __init__(self, stream=None, json_lines: bool = False, max_lines: int = 1000) -> None:
+        # None means whatever sys.stderr is when the buffer is flushed, which main.py points at log.txt
+        self.stream = stream
+        self.json_lines = json_lines
+        self.max_lines = max_lines
+        self.lines = []
+
+    def write(self, level: int, category: str, msg: str) -> None:
+        if self.json_lines:
+            msg = json.dumps({"Level": LEVEL_NAMES[level], "Category": category, "Message": msg})
+        self.lines.append(msg)
+        if level >= ERROR or len(self.lines) >= self.max_lines:
+            self.flush()
+
+    def flush(self) -> None:
+        if len(self.lines) == 0: return
+        stream = self.stream if self.stream is not None else sys.stderr
+        stream.write('\n'.join(self.lines) + '\n')
+        stream.flush()
+        self.lines = []
+
+
+sink = BufferedSink()
+atexit.register(lambda: sink.flush())
+
+
+# Set the lowest level to log, for all categories or only the given ones (the rest are turned off).
+# Pass a stream or json_lines to replace the sink; the old sink is flushed first.
+def configure(level: int = INFO, categories: list = None, stream=None, json_lines: bool = None) -> None:
+    global sink
+    for category in CATEGORIES:
+        thresholds[category] = level if categories is None or category in categories else OFF
+    if stream is not None or json_lines is not None:
+        sink.flush()
+        sink = BufferedSink(
+            stream if stream is not None else sink.stream,
+            json_lines if json_lines is not None else sink.json_lines
+        )
+
+
+def is_enabled(category: str, level: int) -> bool:
+    return thresholds[category] <= level
+
+
+def debug(category: str, msg: str, *args) -> None:
+    if thresholds[category] <= DEBUG:
+        sink.write(DEBUG, category, msg.format(*args) if args else msg)
+
+
+def info(category: str, msg: str, *args) -> None:
+    if thresholds[category] <= INFO:
+        sink.write(INFO, category, msg.format(*args) if args else msg)
+
+
+def warning(category: str, msg: str, *args) -> None:
+    if thresholds[category] <= WARNING:
+        sink.write(WARNING, category, msg.format(*args) if args else msg)
+
+
+def error(category: str, msg: str, *args) -> None:
+    if thresholds[category] <= ERROR:
+        sink.write(ERROR, category, msg.format(*args) if args else msg)
+
+
+def flush() -> None:
+    sink.flush()
+
+
+# atexit doesn't run when the process is killed with SIGTERM, so flush first and then let the signal do
+# what it did before. Signal handlers can only be set from the main thread, so entry points call this.
+def flush_on_sigterm() -> None:
+    previous_handler = signal.getsignal(signal.SIGTERM)
+
+    def handler(signal_number, frame):
+        sink.flush()
+        if callable(previous_handler):
+            previous_handler(signal_number, frame)
+        elif previous_handler != signal.SIG_IGN:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, handler)
+
+
+if os.environ.get("MEGAMINER_LOGGING", "").upper() == "ON":
+    configure(DEBUG)
@@ -1,19 +1,29 @@
 import Constants
 import math
+import random
 from PlayerBase import PlayerBase
 from DemonSpawner import DemonSpawner
+from TowerCoverage import get_tower_coverage
+from NameSelector import NameSelector
 
 class GameState:
     def __init__(
         self,
         map_json_data: dict,
+        # Seed for this game's random tiebreakers, None for a random seed
+        seed: int = None
     ) -> None:
 
         # Initialization which is independent of the map JSON
+        # Every game owns its RNG and name allocator, so games in the same process don't affect each other
+        self.rng = random.Random(seed)
+        self.name_selector = NameSelector()
         self.turns_remaining = Constants.MAX_TURNS
         self.victory = None
         # Human-readable reason why a team won
         self.victory_reason = ""
+        # Set by Game.apply_turn while it plays a turn, every write of the turn is recorded into it (see TurnJournal.py)
+        self.journal = None
         self.money_r = Constants.INITIAL_MONEY
         self.money_b = Constants.INITIAL_MONEY
         self.mercs = []
@@ -65,6 +75,22 @@ class GameState:
         self.mercenary_path_up    = self.compute_mercenary_path((self.player_base_r.x, self.player_base_r.y-1), (self.player_base_r.x, self.player_base_r.y), (self.player_base_b.x, self.player_base_b.y))
         self.mercenary_path_down  = self.compute_mercenary_path((self.player_base_r.x, self.player_base_r.y+1), (self.player_base_r.x, self.player_base_r.y), (self.player_base_b.x, self.player_base_b.y))
 
+        # Lane lookup for mercs and demons: lane id -> path, and path tile -> (lane id, position along the lane).
+        # Assumes no overlapping paths; if there were any, the last lane in this order would win the tile.
+        self.lanes = [path for path in [
+            self.mercenary_path_down,
+            self.mercenary_path_left,
+            self.mercenary_path_right,
+            self.mercenary_path_up
+        ] if path != None]
+        self.tile_lanes = {}
+        for lane_id, path in enumerate(self.lanes):
+            for lane_pos, tile in enumerate(path):
+                self.tile_lanes[tile] = (lane_id, lane_pos)
+
+        # Path tiles in range of every buildable tile, shared by all games on this map
+        self.tower_coverage = get_tower_coverage(self.floor_tiles, self.lanes, self.tile_lanes)
+
 
     def is_out_of_bounds(self, x: int, y: int) -> bool:
         return x < 0 or x >= len(self.floor_tiles[0]) or y < 0 or y >= len(self.floor_tiles)
@@ -109,5 +135,56 @@ class GameState:
         else:
             return None
 
+    # Copy of the game state for lookahead and rollouts, much cheaper than copy.deepcopy.
+    # Map data (floor tiles, paths, lanes, tower coverage) never changes after __init__, so the clone shares it.
+    # The RNG, name allocator, bases, spawners, units and towers are copied, and the entity grid is rebuilt to point at the copies.
+    def clone(self) -> 'GameState':
+        cloned = shallow_copy(self)
+        cloned.journal = None
+
+        # old object id -> its copy, so the grid and the lists end up sharing the same copies
+        copies = {}
+        def copy_entity(ent):
+            if id(ent) not in copies:
+                ent_copy = shallow_copy(ent)
+                # towers append to their targets list, everything else on an entity is replaced, not mutated
+                if hasattr(ent_copy, 'targets'):
+                    ent_copy.targets = list(ent_copy.targets)
+                copies[id(ent)] = ent_copy
+            return copies[id(ent)]
+
+        cloned.rng = random.Random()
+        cloned.rng.setstate(self.rng.getstate())
+        cloned.name_selector = shallow_copy(self.name_selector)
+        cloned.player_base_r = shallow_copy(self.player_base_r)
+        cloned.player_base_b = shallow_copy(self.player_base_b)
+        cloned.demon_spawners = [shallow_copy(spawner) for spawner in self.demon_spawners]
+        cloned.mercs = [copy_entity(merc) for merc in self.mercs]
+        cloned.demons = [copy_entity(demon) for demon in self.demons]
+        cloned.towers = [copy_entity(tower) for tower in self.towers]
+
+        # Most of the grid is empty, so only rows with something in them are walked.
+        # The grid can also hold provoked demons that were already taken out of the demons list.
+        width = len(self.floor_tiles[0])
+        cloned.entity_grid = []
+        for row in self.entity_grid:
+            row = row[:]
+            if row.count(None) != width:
+                for x, ent in enumerate(row):
+                    if ent is not None:
+                        row[x] = copy_entity(ent)
+            cloned.entity_grid.append(row)
+
+        # The numpy engine's store is rebuilt from the objects the next time the clone is updated
+        cloned.entity_store = None
+        return cloned
+
     def is_game_over(self) -> bool:
-        return self.turns_remaining <= 0 or self.victory != None
\ No newline at end of file
+        return self.turns_remaining <= 0 or self.victory != None
+
+
+# copy.copy without the pickling protocol, for plain objects that only have a __dict__
+def shallow_copy(obj):
+    obj_copy = obj.__class__.__new__(obj.__class__)
+    obj_copy.__dict__.update(obj.__dict__)
+    return obj_copy
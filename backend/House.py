@@ -1,8 +1,8 @@
 import Constants
 from Tower import Tower
 from GameState import GameState
-from NameSelector import select_tower_name
-from Utils import log_msg, get_increased_tower_price
+from Utils import get_increased_tower_price
+import GameLog
 
 class House(Tower):
     def __init__(self, x: int, y: int, team_color: str, game_state: GameState):
@@ -16,18 +16,21 @@ class House(Tower):
         )
 
         self.angle = 0
-        self.name = select_tower_name('H', self.team)
+        self.name = game_state.name_selector.select_tower_name('H', self.team)
 
     def get_price(self, game_state: GameState, team_color: str):
         return (game_state.house_price_r if team_color == "r" else game_state.house_price_b)
 
     def increase_price(self, game_state: GameState, team_color: str):
         if team_color == "r":
+            if game_state.journal is not None: game_state.journal.attr(game_state, 'house_price_r')
             game_state.house_price_r = get_increased_tower_price(game_state.house_price_r, Constants.TOWER_PRICE_PERCENT_INCREASE_PER_BUY)
         else:
+            if game_state.journal is not None: game_state.journal.attr(game_state, 'house_price_b')
             game_state.house_price_b = get_increased_tower_price(game_state.house_price_b, Constants.TOWER_PRICE_PERCENT_INCREASE_PER_BUY)
     
     def update(self, game_state):
+        if game_state.journal is not None: game_state.journal.tower(self)
         if self.current_cooldown > 0:
             self.current_cooldown -= 1
         else:
@@ -35,9 +38,11 @@ class House(Tower):
     
     def tower_activation(self, game_state : GameState):
         if self.team == "r":
+            if game_state.journal is not None: game_state.journal.attr(game_state, 'money_r')
             game_state.money_r += Constants.HOUSE_MONEY_PRODUCED
-            log_msg(f'House {self.name} produced ${Constants.HOUSE_MONEY_PRODUCED} for the Red team. Total = ${game_state.money_r}')
+            GameLog.debug(GameLog.TOWER, 'House {} produced ${} for the Red team. Total = ${}', self.name, Constants.HOUSE_MONEY_PRODUCED, game_state.money_r)
         elif self.team == "b":
+            if game_state.journal is not None: game_state.journal.attr(game_state, 'money_b')
             game_state.money_b += Constants.HOUSE_MONEY_PRODUCED
-            log_msg(f'House {self.name} produced ${Constants.HOUSE_MONEY_PRODUCED} for the Blue team. Total = ${game_state.money_b}')
+            GameLog.debug(GameLog.TOWER, 'House {} produced ${} for the Blue team. Total = ${}', self.name, Constants.HOUSE_MONEY_PRODUCED, game_state.money_b)
         self.current_cooldown = Constants.HOUSE_MAX_COOLDOWN
\ No newline at end of file
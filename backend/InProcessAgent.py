@@ -0,0 +1,137 @@
+import os
+import time
+import contextlib
+import traceback
+import importlib.util
+import GameLog
+from AIAction import AIAction
+from AgentProcess import AgentProcess, RotatingLogFile
+
+# agent file path -> loaded module, per process
+loaded_agent_modules = {}
+
+
+def load_agent_module(agent_file: str):
+    agent_file = os.path.abspath(agent_file)
+    if agent_file not in loaded_agent_modules:
+        module_name = os.path.splitext(os.path.basename(agent_file))[0]
+        spec = importlib.util.spec_from_file_location(module_name, agent_file)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        loaded_agent_modules[agent_file] = module
+    return loaded_agent_modules[agent_file]
+
+
+# A trusted agent imported into the backend and called directly, instead of run as a sub-process like AgentProcess.
+# Only for agents we wrote ourselves, since it can do anything the backend can.
+# It's called like the driver code in AgentTemplate.py calls it, with the same game state dicts, but built straight
+# from the game instead of going through JSON.
+#
+# What it prints to stdout or stderr goes to stderr_log_path, like an agent process's stderr, so it can't get mixed
+# into the output for the visualizer.
+# It can't be stopped in the middle of a turn, so deadlines are checked once it answers: a late answer is thrown away,
+# and counts as a missed deadline like in AgentProcess. An agent that raises does nothing for the rest of the game.
+class InProcessAgent:
+    def __init__(self, agent_file: str, agent_number: int, stderr_log_path: str = None, stderr_log_max_bytes: int = 1000000) -> None:
+        self.agent_file = agent_file
+        self.agent_number = agent_number
+        self.output_log = RotatingLogFile(stderr_log_path, stderr_log_max_bytes) if stderr_log_path else open(os.devnull, 'w')
+        with self.redirect_output():
+            self.agent_module = load_agent_module(agent_file)
+        self.agent = None
+        self.team_color = None
+        # The state the agent answers next, like the one an agent process was sent last
+        self.state = None
+        self.floor_tiles = None
+
+        self.init_time = None
+        self.think_times = []
+        self.missed_deadlines = 0
+        self.disqualified = False
+
+    def redirect_output(self):
+        stack = contextlib.ExitStack()
+        stack.enter_context(contextlib.redirect_stdout(self.output_log))
+        stack.enter_context(contextlib.redirect_stderr(self.output_log))
+        return stack
+
+    # Call one of the agent's functions. Returns what it returned and how many seconds it took,
+    # or None and the time if it raised, after which the agent does nothing for the rest of the game.
+    def call(self, description: str, function, *args) -> tuple:
+        start_time = time.perf_counter()
+        try:
+            with self.redirect_output():
+                result = function(*args)
+        except Exception as e:
+            with self.redirect_output():
+                traceback.print_exc()
+            GameLog.error(GameLog.AGENT, 'Agent {} raised while {}: {!r}', self.agent_number, description, e)
+            self.agent = None
+            result = None
+        return result, time.perf_counter() - start_time
+
+    # The state dict the driver code would give the agent for this turn
+    def state_dict(self, game) -> dict:
+        state = game.game_state_to_dict(include_static=False)
+        # Same types as json.loads would give, tower targets are tuples in the game
+        for tower in state["Towers"]:
+            tower["Targets"] = [list(target) for target in tower["Targets"]]
+        state["FloorTiles"] = self.floor_tiles
+        return state
+
+    # Same as AgentProcess.send_initial_state, but with the game instead of its JSON
+    def send_initial_state(self, team_line: str, game) -> None:
+        self.team_color = 'r' if team_line == "--YOU ARE RED--" else 'b'
+        # The agent's own copy, so it can't change the game's map
+        self.floor_tiles = list(game.game_state.floor_tiles)
+        self.state = self.state_dict(game)
+
+    def get_team_name(self, team_description: str, timeout: float = None) -> str:
+        self.agent, _ = self.call('starting', self.agent_module.Agent)
+        team_name = None
+        if self.agent:
+            team_name, self.init_time = self.call('initializing', self.agent.initialize_and_set_name, self.state, self.team_color)
+        if timeout is not None and self.init_time is not None and self.init_time > timeout:
+            self.disqualify(f'took longer than {timeout}s to initialize')
+            team_name = None
+        if not team_name:
+            GameLog.error(GameLog.AGENT, 'Agent {} failed to provide team name!', self.agent_number)
+            return f"Agent {self.agent_number} ({team_description}) - ERROR"
+        return str(team_name)
+
+    def send_game_state(self, game) -> None:
+        self.state = self.state_dict(game)
+
+    def get_action(self, timeout: float = None, max_missed_deadlines: int = None) -> AIAction:
+        if self.disqualified or not self.agent:
+            return AIAction('nothing',0,0)
+        agent_action, think_time = self.call(f'playing turn {self.state["CurrentTurn"]}', self.agent.do_turn, self.state)
+        if agent_action is None:
+            return AIAction('nothing',0,0)
+
+        if timeout is not None and think_time > timeout:
+            self.missed_deadlines += 1
+            GameLog.error(GameLog.AGENT, 'Agent {} missed the {}s deadline! Agent {} forfeits their turn!', self.agent_number, timeout, self.agent_number)
+            if max_missed_deadlines is not None and self.missed_deadlines >= max_missed_deadlines:
+                self.disqualify(f'missed {self.missed_deadlines} deadlines')
+            return AIAction('nothing',0,0)
+        self.think_times.append(think_time)
+
+        action = AIAction('nothing',0,0)
+        try:
+            action = AIAction.from_dict(agent_action.to_dict())
+        except Exception as e:
+            GameLog.error(GameLog.AGENT, 'Agent {} produced an invalid action! Agent {} forfeits their turn! Error: {}', self.agent_number, self.agent_number, e)
+        return action
+
+    # The agent does nothing for the rest of the game
+    def disqualify(self, reason: str) -> None:
+        GameLog.error(GameLog.AGENT, 'Agent {} is disqualified, it {}!', self.agent_number, reason)
+        self.disqualified = True
+
+    # Same fields as for an agent process
+    def think_time_stats(self) -> dict:
+        return AgentProcess.think_time_stats(self)
+
+    def terminate(self) -> None:
+        self.output_log.close()
@@ -0,0 +1,282 @@
+import Constants
+import RunMatches
+import os
+import sys
+import json
+import socket
+import argparse
+import threading
+import multiprocessing
+
+# Long-running match server, for orchestration that plays lots of games and shouldn't pay for starting a backend
+# (interpreter, imports, map parsing) for every one of them. Games run on a pool of worker processes that stay up,
+# with maps and agents loaded once per worker, like in RunMatches.py.
+#   python3 MatchServer.py --socket matches.sock     listens on a unix socket, for any number of clients
+#   python3 MatchServer.py --stdio                   serves one client on stdin and stdout
+#
+# Requests are JSON-RPC 2.0, one per line:
+#   {"jsonrpc": "2.0", "id": 1, "method": "play_match", "params": {"Map": "../maps/map1.json", "AgentR": "...", "AgentB": "...", "Seed": 3}}
+# Optional params:
+#   "Engine"                    "python" or "numpy"
+#   "AgentProcesses"            run the agents as processes through their driver code, like RunMatches.py --agent_processes
+#   "MaxGamesPerProcess", "MaxAgentMemoryMB", "Zygote", "SharedMemory"
+#                               the other RunMatches.py --agent_processes options
+#   "StreamTurns"               send every turn's game state while the game runs
+# The result is the same dict RunMatches.py prints for each game. Games run in parallel, so results come back as games finish,
+# not in the order they were asked for. With StreamTurns, the game's states are sent before its result, as notifications:
+#   {"jsonrpc": "2.0", "method": "turn", "params": {"id": 1, "State": <the JSON main.py prints for that turn>}}
+# "ping" answers "pong", and "shutdown" stops the server once the games that were asked for are done.
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# Set in each worker by init_worker. Everything sent to clients from workers goes through it, as
+# (client number, message), so a game's turns are always sent before its result.
+outgoing_messages = None
+
+
+def init_worker(messages: multiprocessing.Queue) -> None:
+    global outgoing_messages
+    outgoing_messages = messages
+    # Agent processes are kept in the worker between games, they're stopped when stop() closes the pool
+    RunMatches.init_worker()
+    # Agents played in the worker print to stdout, which is how the server talks to the client with --stdio
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+
+def response(request_id, result) -> str:
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+
+def error_response(request_id, code: int, message: str) -> str:
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}})
+
+
+# Runs in a worker
+def play_requested_match(client: int, request_id, params: dict) -> None:
+    on_turn = None
+    if params.get("StreamTurns"):
+        id_json = json.dumps(request_id)
+        def on_turn(game) -> None:
+            # The first state includes the floor tiles, like the first one main.py prints
+            state_json = game.initial_state_to_json() if game.game_state.turns_remaining == Constants.MAX_TURNS else game.game_state_to_json()
+            outgoing_messages.put((client, '{"jsonrpc": "2.0", "method": "turn", "params": {"id": ' + id_json + ', "State": ' + state_json + '}}'))
+
+    try:
+        engine = params.get("Engine", "python")
+        if params.get("AgentProcesses"):
+            max_agent_memory_mb = params.get("MaxAgentMemoryMB")
+            result = RunMatches.play_process_match(
+                params["AgentR"], params["AgentB"], params["Map"], params.get("Seed"), engine,
+                params.get("MaxGamesPerProcess"),
+                int(max_agent_memory_mb * 1e6) if max_agent_memory_mb else None,
+                zygote=params.get("Zygote"),
+                shared_memory=bool(params.get("SharedMemory")),
+                on_turn=on_turn
+            )
+        else:
+            result = RunMatches.play_match(params["AgentR"], params["AgentB"], params["Map"], params.get("Seed"), engine, on_turn)
+        message = response(request_id, result)
+    except Exception as e:
+        message = error_response(request_id, INTERNAL_ERROR, f'Game failed: {e!r}')
+    outgoing_messages.put((client, message))
+
+
+# Reason the params of a play_match request are wrong, or an empty string if they're fine
+def validate_match_params(params) -> str:
+    if not isinstance(params, dict):
+        return 'params must be an object'
+    for key in ["Map", "AgentR", "AgentB"]:
+        if not isinstance(params.get(key), str):
+            return f'{key} must be a path'
+        if not os.path.exists(params[key]):
+            return f'File not found: {params[key]}'
+    if params.get("Seed") is not None and not isinstance(params["Seed"], int):
+        return 'Seed must be an integer'
+    if params.get("Engine", "python") not in ["python", "numpy"]:
+        return 'Engine must be "python" or "numpy"'
+    if params.get("Zygote") and not params.get("AgentProcesses"):
+        return 'Zygote only works with AgentProcesses'
+    if params.get("SharedMemory") and not params.get("AgentProcesses"):
+        return 'SharedMemory only works with AgentProcesses'
+    return ''
+
+
+class MatchServer:
+    def __init__(self, processes: int = None) -> None:
+        self.messages = multiprocessing.Queue()
+        self.pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(self.messages,))
+        # client number -> function that sends it a line
+        self.clients = {}
+        self.clients_lock = threading.Lock()
+        self.next_client = 0
+        self.shutting_down = threading.Event()
+        self.sender = threading.Thread(target=self.send_messages)
+        self.sender.start()
+
+    def add_client(self, send_line) -> int:
+        with self.clients_lock:
+            client = self.next_client
+            self.next_client += 1
+            self.clients[client] = send_line
+        return client
+
+    def remove_client(self, client: int) -> None:
+        with self.clients_lock:
+            self.clients.pop(client, None)
+
+    def send(self, client: int, message: str) -> None:
+        with self.clients_lock:
+            send_line = self.clients.get(client)
+        if send_line is None:
+            return
+        try:
+            send_line(message)
+        except OSError:
+            # The client went away, the rest of its games' messages are dropped
+            self.remove_client(client)
+
+    # Runs on its own thread, passing the workers' messages on to their clients until stop puts None
+    def send_messages(self) -> None:
+        for client, message in iter(self.messages.get, None):
+            self.send(client, message)
+
+    # Handle one line from a client
+    def handle_line(self, client: int, line: str) -> None:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            self.send(client, error_response(None, PARSE_ERROR, f'Invalid JSON: {e}'))
+            return
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            self.send(client, error_response(None, INVALID_REQUEST, 'Expected a JSON-RPC request object'))
+            return
+        request_id = request.get("id")
+        method = request["method"]
+        params = request.get("params", {})
+
+        if method == "play_match":
+            err = validate_match_params(params)
+            if err:
+                self.send(client, error_response(request_id, INVALID_PARAMS, err))
+            else:
+                try:
+                    if self.shutting_down.is_set():
+                        raise ValueError('Pool not running')
+                    self.pool.apply_async(play_requested_match, (client, request_id, params))
+                except ValueError:
+                    self.send(client, error_response(request_id, INTERNAL_ERROR, 'The server is shutting down'))
+        elif method == "ping":
+            self.send(client, response(request_id, "pong"))
+        elif method == "shutdown":
+            self.send(client, response(request_id, "shutting down"))
+            self.shutting_down.set()
+        else:
+            self.send(client, error_response(request_id, METHOD_NOT_FOUND, f'Unknown method: {method}'))
+
+    # Wait for the games that were asked for, and send their results
+    def stop(self) -> None:
+        self.shutting_down.set()
+        self.pool.close()
+        self.pool.join()
+        self.messages.put(None)
+        self.sender.join()
+
+    # One client on stdin and stdout, until it sends shutdown or closes stdin
+    def serve_stdio(self) -> None:
+        stdout_lock = threading.Lock()
+        def send_line(message: str) -> None:
+            with stdout_lock:
+                sys.stdout.write(message + "\n")
+                sys.stdout.flush()
+        client = self.add_client(send_line)
+        for line in sys.stdin:
+            if line.strip():
+                self.handle_line(client, line)
+            if self.shutting_down.is_set():
+                break
+        self.stop()
+
+    # Any number of clients on a unix socket, until one of them sends shutdown
+    def serve_socket(self, socket_path: str) -> None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        server.listen()
+        # Wake up now and then to see if a client asked for shutdown
+        server.settimeout(0.5)
+        print(f'Match server listening on {socket_path}', file=sys.stderr, flush=True)
+        try:
+            while not self.shutting_down.is_set():
+                try:
+                    connection, _ = server.accept()
+                except socket.timeout:
+                    continue
+                connection.settimeout(None)
+                threading.Thread(target=self.serve_connection, args=(connection,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            os.unlink(socket_path)
+            self.stop()
+
+    # Runs on its own thread for every client on the socket
+    def serve_connection(self, connection: socket.socket) -> None:
+        connection_lock = threading.Lock()
+        def send_line(message: str) -> None:
+            with connection_lock:
+                connection.sendall((message + "\n").encode('utf-8'))
+        client = self.add_client(send_line)
+        try:
+            with connection.makefile('r', encoding='utf-8') as lines:
+                for line in lines:
+                    if line.strip():
+                        self.handle_line(client, line)
+        except OSError:
+            pass
+        # Games it asked for still finish, their results have nowhere to go
+        self.remove_client(client)
+        connection.close()
+
+
+# Use argparse to parse command line arguments
+def get_command_line_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(
+        description='Match server for ApocaWarlords. Plays games asked for as JSON-RPC requests on a pool of worker processes that stay up between games.',
+        epilog='Example usage: python MatchServer.py --socket matches.sock'
+    )
+    transport = parser.add_mutually_exclusive_group(required=True)
+    transport.add_argument(
+        '--socket',
+        help='Path of the unix socket to listen on'
+    )
+    transport.add_argument(
+        '--stdio',
+        action='store_true',
+        help='Read requests from stdin and write responses to stdout, for one client'
+    )
+    parser.add_argument(
+        '-p',
+        '--processes',
+        type=int,
+        default=None,
+        help='Number of worker processes. Defaults to the number of cores.'
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    cmd_line_args = get_command_line_arguments()
+    match_server = MatchServer(cmd_line_args.processes)
+    if cmd_line_args.stdio:
+        match_server.serve_stdio()
+    else:
+        match_server.serve_socket(cmd_line_args.socket)
@@ -1,9 +1,9 @@
 import Constants
 from PlayerBase import PlayerBase
 from GameState import GameState
-from NameSelector import select_merc_name
 from Demon import Demon
 import Utils
+import GameLog
 
 
 class Mercenary:
@@ -17,40 +17,35 @@ class Mercenary:
         if team_color in ['r','b']:
             self.team = team_color
         else:
-            Utils.log_msg(f"Mercenary team_color must be 'r' or 'b'") # TF2 reference?
+            GameLog.error(GameLog.GAME, "Mercenary team_color must be 'r' or 'b'") # TF2 reference?
             return
         
-        self.name = select_merc_name(self.team)
+        self.name = game_state.name_selector.select_merc_name(self.team)
 
-        self.current_path = []
-        possible_paths = [
-            game_state.mercenary_path_down, 
-            game_state.mercenary_path_left,
-            game_state.mercenary_path_right,
-            game_state.mercenary_path_up
-        ]
-        # Assumes no overlapping paths. If merc is on any path tile in path, we are on that path
-        for path in possible_paths:
-            if path == None: #<- in case there aren't 4 paths, it will skip iterating over a none value (which cases an error)
-                continue 
-            if (self.x, self.y) in path:
-                self.current_path = path
+        # Which lane we are on, and how far along it. Kept up to date whenever we move.
+        self.lane, self.lane_pos = game_state.tile_lanes.get((self.x, self.y), (None, None))
+        self.current_path = game_state.lanes[self.lane] if self.lane != None else []
     
     # Helper function do find what path this merc is on.
     def get_current_path(self):
         # return current path and position along current path
-        return (self.current_path, self.current_path.index((self.x, self.y)))
+        return (self.current_path, self.lane_pos)
     
     # Helper function that returns coordinates of the path tile forward or back from the merc's pos
     def get_adjacent_path_tile(self, game_state: GameState, delta: int):
-        path_data = self.get_current_path()
-        path = path_data[0]
-        path_pos = path_data[1]
+        return self.current_path[self.get_adjacent_path_pos(delta)]
 
+    # Helper function that returns the lane position forward or back from the merc's pos
+    def get_adjacent_path_pos(self, delta: int) -> int:
         # if we are at the end of path, return last tile 
         # otherwise, return next tiles
         delta *= 1 if self.team == 'r' else -1
-        return path[Utils.clamp(path_pos + delta, 0, len(path)-1)]
+        return Utils.clamp(self.lane_pos + delta, 0, len(self.current_path)-1)
+
+    # Step to the path tile `delta` tiles forward along our lane
+    def move_along_path(self, delta: int):
+        self.lane_pos = self.get_adjacent_path_pos(delta)
+        self.x, self.y = self.current_path[self.lane_pos]
     
     def block_entity_behind(self, game_state: GameState):
         behind_pos = self.get_adjacent_path_tile(game_state, -1)
@@ -63,6 +58,7 @@ class Mercenary:
             return
         else:
             if isinstance(behind_entity, Mercenary) and behind_entity.team == self.team:
+                if game_state.journal is not None: game_state.journal.attr(behind_entity, 'state')
                 behind_entity.state = 'waiting'
                 behind_entity.block_entity_behind(game_state)
             # Demons don't move in tandem with mercenaries, so updating them here is unnecessary
@@ -70,10 +66,10 @@ class Mercenary:
     # If in range to attack a player base, return a reference to that player base,
     # Otherwise, return None
     def get_attackable_player_base(self, game_state: GameState) -> PlayerBase:
-        if (self.current_path.index((self.x,self.y)) == len(self.current_path) - 2
+        if (self.lane_pos == len(self.current_path) - 2
             and self.team == 'r'):
             return game_state.player_base_b
-        elif (self.current_path.index((self.x,self.y)) == 1
+        elif (self.lane_pos == 1
               and self.team == 'b'):
             return game_state.player_base_r
         else:
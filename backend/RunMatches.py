@@ -0,0 +1,358 @@
+from Game import Game
+from AIAction import AIAction
+from AgentPool import AgentPool
+from InProcessAgent import load_agent_module
+import Constants
+import WireFormat
+import os
+import sys
+import json
+import random
+import argparse
+import contextlib
+import multiprocessing
+import multiprocessing.util
+
+# Headless batch runner. Agents are imported into worker processes and called directly with
+# game state dicts, instead of being spawned as interpreters that talk JSON over pipes like in main.py.
+# Agents run in the same process as the game, so a hung agent hangs its worker.
+# With agent_processes, agents are run like main.py runs them instead, and kept running between games.
+
+# agent file path -> AgentPool, per worker process
+agent_pools = {}
+
+
+def get_agent_pool(agent_file: str, max_games: int, max_memory_bytes: int, zygote: str = None, shared_memory: bool = False) -> AgentPool:
+    agent_file = os.path.abspath(agent_file)
+    if agent_file not in agent_pools:
+        agent_pools[agent_file] = AgentPool(agent_file, max_games, max_memory_bytes, zygote, shared_memory)
+    return agent_pools[agent_file]
+
+
+# Stop this process's pooled agents, which also removes their shared memory rings
+def close_agent_pools() -> None:
+    for agent_pool in agent_pools.values():
+        agent_pool.close()
+    agent_pools.clear()
+
+
+# Initializer for pools of worker processes, so a worker stops its agents when it exits.
+# Only runs if the pool is closed and joined, a terminated worker is killed before it gets to it.
+def init_worker() -> None:
+    multiprocessing.util.Finalize(None, close_agent_pools, exitpriority=10)
+
+
+def new_result(agent_file_1: str, agent_file_2: str, map_json_file: str, seed: int) -> dict:
+    return {
+        "Map": map_json_file,
+        "Seed": seed,
+        "AgentR": agent_file_1,
+        "AgentB": agent_file_2,
+        "TeamNameR": "",
+        "TeamNameB": "",
+        "Victory": None,
+        "VictoryReason": "",
+        "TurnsPlayed": 0,
+        "HealthR": 0,
+        "HealthB": 0,
+        "Errors": []
+    }
+
+
+def finish_result(result: dict, game: Game, team_names: list) -> dict:
+    result["TeamNameR"], result["TeamNameB"] = team_names
+    result["Victory"] = game.game_state.victory
+    result["VictoryReason"] = game.game_state.victory_reason
+    result["TurnsPlayed"] = Constants.MAX_TURNS - game.game_state.turns_remaining
+    result["HealthR"] = game.game_state.player_base_r.health
+    result["HealthB"] = game.game_state.player_base_b.health
+    return result
+
+
+# Plays one game and returns a dict describing the result. Agent 1 plays red and agent 2 plays blue.
+# An agent that raises is treated like an agent process that died in main.py: it does nothing for the rest of the game.
+# on_turn, if given, is called with the game before the first turn and after every turn.
+def play_match(agent_file_1: str, agent_file_2: str, map_json_file: str, seed: int, engine: str = "python", on_turn = None) -> dict:
+    result = new_result(agent_file_1, agent_file_2, map_json_file, seed)
+
+    # The game log is off unless MEGAMINER_LOGGING is set, this drops whatever the agents print to stderr
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+        # The game has its own RNG, the global one is seeded for the agents
+        random.seed(seed)
+        game = Game(map_json_file, engine=engine, seed=seed)
+
+        agents = [None, None]
+        team_names = ["", ""]
+        for i, (agent_file, team_color) in enumerate([(agent_file_1, 'r'), (agent_file_2, 'b')]):
+            try:
+                agents[i] = load_agent_module(agent_file).Agent()
+                team_names[i] = str(agents[i].initialize_and_set_name(game.game_state_to_dict(), team_color))
+            except Exception as e:
+                result["Errors"].append(f'Agent {i + 1} failed to initialize: {e!r}')
+                agents[i] = None
+                team_names[i] = f"Agent {i + 1} - ERROR"
+        game.team_name_r, game.team_name_b = team_names
+        if on_turn:
+            on_turn(game)
+
+        while not game.game_state.is_game_over():
+            actions = [AIAction('nothing', 0, 0), AIAction('nothing', 0, 0)]
+            for i in range(2):
+                if agents[i] is None: continue
+                try:
+                    # Each agent gets its own dict, so neither can see what the other does to it
+                    actions[i] = AIAction.from_dict(agents[i].do_turn(game.game_state_to_dict()).to_dict())
+                except Exception as e:
+                    result["Errors"].append(f'Agent {i + 1} raised on turn {game.game_state_to_dict()["CurrentTurn"]}: {e!r}')
+                    agents[i] = None
+            game.run_turn(actions[0], actions[1])
+            if on_turn:
+                on_turn(game)
+
+    return finish_result(result, game, team_names)
+
+
+# Plays one game like play_match, but with the agents running as processes that are sent the game state
+# like in main.py. Agent processes are reused for later games in this worker if they accept "--NEW GAME--".
+# New agent processes are forked from `zygote` if it's given, see Zygote.py, and offered shared memory with `shared_memory`.
+def play_process_match(
+    agent_file_1: str,
+    agent_file_2: str,
+    map_json_file: str,
+    seed: int,
+    engine: str = "python",
+    max_games_per_process: int = None,
+    max_agent_memory_bytes: int = None,
+    zygote: str = None,
+    shared_memory: bool = False,
+    on_turn = None
+) -> dict:
+    result = new_result(agent_file_1, agent_file_2, map_json_file, seed)
+    game = Game(map_json_file, engine=engine, seed=seed)
+
+    pools = [get_agent_pool(agent_file, max_games_per_process, max_agent_memory_bytes, zygote, shared_memory) for agent_file in [agent_file_1, agent_file_2]]
+    ai_agents = [pools[0].acquire(1), pools[1].acquire(2)]
+
+    initial_state_json = json.dumps({**game.game_state_to_dict(), "WireFormats": WireFormat.FORMATS, "NewGame": True})
+    for ai_agent, team_line in zip(ai_agents, ["--YOU ARE RED--", "--YOU ARE BLUE--"]):
+        try:
+            ai_agent.send_initial_state(team_line, initial_state_json)
+        except Exception as e:
+            result["Errors"].append(f'Agent {ai_agent.agent_number} failed to initialize: {e!r}')
+    team_names = [ai_agents[0].get_team_name("Red"), ai_agents[1].get_team_name("Blue")]
+    game.team_name_r, game.team_name_b = team_names
+    if on_turn:
+        on_turn(game)
+
+    while not game.game_state.is_game_over():
+        if game.game_state.turns_remaining < Constants.MAX_TURNS:
+            for ai_agent in ai_agents:
+                try:
+                    ai_agent.send_game_state(game)
+                except Exception:
+                    # The agent died, get_action finds out
+                    pass
+        game.run_turn(ai_agents[0].get_action(), ai_agents[1].get_action())
+        if on_turn:
+            on_turn(game)
+
+    for pool, ai_agent in zip(pools, ai_agents):
+        if ai_agent.output_closed or ai_agent.process.poll() is not None:
+            result["Errors"].append(f'Agent {ai_agent.agent_number} process exited during the game')
+        pool.release(ai_agent)
+    return finish_result(result, game, team_names)
+
+
+def play_match_from_args(args: tuple) -> dict:
+    play, match_args = args
+    return play(*match_args)
+
+
+# Plays agent 1 (red) against agent 2 (blue) on every map with every seed, across a pool of worker processes.
+# Results are yielded as games finish, so they don't come back in any particular order.
+# With swap_sides, every game is also played with the agents on the other team.
+def run_matches(
+    agent_file_1: str,
+    agent_file_2: str,
+    map_json_files: list,
+    seeds: list,
+    processes: int = None,
+    engine: str = "python",
+    swap_sides: bool = False,
+    agent_processes: bool = False,
+    max_games_per_process: int = None,
+    max_agent_memory_bytes: int = None,
+    zygote: str = None,
+    shared_memory: bool = False
+):
+    sides = [(agent_file_1, agent_file_2)]
+    if swap_sides:
+        sides.append((agent_file_2, agent_file_1))
+
+    matches = []
+    for map_json_file in map_json_files:
+        for seed in seeds:
+            for red, blue in sides:
+                if agent_processes:
+                    matches.append((play_process_match, (red, blue, map_json_file, seed, engine, max_games_per_process, max_agent_memory_bytes, zygote, shared_memory)))
+                else:
+                    matches.append((play_match, (red, blue, map_json_file, seed, engine)))
+
+    # One process doesn't need a pool, and it's easier to debug an agent this way
+    if processes == 1:
+        for match in matches:
+            yield play_match_from_args(match)
+        close_agent_pools()
+        return
+
+    pool = multiprocessing.Pool(processes, initializer=init_worker)
+    try:
+        for result in pool.imap_unordered(play_match_from_args, matches):
+            yield result
+    except BaseException:
+        pool.terminate()
+        raise
+    # Closed and joined instead of terminated, so the workers stop their agents, see init_worker
+    pool.close()
+    pool.join()
+
+
+# Use argparse to parse command line arguments
+def get_command_line_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(
+        description='Headless batch match runner for ApocaWarlords. Prints one JSON result per line as games finish.',
+        epilog='Example usage: python RunMatches.py -a1 ../AI_Agents/ATagent.py -a2 ../AI_Agents/ExampleAgentRuleBased.py -m ../maps/*.json -s 0-99'
+    )
+    parser.add_argument(
+        '-a1',
+        '--ai_agent_file_1',
+        required=True,
+        help='Path to the AI agent 1 python file'
+    )
+    parser.add_argument(
+        '-a2',
+        '--ai_agent_file_2',
+        required=True,
+        help='Path to the AI agent 2 python file'
+    )
+    parser.add_argument(
+        '-m',
+        '--maps',
+        nargs='+',
+        required=True,
+        help='Paths to the map JSON files to play on'
+    )
+    parser.add_argument(
+        '-s',
+        '--seeds',
+        nargs='+',
+        default=['0'],
+        help='Seeds to play with on every map, either single numbers or inclusive ranges like 0-99'
+    )
+    parser.add_argument(
+        '-p',
+        '--processes',
+        type=int,
+        default=None,
+        help='Number of worker processes. Defaults to the number of cores.'
+    )
+    parser.add_argument(
+        '-e',
+        '--engine',
+        choices=['python', 'numpy'],
+        default='python',
+        help='World update engine. "numpy" resolves movement, combat and deaths as array operations.'
+    )
+    parser.add_argument(
+        '--swap_sides',
+        action='store_true',
+        help='Also play every game with agent 1 as blue and agent 2 as red'
+    )
+    parser.add_argument(
+        '--agent_processes',
+        action='store_true',
+        help='Run the agents as processes through their driver code, like main.py. Agents that accept "--NEW GAME--" are kept running between games.'
+    )
+    parser.add_argument(
+        '--max_games_per_process',
+        type=int,
+        default=None,
+        help='With --agent_processes, start a new agent process after this many games'
+    )
+    parser.add_argument(
+        '--max_agent_memory_mb',
+        type=float,
+        default=None,
+        help='With --agent_processes, start a new agent process after a game if the old one uses more memory than this (Linux only)'
+    )
+    parser.add_argument(
+        '--zygote',
+        default=None,
+        help='With --agent_processes, path of the socket of a running Zygote.py to fork new agent processes from'
+    )
+    parser.add_argument(
+        '--shared_memory',
+        action='store_true',
+        help='With --agent_processes, offer the agents a shared memory buffer to be sent the game state through'
+    )
+    return parser.parse_args()
+
+
+# Turns arguments like ["3", "10-12"] into [3, 10, 11, 12]
+def parse_seeds(seed_args: list) -> list:
+    seeds = []
+    for seed_arg in seed_args:
+        if '-' in seed_arg.lstrip('-'):
+            first, last = seed_arg.rsplit('-', 1)
+            seeds.extend(range(int(first), int(last) + 1))
+        else:
+            seeds.append(int(seed_arg))
+    return seeds
+
+
+if __name__ == '__main__':
+    cmd_line_args = get_command_line_arguments()
+
+    for path in [cmd_line_args.ai_agent_file_1, cmd_line_args.ai_agent_file_2] + cmd_line_args.maps:
+        if not os.path.exists(path):
+            print(f'File not found: {path}')
+            exit(1)
+    if cmd_line_args.shared_memory and not cmd_line_args.agent_processes:
+        print('--shared_memory only works with --agent_processes')
+        exit(1)
+    if cmd_line_args.zygote:
+        if not cmd_line_args.agent_processes:
+            print('--zygote only works with --agent_processes')
+            exit(1)
+        if not os.path.exists(cmd_line_args.zygote):
+            print(f'Zygote socket not found: {cmd_line_args.zygote} (start one with Zygote.py)')
+            exit(1)
+
+    # Wins are counted per agent file, since --swap_sides puts each agent on both teams
+    wins = {cmd_line_args.ai_agent_file_1: 0, cmd_line_args.ai_agent_file_2: 0}
+    ties = 0
+    games = 0
+    for result in run_matches(
+        cmd_line_args.ai_agent_file_1,
+        cmd_line_args.ai_agent_file_2,
+        cmd_line_args.maps,
+        parse_seeds(cmd_line_args.seeds),
+        processes=cmd_line_args.processes,
+        engine=cmd_line_args.engine,
+        swap_sides=cmd_line_args.swap_sides,
+        agent_processes=cmd_line_args.agent_processes,
+        max_games_per_process=cmd_line_args.max_games_per_process,
+        max_agent_memory_bytes=int(cmd_line_args.max_agent_memory_mb * 1e6) if cmd_line_args.max_agent_memory_mb else None,
+        zygote=cmd_line_args.zygote,
+        shared_memory=cmd_line_args.shared_memory
+    ):
+        print(json.dumps(result), flush=True)
+        games += 1
+        match result["Victory"]:
+            case 'r':   wins[result["AgentR"]] += 1
+            case 'b':   wins[result["AgentB"]] += 1
+            case 'tie': ties += 1
+
+    summary = ", ".join(f"{agent_file}: {count}" for agent_file, count in wins.items())
+    print(f"--GAMES: {games}, WINS: {summary}, TIES: {ties}, RAN OUT OF TURNS: {games - sum(wins.values()) - ties}--", file=sys.stderr)
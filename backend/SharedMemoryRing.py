@@ -0,0 +1,42 @@
+import os
+import mmap
+import tempfile
+
+# Ring buffer in a memory-mapped file, which an agent on the same machine maps too, so a turn's state can be
+# handed to it without copying it through a pipe (see the shared memory part of WireFormat.py).
+# The file is in /dev/shm where there is one, so it's never written to disk.
+#
+# Each message is written after the last one, and the ring starts over from the beginning when a message
+# doesn't fit before the end. An agent that's a turn behind can still read the message it's on.
+class SharedMemoryRing:
+    DEFAULT_SIZE = 1 << 20
+
+    def __init__(self, size: int = DEFAULT_SIZE) -> None:
+        directory = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        fd, self.path = tempfile.mkstemp(prefix='megaminer-', suffix='.ring', dir=directory)
+        try:
+            os.ftruncate(fd, size)
+            self.mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.size = size
+        self.offset = 0
+
+    # Copy a message into the ring. Returns where it starts, or None if it's bigger than the whole ring.
+    def write(self, message) -> int:
+        if len(message) > self.size:
+            return None
+        if self.offset + len(message) > self.size:
+            self.offset = 0
+        offset = self.offset
+        self.mmap[offset:offset + len(message)] = message
+        self.offset += len(message)
+        return offset
+
+    def close(self) -> None:
+        self.mmap.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            # Windows can't remove it while the agent still has it mapped
+            pass
@@ -1,12 +1,13 @@
 from DemonSpawner import DemonSpawner
 from Demon import Demon
 from GameState import GameState
-from Utils import log_msg
+import GameLog
 import Constants
 
 def spawn_demons(game_state: GameState, provoke_demons: bool):
     for demon_spawner in game_state.demon_spawners:
         spawner : DemonSpawner = demon_spawner
+        if game_state.journal is not None: game_state.journal.attrs(spawner, ('queued', 'reload_time_left', 'activation_count'))
 
         if spawner.reload_time_left <= 0:
             spawner.queued += 1
@@ -28,13 +29,16 @@ def spawn_demons(game_state: GameState, provoke_demons: bool):
                     spawner.activation_count,
                     game_state
                 )
+                if game_state.journal is not None:
+                    game_state.journal.tile(game_state.entity_grid, new_demon.x, new_demon.y)
+                    game_state.journal.extend(game_state.demons)
                 game_state.entity_grid[new_demon.y][new_demon.x] = new_demon
                 game_state.demons.append(new_demon)
 
                 spawner.queued -= 1
                 spawner.activation_count += 1
 
-                log_msg(f"Spawned demon {new_demon.name} at ({new_demon.x},{new_demon.y})")
+                GameLog.info(GameLog.SPAWN, "Spawned demon {} at ({},{})", new_demon.name, new_demon.x, new_demon.y)
 
             else:
-                log_msg(f"Waiting to spawn demon at ({spawner.x},{spawner.y})")
\ No newline at end of file
+                GameLog.debug(GameLog.SPAWN, "Waiting to spawn demon at ({},{})", spawner.x, spawner.y)
\ No newline at end of file
@@ -1,17 +1,24 @@
 from GameState import GameState
 from Mercenary import Mercenary
-from Utils import log_msg
+import GameLog
 
 def spawn_single_mercenary(game_state: GameState, x: int, y: int, team_color: str):
     merc = Mercenary(x, y, team_color, game_state)
+    if game_state.journal is not None:
+        game_state.journal.tile(game_state.entity_grid, x, y)
+        game_state.journal.extend(game_state.mercs)
     game_state.entity_grid[y][x] = merc
     game_state.mercs.append(merc)
 
     team_name = "Red" if team_color == 'r' else "Blue"
-    log_msg(f"{team_name} player spawned mercenary {merc.name} at ({x},{y})")
+    GameLog.info(GameLog.SPAWN, "{} player spawned mercenary {} at ({},{})", team_name, merc.name, x, y)
 
 
 def spawn_mercenaries(game_state: GameState):
+    # Every queue that spawns a mercenary is reset below
+    if game_state.journal is not None:
+        for base in (game_state.player_base_r, game_state.player_base_b):
+            game_state.journal.attrs(base, ('mercenary_queued_up', 'mercenary_queued_down', 'mercenary_queued_left', 'mercenary_queued_right'))
 
     bx = game_state.player_base_r.x
     by = game_state.player_base_r.y
@@ -1,5 +1,3 @@
-import math
-import random
 import Constants
 
 from Entity import Entity
@@ -7,7 +5,7 @@ from Mercenary import Mercenary
 from GameState import GameState
 from PlayerBase import PlayerBase
 from Demon import Demon
-from Utils import log_msg
+import GameLog
 
 class Tower(Entity):
     def __init__(
@@ -39,6 +37,7 @@ class Tower(Entity):
 
     # Called everytime the tower is updated
     def update(self, game_state: GameState):
+        if game_state.journal is not None: game_state.journal.tower(self)
         if self.current_cooldown > 0:
             self.current_cooldown -= 1
             self.targets = []
@@ -53,7 +52,7 @@ class Tower(Entity):
     
 
     def tower_activation(self, game_state: GameState):
-        log_msg("Unimplemented tower_activation function!") # override in subclass
+        GameLog.warning(GameLog.TOWER, "Unimplemented tower_activation function!") # override in subclass
 
     def buff_nearby_targets(self, game_state: GameState):
         buffed_targets = []
@@ -66,13 +65,14 @@ class Tower(Entity):
             if whats_on_path is None: continue
             if (isinstance(whats_on_path, Mercenary) and whats_on_path.state != 'dead' and whats_on_path.team == self.team):
 
+                if game_state.journal is not None: game_state.journal.attrs(whats_on_path, ('health', 'attack_pow'))
                 whats_on_path.health += health_buff
                 whats_on_path.attack_pow += dmg_buff
                 self.targets.append((whats_on_path.x, whats_on_path.y))
                 # self.angle = math.atan2(path[1] - self.y, path[0] - self.x)
 
                 buffed_targets.append((whats_on_path.x, whats_on_path.y))
-                log_msg(f'Tower {self.name} buffed {whats_on_path.name} to {whats_on_path.health} health and {whats_on_path.attack_pow} damage')
+                GameLog.debug(GameLog.TOWER, 'Tower {} buffed {} to {} health and {} damage', self.name, whats_on_path.name, whats_on_path.health, whats_on_path.attack_pow)
         
         if len(buffed_targets) != 0:
             self.last_buffed_targets = buffed_targets
@@ -86,19 +86,24 @@ class Tower(Entity):
         behind_pos = target.get_adjacent_path_tile(game_state, -1)
         behind_ent = game_state.entity_grid[behind_pos[1]][behind_pos[0]]
 
+        journal = game_state.journal
+        if journal is not None:
+            for ent in (ahead_ent, behind_ent):
+                if ent is not None: journal.attr(ent, 'health')
+
         if isinstance(ahead_ent, Mercenary) and ahead_ent.team != team:
             ahead_ent.health -= attack_pow
-            log_msg("Hit an enemy merc that was ahead of me, with the cannon AOE")
+            GameLog.debug(GameLog.TOWER, "Hit an enemy merc that was ahead of me, with the cannon AOE")
         if isinstance(behind_ent, Mercenary) and behind_ent.team != team:
             behind_ent.health -= attack_pow
-            log_msg("Hit an enemy merc that was behind me, with the cannon AOE")
+            GameLog.debug(GameLog.TOWER, "Hit an enemy merc that was behind me, with the cannon AOE")
 
         if isinstance(ahead_ent, Demon):
             ahead_ent.health -= attack_pow
-            log_msg("Hit a demon that was ahead of me, with the cannon AOE")
+            GameLog.debug(GameLog.TOWER, "Hit a demon that was ahead of me, with the cannon AOE")
         if isinstance(behind_ent, Demon):
             behind_ent.health -= attack_pow
-            log_msg("Hit a demon that was behind me, with the cannon AOE")
+            GameLog.debug(GameLog.TOWER, "Hit a demon that was behind me, with the cannon AOE")
 
     def shoot_single_priority_target(self, game_state: GameState, do_splash_damage=False):
         potential_targets = []
@@ -115,19 +120,21 @@ class Tower(Entity):
                     potential_targets.append(whats_on_path)
         
         if len(potential_targets) == 0: return
+        if game_state.journal is not None: game_state.journal.rng(game_state.rng)
 
         # Try to select the closest target to the base first
         # If targets are tied by closeness to the base, try to select the target with the most health
         # If targets are tied by health, try to select the target with the highest attack power
         # If still tied, do a random tiebreaker
         potential_targets.sort(key=lambda ent: (
-            -ent.current_path.index((ent.x, ent.y)) if self.team == 'b' else ent.current_path.index((ent.x, ent.y)),
+            -ent.lane_pos if self.team == 'b' else ent.lane_pos,
             -ent.health,
             -ent.attack_pow,
-            random.random()
+            game_state.rng.random()
         ))
 
         target = potential_targets[0]
+        if game_state.journal is not None: game_state.journal.attr(target, 'health')
         target.health -= self.attack_pow
         self.current_cooldown = self.cooldown_max
         self.targets.append((target.x, target.y))
@@ -138,7 +145,7 @@ class Tower(Entity):
             # Check for the surrounding tiles to see if enemy mercs are there, and damage them as well
 
         self.last_hit_targets = [(target.x, target.y)]
-        log_msg(f'Tower {self.name} hit {target.name} for {self.attack_pow} damage')
+        GameLog.debug(GameLog.TOWER, 'Tower {} hit {} for {} damage', self.name, target.name, self.attack_pow)
 
 
     def shoot_all_targets_in_range(self, game_state: GameState):
@@ -152,12 +159,13 @@ class Tower(Entity):
             if ((isinstance(whats_on_path, Mercenary) and whats_on_path.team != self.team) or
                 (isinstance(whats_on_path, Demon) and whats_on_path.target_team == self.team)):
 
+                if game_state.journal is not None: game_state.journal.attr(whats_on_path, 'health')
                 whats_on_path.health -= self.attack_pow
                 self.targets.append((whats_on_path.x, whats_on_path.y))
                 # self.angle = math.atan2(path[1] - self.y, path[0] - self.x)
 
                 hit_targets.append((whats_on_path.x, whats_on_path.y))
-                log_msg(f'Tower {self.name} hit {whats_on_path.name} for {self.attack_pow} damage')
+                GameLog.debug(GameLog.TOWER, 'Tower {} hit {} for {} damage', self.name, whats_on_path.name, self.attack_pow)
             
             self.current_cooldown = self.cooldown_max
         
@@ -165,20 +173,5 @@ class Tower(Entity):
             self.last_hit_targets = hit_targets
 
 
-    def find_all_paths_in_range(self, game_state: GameState) -> list:
-        paths = []
-
-        floor_tiles = game_state.floor_tiles
-
-        for xi in range(self.x - self.tower_range, self.x + self.tower_range):
-            for yi in range(self.y - self.tower_range, self.y + self.tower_range):
-                if xi == self.x and yi == self.y: continue
-                if game_state.is_out_of_bounds(xi,yi): continue
-
-                # This is the circle equation, I like my tower range to be circles
-                if math.sqrt((xi - self.x) * (xi - self.x) + (yi - self.y) * (yi - self.y)) <= self.tower_range:
-                    # We're using the tile grid since we don't need to know the entities to know where a path is
-                    if floor_tiles[yi][xi] == 'O':
-                        paths.append((xi,yi))
-
-        return paths
+    def find_all_paths_in_range(self, game_state: GameState) -> tuple:
+        return game_state.tower_coverage.paths_in_range(self.x, self.y, self.tower_range)
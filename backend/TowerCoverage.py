@@ -0,0 +1,64 @@
+import Constants
+
+# Precomputed tower coverage for a map: for each buildable tile and tower range, the path tiles a tower
+# there can reach. It only depends on the map, so every tower and every game on the same map shares one table.
+
+TOWER_RANGES = (
+    Constants.CANNON_RANGE,
+    Constants.MINIGUN_RANGE,
+    Constants.CROSSBOW_RANGE,
+    Constants.CHURCH_RANGE
+)
+
+# (floor tiles, lanes) -> TowerCoverage
+_coverage_by_map = {}
+
+
+class TowerCoverage:
+    def __init__(self, floor_tiles: list, lanes: list, tile_lanes: dict) -> None:
+        self.floor_tiles = floor_tiles
+        self.lane_count = len(lanes)
+        self.tile_lanes = tile_lanes
+
+        # (x, y, range) -> tuple of path tiles, sorted by lane then position along the lane
+        self.table = {}
+        for y, row in enumerate(floor_tiles):
+            for x, tile in enumerate(row):
+                if tile in ['r', 'b']:
+                    for tower_range in TOWER_RANGES:
+                        self.paths_in_range(x, y, tower_range)
+
+    # Path tiles within tower_range of (x, y). Tables only hold the Constants ranges up front,
+    # anything else is computed on first use and kept.
+    def paths_in_range(self, x: int, y: int, tower_range: int) -> tuple:
+        key = (x, y, tower_range)
+        if key not in self.table:
+            self.table[key] = self.compute_paths_in_range(x, y, tower_range)
+        return self.table[key]
+
+    def compute_paths_in_range(self, x: int, y: int, tower_range: int) -> tuple:
+        paths = []
+        height = len(self.floor_tiles)
+        width = len(self.floor_tiles[0])
+
+        for xi in range(max(x - tower_range, 0), min(x + tower_range, width - 1) + 1):
+            for yi in range(max(y - tower_range, 0), min(y + tower_range, height - 1) + 1):
+                if xi == x and yi == y: continue
+
+                # This is the circle equation, I like my tower range to be circles
+                if (xi - x) * (xi - x) + (yi - y) * (yi - y) <= tower_range * tower_range:
+                    # We're using the tile grid since we don't need to know the entities to know where a path is
+                    if self.floor_tiles[yi][xi] == 'O':
+                        paths.append((xi, yi))
+
+        # Path tiles that aren't on any lane (dead ends) go last
+        paths.sort(key=lambda tile: self.tile_lanes.get(tile, (self.lane_count, 0)))
+        return tuple(paths)
+
+
+# tile_lanes is the path tile -> (lane id, position) map built by GameState
+def get_tower_coverage(floor_tiles: list, lanes: list, tile_lanes: dict) -> TowerCoverage:
+    key = (tuple(floor_tiles), tuple(tuple(path) for path in lanes))
+    if key not in _coverage_by_map:
+        _coverage_by_map[key] = TowerCoverage(floor_tiles, lanes, tile_lanes)
+    return _coverage_by_map[key]
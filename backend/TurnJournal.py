@@ -0,0 +1,85 @@
+from GameState import GameState
+
+# Change journal for one turn, used by Game.apply_turn / Game.undo_turn.
+# While GameState.journal is set, every write a turn makes is recorded right before it happens:
+# the old value of an attribute, the old occupant of an entity grid tile, the old length of a list
+# that gets appended to, or the position of an item that gets removed from a list.
+# Undoing replays the records backwards onto the same objects, so a search can play and take back
+# turns without allocating any new game state. During normal play GameState.journal is None and
+# the write sites skip the recording.
+
+# Record kinds
+SET = 0         # (SET, object, attribute, value before the write)
+TILE = 1        # (TILE, grid row, x, occupant before the write)
+TRUNCATE = 2    # (TRUNCATE, list, length before appending to it)
+INSERT = 3      # (INSERT, list, index, item removed from there)
+RNG = 4         # (RNG, random.Random, state before its first draw of the turn)
+
+# Value of an attribute that did not exist before the write, like a tower's first last_hit_targets
+MISSING = object()
+
+NAME_INDICES = ('index_r', 'index_b', 'index_d', 'index_tr', 'index_tb')
+# Everything a tower's update can write on the tower itself
+TOWER_ATTRIBUTES = ('current_cooldown', 'targets', 'last_hit_targets', 'last_buffed_targets')
+
+
+class TurnJournal:
+    def __init__(self, game_state: GameState) -> None:
+        self.records = []
+        self.rng_recorded = False
+        # Every unit and tower built during the turn draws a name
+        self.attrs(game_state.name_selector, NAME_INDICES)
+
+    # Call before overwriting attribute `name` of obj
+    def attr(self, obj, name: str) -> None:
+        self.records.append((SET, obj, name, obj.__dict__.get(name, MISSING)))
+
+    def attrs(self, obj, names: tuple) -> None:
+        values = obj.__dict__
+        for name in names:
+            self.records.append((SET, obj, name, values.get(name, MISSING)))
+
+    # Call before overwriting entity_grid[y][x]
+    def tile(self, entity_grid: list, x: int, y: int) -> None:
+        row = entity_grid[y]
+        self.records.append((TILE, row, x, row[x]))
+
+    # Call before appending or extending items onto items
+    def extend(self, items: list) -> None:
+        self.records.append((TRUNCATE, items, len(items)))
+
+    # Call before items.remove(item)
+    def remove(self, items: list, item) -> None:
+        self.records.append((INSERT, items, items.index(item), item))
+
+    # Call before drawing tiebreakers from the game's RNG. Saving its state is slow, so it's only done on the first draw.
+    def rng(self, rng) -> None:
+        if not self.rng_recorded:
+            self.records.append((RNG, rng, rng.getstate()))
+            self.rng_recorded = True
+
+    # Call before a tower updates, it can write its cooldown and targets
+    def tower(self, tower) -> None:
+        self.attrs(tower, TOWER_ATTRIBUTES)
+        self.extend(tower.targets)
+
+    # Put every recorded value back, newest first
+    def undo(self) -> None:
+        for record in reversed(self.records):
+            kind = record[0]
+            if kind == SET:
+                _, obj, name, value = record
+                if value is MISSING:
+                    obj.__dict__.pop(name, None)
+                else:
+                    setattr(obj, name, value)
+            elif kind == TILE:
+                record[1][record[2]] = record[3]
+            elif kind == TRUNCATE:
+                del record[1][record[2]:]
+            elif kind == INSERT:
+                record[1].insert(record[2], record[3])
+            else:
+                record[1].setstate(record[2])
+        self.records = []
+        self.rng_recorded = False
@@ -4,7 +4,7 @@ from Demon import Demon
 from PlayerBase import PlayerBase
 from Mercenary import Mercenary
 from Entity import Entity
-from Utils import log_msg
+import GameLog
 import Constants
 
 def update_demons(game_state: GameState):
@@ -26,10 +26,13 @@ def set_all_demon_states(game_state: GameState, demons: List[Demon],
                         moving: List[Demon],
                         fighting: List[Demon]):
     
+    # Every demon that isn't dead gets its state rewritten below
+    journal = game_state.journal
     for demon in demons:
         if demon.state == 'dead':
             continue
         else:
+            if journal is not None: journal.attr(demon, 'state')
             demon.state = 'deciding'
 
     for demon in demons:
@@ -73,20 +76,23 @@ def set_all_demon_states(game_state: GameState, demons: List[Demon],
 
 
 def move_all_demons(game_state: GameState, demons: List[Demon]):
+    journal = game_state.journal
+
     # remove moving demons
     for demon in demons:
+        if journal is not None: journal.tile(game_state.entity_grid, demon.x, demon.y)
         game_state.entity_grid[demon.y][demon.x] = None
 
     # set new position
     for demon in demons:
-        new_pos = demon.get_adjacent_path_tile(game_state, 1)
-        demon.x = new_pos[0]
-        demon.y = new_pos[1]
+        if journal is not None: journal.attrs(demon, ('x', 'y', 'lane_pos'))
+        demon.move_along_path(1)
 
     # add moving demons back
     for demon in demons:
+        if journal is not None: journal.tile(game_state.entity_grid, demon.x, demon.y)
         game_state.entity_grid[demon.y][demon.x] = demon
-        log_msg(f"Demon {demon.name} moved to ({demon.x},{demon.y})")
+        GameLog.debug(GameLog.MOVE, "Demon {} moved to ({},{})", demon.name, demon.x, demon.y)
 
 
 def do_demon_combat_single(game_state: GameState, demon: Demon):
@@ -98,15 +104,18 @@ def do_demon_combat_single(game_state: GameState, demon: Demon):
     # if tile 1 space in front is empty, we are contesting space with enemy 2 spaces in front 
     if target1 != None:
         b4_health = target1.health
+        if game_state.journal is not None: game_state.journal.attr(target1, 'health')
         target1.health -= demon.attack_pow
-        log_msg(f'Demon {demon.name} attacked opponent {target1.name} at ({next_tile1[0]},{next_tile1[1]}). Target health went from {b4_health} to {target1.health}')
+        GameLog.debug(GameLog.COMBAT, 'Demon {} attacked opponent {} at ({},{}). Target health went from {} to {}', demon.name, target1.name, next_tile1[0], next_tile1[1], b4_health, target1.health)
     elif target2 != None:
         b4_health = target2.health
+        if game_state.journal is not None: game_state.journal.attr(target2, 'health')
         target2.health -= demon.attack_pow
-        log_msg(f'Demon {demon.name} attacked opponent {target2.name} at ({next_tile2[0]},{next_tile2[1]}). Target health went from {b4_health} to {target1.health}')
+        GameLog.debug(GameLog.COMBAT, 'Demon {} attacked opponent {} at ({},{}). Target health went from {} to {}', demon.name, target2.name, next_tile2[0], next_tile2[1], b4_health, target2.health)
     else:
         # attack the player base if we have reached the end of the path, and there is nobody else to fight
         attackable_base = demon.get_attackable_player_base(game_state)
         if attackable_base != None:
+            if game_state.journal is not None: game_state.journal.attr(attackable_base, 'health')
             attackable_base.health -= demon.attack_pow
-            log_msg(f'Demon {demon.name} attacked {attackable_base.name} at ({attackable_base.x},{attackable_base.y})')
\ No newline at end of file
+            GameLog.info(GameLog.COMBAT, 'Demon {} attacked {} at ({},{})', demon.name, attackable_base.name, attackable_base.x, attackable_base.y)
\ No newline at end of file
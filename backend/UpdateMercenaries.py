@@ -5,7 +5,7 @@ from Mercenary import Mercenary
 from Demon import Demon
 from PlayerBase import PlayerBase
 from Entity import Entity
-from Utils import log_msg
+import GameLog
 import Constants
 
 def update_mercenaries(game_state: GameState):
@@ -29,10 +29,13 @@ def set_all_merc_states(game_state: GameState, mercs: List[Mercenary],
                         fighting: List[Mercenary],
                         waiting: List[Mercenary]):
     
+    # Every merc that isn't dead gets its state rewritten below
+    journal = game_state.journal
     for merc in mercs:
         if merc.state == 'dead':
             continue
         else:
+            if journal is not None: journal.attr(merc, 'state')
             merc.state = 'deciding'
     
     for merc in mercs:
@@ -82,20 +85,23 @@ def set_all_merc_states(game_state: GameState, mercs: List[Mercenary],
 
 
 def move_all_mercs(game_state: GameState, moving_mercs: List[Mercenary]):
+    journal = game_state.journal
+
     # remove moving mercs
     for merc in moving_mercs:
+        if journal is not None: journal.tile(game_state.entity_grid, merc.x, merc.y)
         game_state.entity_grid[merc.y][merc.x] = None
 
     # set new position
     for merc in moving_mercs:
-        new_pos = merc.get_adjacent_path_tile(game_state, 1)
-        merc.x = new_pos[0]
-        merc.y = new_pos[1]
+        if journal is not None: journal.attrs(merc, ('x', 'y', 'lane_pos'))
+        merc.move_along_path(1)
 
     # add moving mercs back
     for merc in moving_mercs:
+        if journal is not None: journal.tile(game_state.entity_grid, merc.x, merc.y)
         game_state.entity_grid[merc.y][merc.x] = merc
-        log_msg(f"Mercenary {merc.name} moved to ({merc.x},{merc.y})")
+        GameLog.debug(GameLog.MOVE, "Mercenary {} moved to ({},{})", merc.name, merc.x, merc.y)
 
 
 def do_merc_combat_single(game_state: GameState, merc: Mercenary):
@@ -107,15 +113,18 @@ def do_merc_combat_single(game_state: GameState, merc: Mercenary):
     # if tile 1 space in front is empty, we are contesting space with enemy 2 spaces in front 
     if target1 != None:
         b4_health = target1.health
+        if game_state.journal is not None: game_state.journal.attr(target1, 'health')
         target1.health -= merc.attack_pow
-        log_msg(f'Mercenary {merc.name} attacked opponent {target1.name} at ({next_tile1[0]},{next_tile1[1]}). Target health went from {b4_health} to {target1.health}')
+        GameLog.debug(GameLog.COMBAT, 'Mercenary {} attacked opponent {} at ({},{}). Target health went from {} to {}', merc.name, target1.name, next_tile1[0], next_tile1[1], b4_health, target1.health)
     elif target2 != None:
         b4_health = target2.health
+        if game_state.journal is not None: game_state.journal.attr(target2, 'health')
         target2.health -= merc.attack_pow
-        log_msg(f'Mercenary {merc.name} attacked opponent {target2.name} at ({next_tile2[0]},{next_tile2[1]}). Target health went from {b4_health} to {target2.health}')
+        GameLog.debug(GameLog.COMBAT, 'Mercenary {} attacked opponent {} at ({},{}). Target health went from {} to {}', merc.name, target2.name, next_tile2[0], next_tile2[1], b4_health, target2.health)
     else:
         # attack the player base if we have reached the end of the path, and there is nobody else to fight
         attackable_base = merc.get_attackable_player_base(game_state)
         if attackable_base != None:
+            if game_state.journal is not None: game_state.journal.attr(attackable_base, 'health')
             attackable_base.health -= Constants.MERCENARY_ATTACK_POWER
-            log_msg(f'Mercenary {merc.name} attacked {attackable_base.name} at ({attackable_base.x},{attackable_base.y})')
\ No newline at end of file
+            GameLog.info(GameLog.COMBAT, 'Mercenary {} attacked {} at ({},{})', merc.name, attackable_base.name, attackable_base.x, attackable_base.y)
\ No newline at end of file
@@ -0,0 +1,98 @@
+import struct
+import Constants
+from AgentDriver import (
+    FORMATS, FRAMED_FORMATS, LENGTH, OFFSET, IN_PIPE, HEADER, UNIT, TOWER, SPAWNER, GRID,
+    VICTORY, TEAMS, STATES, TOWER_TYPES, decode
+)
+
+from Cannon import Cannon
+from Crossbow import Crossbow
+from Minigun import Minigun
+from House import House
+from Church import Church
+
+# Wire formats the per-turn game state can be sent to agents in, instead of JSON lines ended by "--END OF TURN--":
+#   framed_json     the same JSON, as one message: a uint32 length, then the JSON encoded as utf-8
+#   binary          a compact binary encoding, described below
+# With either, the agent can read each turn with two reads of stdin instead of line by line, and nothing
+# in the state can be mistaken for the end of the message.
+#
+# Negotiation happens in the handshake, so agents that don't know about it keep getting JSON lines:
+#   backend -> agent:  "--YOU ARE RED--", the initial state as JSON (with "WireFormats": FORMATS), "--END INITIAL GAME STATE--"
+#   agent -> backend:  "--WIRE FORMAT: <format>--" on the line before its team name
+# The initial state is always JSON lines, since it's sent before the agent can ask for anything else.
+#
+# In the binary format, every turn's state is sent as one message:
+#   uint32                      length of the rest of the message
+#   HEADER                      turn, bases, money, prices, map size and how many of each record follow
+#   strings                     utf-8, separated by newlines (which names can't contain, they're sent as lines too).
+#                               Red's team name, Blue's team name and the victory reason come first,
+#                               then every name used by the records below
+#   MERC records
+#   DEMON records
+#   TOWER records
+#   uint16 x, y pairs           the targets of every tower, in tower order
+#   SPAWNER records
+#   GRID records                one for every occupied tile of the entity grid
+# Everything is little-endian. The floor tiles are never sent, agents keep them from the initial state.
+# In both framed formats, an empty message (length 0) takes the place of "--NEW GAME--", see AgentProcess.new_game.
+#
+# Shared memory: when the backend offers it, the initial state also has "SharedMemory": the path of a file the agent
+# can map (see SharedMemoryRing.py). An agent using a framed format can answer "--SHARED MEMORY OK--" before its
+# team name. From then on, each turn's message is written to that file, and the pipe only carries
+#   uint32                      length of the message
+#   uint32                      where the message starts in the file, or IN_PIPE if it didn't fit and follows on the pipe
+# so the agent can decode the state straight out of the mapped file.
+#
+# The structs, codes and decode(), which turns a message back into the dict json.loads gives for the JSON state,
+# are in AgentDriver.py, which agents import to read these formats.
+
+TOWER_CLASSES = {House: 0, Crossbow: 1, Cannon: 2, Minigun: 3, Church: 4}
+
+
+# Binary message for the game's current state, length prefix included
+def encode(game) -> bytes:
+    gs = game.game_state
+
+    strings = [game.team_name_r, game.team_name_b, gs.victory_reason]
+    string_indexes = {}
+    def string_index(s: str) -> int:
+        if s not in string_indexes:
+            string_indexes[s] = len(strings)
+            strings.append(s)
+        return string_indexes[s]
+
+    records = []
+    for merc in gs.mercs:
+        records.append(UNIT.pack(string_index(merc.name), TEAMS.index(merc.team), merc.x, merc.y, merc.health, merc.attack_pow, STATES.index(merc.state)))
+    for dem in gs.demons:
+        records.append(UNIT.pack(string_index(dem.name), TEAMS.index(dem.target_team), dem.x, dem.y, dem.health, dem.attack_pow, STATES.index(dem.state)))
+    targets = []
+    for tow in gs.towers:
+        records.append(TOWER.pack(string_index(tow.name), TOWER_CLASSES[type(tow)], TEAMS.index(tow.team), tow.x, tow.y, tow.current_cooldown, len(tow.targets)))
+        for target in tow.targets:
+            targets.extend(target)
+    records.append(struct.pack(f'<{len(targets)}H', *targets))
+    for spawner in gs.demon_spawners:
+        records.append(SPAWNER.pack(spawner.x, spawner.y, TEAMS.index(spawner.target_team), spawner.reload_time_left, spawner.reload_time_max))
+    occupied = 0
+    width = len(gs.entity_grid[0])
+    for y, row in enumerate(gs.entity_grid):
+        if row.count(None) == width: continue
+        for x, ent in enumerate(row):
+            if ent is not None:
+                records.append(GRID.pack(x, y, string_index(ent.name)))
+                occupied += 1
+
+    encoded_strings = '\n'.join(strings).encode('utf-8')
+    header = HEADER.pack(
+        VICTORY.index(gs.victory), gs.turns_remaining, Constants.MAX_TURNS - gs.turns_remaining,
+        gs.player_base_r.x, gs.player_base_r.y, gs.player_base_r.health, gs.money_r,
+        gs.player_base_b.x, gs.player_base_b.y, gs.player_base_b.health, gs.money_b,
+        gs.house_price_r, gs.crossbow_price_r, gs.cannon_price_r, gs.minigun_price_r, gs.church_price_r,
+        gs.house_price_b, gs.crossbow_price_b, gs.cannon_price_b, gs.minigun_price_b, gs.church_price_b,
+        width, len(gs.entity_grid),
+        len(encoded_strings), len(gs.mercs), len(gs.demons), len(gs.towers), len(targets) // 2, len(gs.demon_spawners), occupied
+    )
+    body = b''.join([header, encoded_strings] + records)
+    return LENGTH.pack(len(body)) + body
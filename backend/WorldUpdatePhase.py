@@ -10,11 +10,14 @@ from House import House
 from Cannon import Cannon
 from Minigun import Minigun
 from Church import Church
-from Utils import log_msg
+import GameLog
 import Constants
 from Entity import Entity
 
 def world_update_phase(game_state: GameState, provoke_demons: bool):
+    # check_wincon() writes victory_reason and its result goes into victory
+    if game_state.journal is not None: game_state.journal.attrs(game_state, ('mercs', 'demons', 'victory', 'victory_reason'))
+
     # remove dead entities from respective lists
     game_state.mercs = [m for m in game_state.mercs if m.state != "dead"]
     game_state.demons = [d for d in game_state.demons if d.state != "dead"]
@@ -38,11 +41,15 @@ def world_update_phase(game_state: GameState, provoke_demons: bool):
 
 
 def mortal_wound_check(game_state: GameState, entities: List[Entity]):
+    journal = game_state.journal
     for ent in entities:
         if ent.health <= 0 and ent.state != "dead":
+            if journal is not None:
+                journal.tile(game_state.entity_grid, ent.x, ent.y)
+                journal.attr(ent, 'state')
             game_state.entity_grid[ent.y][ent.x] = None
             ent.state = "dead"
-            log_msg(f"{ent.name} has suffered mortal wounds")
+            GameLog.info(GameLog.COMBAT, "{} has suffered mortal wounds", ent.name)
 
 
 def check_wincon(game_state: GameState):
@@ -60,11 +67,11 @@ def check_wincon(game_state: GameState):
         # If one of the players has their base intact while the other is destroyed, they win
         if not (team_b_health <= 0 and team_r_health <= 0):
             if team_b_health <= 0:
-                log_msg("The Blue Player's base has been destroyed. The Red Nation survives!")
+                GameLog.info(GameLog.GAME, "The Blue Player's base has been destroyed. The Red Nation survives!")
                 game_state.victory_reason = "Blue base destroyed!"
                 return 'r'
             elif team_r_health <= 0:
-                log_msg("The Red Player's base has been destroyed. The Blue Nation survives!")
+                GameLog.info(GameLog.GAME, "The Red Player's base has been destroyed. The Blue Nation survives!")
                 game_state.victory_reason = "Red base destroyed!"
                 return 'b'
     else:
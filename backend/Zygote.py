@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import runpy
+import select
+import signal
+import socket
+import struct
+import argparse
+import importlib
+import traceback
+import subprocess
+
+# Fork server for starting agents without paying for a new interpreter (and its imports) every time.
+# Start it once and leave it running:
+#   python3 Zygote.py --socket zygote.sock --preload numpy torch stable_baselines3
+# then pass --zygote zygote.sock to main.py or RunMatches.py.
+#
+# The zygote imports the preload modules, then waits on a unix socket. For every agent, the backend makes
+# the agent's stdin, stdout and stderr pipes and sends their ends with the agent file (see launch).
+# The zygote forks a supervisor, which forks again and runs the agent file as __main__ in the child,
+# so the agent starts with the preloaded modules already imported. The supervisor sends the agent's pid,
+# waits for it to exit, and sends its return code, which is how ZygoteProcess.poll knows it exited.
+#
+# Only works where there's fork (not on Windows). Agents started this way all share the zygote's hash seed,
+# and start with its random state, which is reseeded in the child for the modules that don't do it themselves.
+
+DEFAULT_SOCKET = 'zygote.sock'
+DEFAULT_PRELOAD = ['numpy', 'torch', 'gymnasium', 'stable_baselines3']
+
+# The agent's pid, then its return code
+STATUS = struct.Struct('<i')
+
+
+# Start agent_file through the zygote listening on socket_path, instead of with subprocess.Popen
+def launch(socket_path: str, agent_file: str) -> 'ZygoteProcess':
+    if not hasattr(socket, 'send_fds'):
+        raise Exception('Starting agents from a zygote needs unix sockets and fork, which this platform doesn\'t have')
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+        stdin_r, stdin_w = os.pipe()
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        request = json.dumps({"AgentFile": os.path.abspath(agent_file), "WorkingDirectory": os.getcwd()})
+        try:
+            socket.send_fds(connection, [request.encode('utf-8')], [stdin_r, stdout_w, stderr_w])
+        finally:
+            # The agent has its own copies now
+            for fd in [stdin_r, stdout_w, stderr_w]:
+                os.close(fd)
+        return ZygoteProcess(connection, stdin_w, stdout_r, stderr_r)
+    except Exception:
+        connection.close()
+        raise
+
+
+# Stands in for the subprocess.Popen of an agent started by the zygote, with the parts of it AgentProcess uses
+class ZygoteProcess:
+    def __init__(self, connection: socket.socket, stdin_fd: int, stdout_fd: int, stderr_fd: int) -> None:
+        self.connection = connection
+        # Same as Popen(text=True, bufsize=1)
+        self.stdin = open(stdin_fd, 'w', buffering=1)
+        self.stdout = open(stdout_fd, 'r')
+        self.stderr = open(stderr_fd, 'r')
+        self.returncode = None
+        status = connection.recv(STATUS.size, socket.MSG_WAITALL)
+        if len(status) < STATUS.size:
+            self.close_pipes()
+            raise Exception('The zygote didn\'t start the agent')
+        self.pid = STATUS.unpack(status)[0]
+
+    def poll(self) -> int:
+        if self.returncode is None:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            if readable:
+                self.read_returncode()
+        return self.returncode
+
+    def wait(self, timeout: float = None) -> int:
+        if self.returncode is None:
+            readable, _, _ = select.select([self.connection], [], [], timeout)
+            if not readable:
+                raise subprocess.TimeoutExpired(self.pid, timeout)
+            self.read_returncode()
+        return self.returncode
+
+    def read_returncode(self) -> None:
+        status = self.connection.recv(STATUS.size, socket.MSG_WAITALL)
+        # The supervisor only closes the connection without a return code if it was killed itself
+        self.returncode = STATUS.unpack(status)[0] if len(status) == STATUS.size else -signal.SIGKILL
+        self.connection.close()
+
+    def close_pipes(self) -> None:
+        for pipe in [self.stdin, self.stdout, self.stderr]:
+            try:
+                pipe.close()
+            except Exception:
+                pass
+
+    def send_signal(self, signal_number: int) -> None:
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, signal_number)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+
+# Import what agents are going to need, then fork off agents for whoever connects to socket_path, until killed
+def serve(socket_path: str, preload: list) -> None:
+    if not hasattr(os, 'fork'):
+        raise Exception('The zygote needs fork, which this platform doesn\'t have')
+    preloaded = []
+    for module_name in preload:
+        try:
+            importlib.import_module(module_name)
+            preloaded.append(module_name)
+        except ImportError as e:
+            print(f'Not preloading {module_name}: {e}', flush=True)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    # Supervisors are reaped automatically
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    # Being killed cleans up the socket like Ctrl-C does
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f'Zygote listening on {socket_path}, preloaded: {", ".join(preloaded) or "nothing"}', flush=True)
+
+    try:
+        while True:
+            connection, _ = server.accept()
+            try:
+                request, fds, _, _ = socket.recv_fds(connection, 65536, 3)
+            except OSError:
+                connection.close()
+                continue
+            if len(fds) == 3 and os.fork() == 0:
+                try:
+                    server.close()
+                    supervise(connection, json.loads(request), fds)
+                finally:
+                    os._exit(1)
+            connection.close()
+            for fd in fds:
+                os.close(fd)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        os.unlink(socket_path)
+
+
+# Runs in the process forked for one agent: starts the agent and reports on it. Never returns.
+def supervise(connection: socket.socket, request: dict, fds: list) -> None:
+    # Ctrl-C in the zygote's terminal shouldn't reach the agents
+    os.setsid()
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            connection.close()
+            run_agent(request, fds)
+        finally:
+            os._exit(1)
+    for fd in fds:
+        os.close(fd)
+    try:
+        connection.sendall(STATUS.pack(pid))
+        _, status = os.waitpid(pid, 0)
+        connection.sendall(STATUS.pack(os.waitstatus_to_exitcode(status)))
+    except OSError:
+        # The backend went away
+        pass
+    os._exit(0)
+
+
+# Runs in the agent's process: set it up like `python3 <agent file>` started from the backend, and run it. Never returns.
+def run_agent(request: dict, fds: list) -> None:
+    for target_fd, fd in enumerate(fds):
+        os.dup2(fd, target_fd)
+        os.close(fd)
+    sys.stdin = open(0, 'r', closefd=False)
+    sys.stdout = open(1, 'w', closefd=False)
+    sys.stderr = open(2, 'w', buffering=1, closefd=False)
+
+    returncode = 0
+    try:
+        agent_file = request["AgentFile"]
+        os.chdir(request["WorkingDirectory"])
+        sys.argv = [agent_file]
+        sys.path[0] = os.path.dirname(agent_file)
+
+        # random reseeds itself after a fork, these don't
+        if 'numpy' in sys.modules:
+            sys.modules['numpy'].random.seed()
+        if 'torch' in sys.modules:
+            sys.modules['torch'].seed()
+
+        runpy.run_path(agent_file, run_name='__main__')
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            returncode = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            returncode = 1
+    except BaseException as e:
+        # Leave out the zygote's and runpy's frames, so it looks like the traceback of `python3 <agent file>`
+        tb = e.__traceback__
+        while tb and tb.tb_frame.f_code.co_filename != request.get("AgentFile"):
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+        returncode = 1
+    for stream in [sys.stdout, sys.stderr]:
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    os._exit(returncode)
+
+
+# Use argparse to parse command line arguments
+def get_command_line_arguments() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(
+        description='Fork server that starts AI agents with their imports already loaded. Pass its socket to main.py or RunMatches.py with --zygote.',
+        epilog='Example usage: python Zygote.py --socket zygote.sock --preload numpy torch stable_baselines3'
+    )
+    parser.add_argument(
+        '--socket',
+        default=DEFAULT_SOCKET,
+        help=f'Path of the unix socket to listen on. Defaults to {DEFAULT_SOCKET}.'
+    )
+    parser.add_argument(
+        '--preload',
+        nargs='*',
+        default=DEFAULT_PRELOAD,
+        help=f'Modules to import before starting agents. Ones that aren\'t installed are skipped. Defaults to {" ".join(DEFAULT_PRELOAD)}.'
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    cmd_line_args = get_command_line_arguments()
+    serve(cmd_line_args.socket, cmd_line_args.preload)
@@ -1,78 +1,46 @@
 from Game import Game
 from AIAction import AIAction
-from Utils import log_msg
+from AgentProcess import AgentProcess
+from InProcessAgent import InProcessAgent
+import GameLog
 import Constants
+import WireFormat
 import os
+import json
 import argparse
-import subprocess
 import sys
 
 
+# Wait for an agent's action for this turn. Agents that aren't AI processes are "human" input
+# from the visualizer or other parent process.
+def get_agent_action(ai_agent: AgentProcess, agent_number: int) -> AIAction:
+    if ai_agent:
+        return ai_agent.get_action(cmd_line_args.turn_timeout, cmd_line_args.max_missed_deadlines)
+
+    action = AIAction('nothing',0,0)
+    try:
+        action = AIAction.from_json(input())
+    except Exception as e:
+        GameLog.error(GameLog.AGENT, 'Agent {} produced invalid JSON! Agent {} forfeits their turn! Error: {}', agent_number, agent_number, e)
+    return action
+
+
 # Main game loop
-def main_game_loop(ai_agent_1, ai_agent_2, game: Game):
+def main_game_loop(ai_agent_1: AgentProcess, ai_agent_2: AgentProcess, game: Game):
     while not game.game_state.is_game_over():
-        
-        # Get agents' actions
-        agent_1_action_string = ""
-        if ai_agent_1:
-            try:
-                # Send game state to agent
-                if game.game_state.turns_remaining < Constants.MAX_TURNS:
-                    ai_agent_1.stdin.write(game.game_state_to_json() + "\n--END OF TURN--\n")
-                    ai_agent_1.stdin.flush()
-                
-                # Read action from agent
-                agent_1_action_string = ai_agent_1.stdout.readline().strip()
-                
-                # Check if agent died (readline returns empty string if process ended)
-                if not agent_1_action_string:
-                    log_msg('Agent 1 process died or produced no output!')
-                    # Read stderr to see what went wrong
-                    stderr_output = ai_agent_1.stderr.read()
-                    if stderr_output:
-                        log_msg(f'Agent 1 stderr: {stderr_output}')
-            except Exception as e:
-                log_msg(f'Error reading from Agent 1: {e}')
-                agent_1_action_string = ""
-        else:
-            # "Human" input from visualizer or other parent process
-            agent_1_action_string = input()
-        
-        agent_1_action = AIAction('nothing',0,0)
-        try:
-            agent_1_action = AIAction.from_json(agent_1_action_string)
-        except Exception as e:
-            log_msg(f'Agent 1 produced invalid JSON! Agent 1 forfeits their turn! Error: {e}')
 
-        agent_2_action_string = ""
-        if ai_agent_2:
-            try:
-                # Send game state to agent
-                if game.game_state.turns_remaining < Constants.MAX_TURNS:
-                    ai_agent_2.stdin.write(game.game_state_to_json() + "\n--END OF TURN--\n")
-                    ai_agent_2.stdin.flush()
-                
-                # Read action from agent
-                agent_2_action_string = ai_agent_2.stdout.readline().strip()
-                
-                # Check if agent died
-                if not agent_2_action_string:
-                    log_msg('Agent 2 process died or produced no output!')
-                    stderr_output = ai_agent_2.stderr.read()
-                    if stderr_output:
-                        log_msg(f'Agent 2 stderr: {stderr_output}')
-            except Exception as e:
-                log_msg(f'Error reading from Agent 2: {e}')
-                agent_2_action_string = ""
-        else:
-            # "Human" input from visualizer or other parent process
-            agent_2_action_string = input()
-        
-        agent_2_action = AIAction('nothing',0,0)
-        try:
-            agent_2_action = AIAction.from_json(agent_2_action_string)
-        except Exception as e:
-            log_msg(f'Agent 2 produced invalid JSON! Agent 2 forfeits their turn! Error: {e}')
+        # Send the game state to both agents before waiting on either, so they think at the same time
+        if game.game_state.turns_remaining < Constants.MAX_TURNS:
+            for agent_number, ai_agent in [(1, ai_agent_1), (2, ai_agent_2)]:
+                if ai_agent and not ai_agent.disqualified:
+                    try:
+                        ai_agent.send_game_state(game)
+                    except Exception as e:
+                        GameLog.error(GameLog.AGENT, 'Error sending game state to Agent {}: {}', agent_number, e)
+
+        # Get agents' actions
+        agent_1_action = get_agent_action(ai_agent_1, 1)
+        agent_2_action = get_agent_action(ai_agent_2, 2)
 
         # Run the next turn
         game.run_turn(agent_1_action, agent_2_action)
@@ -107,6 +75,19 @@ def get_command_line_arguments() -> argparse.Namespace:
         '--ai_agent_file_2',
         help='Path to the AI agent 2 python file'
     )
+    parser.add_argument(
+        '--agent_1_socket',
+        help='Path of the unix socket of an AI agent 1 that is already running, to play it instead of starting -a1. See AgentSocket.py.'
+    )
+    parser.add_argument(
+        '--agent_2_socket',
+        help='Path of the unix socket of an AI agent 2 that is already running, to play it instead of starting -a2. See AgentSocket.py.'
+    )
+    parser.add_argument(
+        '--listen',
+        action='store_true',
+        help='Listen on the --agent_1_socket and --agent_2_socket paths and wait for the agents to connect, instead of connecting to them. An agent that doesn\'t connect within --init_timeout is disqualified.'
+    )
     parser.add_argument(
         '-h1',
         '--agent_1_is_human',
@@ -119,6 +100,85 @@ def get_command_line_arguments() -> argparse.Namespace:
         action='store_true',
         help='Pass this if agent 2 is a human player...'
     )
+    parser.add_argument(
+        '-e',
+        '--engine',
+        choices=['python', 'numpy'],
+        default='python',
+        help='World update engine. "numpy" resolves movement, combat and deaths as array operations.'
+    )
+    parser.add_argument(
+        '-f',
+        '--full_state',
+        action='store_true',
+        help='Send the floor tiles with every turn\'s game state, for agents that expect the old format.'
+    )
+    parser.add_argument(
+        '-s',
+        '--seed',
+        type=int,
+        default=None,
+        help='Seed for the game\'s random tiebreakers. The same seed and agent actions always give the same game.'
+    )
+    parser.add_argument(
+        '-l',
+        '--log_level',
+        choices=['debug', 'info', 'warning', 'error', 'off'],
+        default='debug',
+        help='Lowest level of message written to log.txt. "debug" includes every move, attack and tower shot.'
+    )
+    parser.add_argument(
+        '--log_categories',
+        nargs='+',
+        choices=GameLog.CATEGORIES,
+        default=None,
+        help='Only log these categories. Logs all of them by default.'
+    )
+    parser.add_argument(
+        '--log_json',
+        action='store_true',
+        help='Write log.txt as one JSON object per line, with the level and category of each message.'
+    )
+    parser.add_argument(
+        '--turn_timeout',
+        type=float,
+        default=None,
+        help='Seconds an agent has to answer each turn before it forfeits the turn. No limit by default.'
+    )
+    parser.add_argument(
+        '--init_timeout',
+        type=float,
+        default=None,
+        help='Seconds an agent has to send its team name before it is disqualified. No limit by default.'
+    )
+    parser.add_argument(
+        '--max_missed_deadlines',
+        type=int,
+        default=3,
+        help='Number of turn deadlines an agent can miss before it is disqualified and does nothing for the rest of the game.'
+    )
+    parser.add_argument(
+        '--agent_log_max_bytes',
+        type=int,
+        default=1000000,
+        help='What each agent prints to stderr goes to log_agent_1.txt and log_agent_2.txt. Once one is this big, it is moved to log_agent_<n>.txt.1 and started over.'
+    )
+    parser.add_argument(
+        '--shared_memory',
+        action='store_true',
+        help='Offer the AI agents a shared memory buffer to be sent the game state through, instead of the pipe. The driver code in AgentTemplate.py uses it if it can.'
+    )
+    parser.add_argument(
+        '--in_process',
+        '--in-process',
+        action='store_true',
+        help='Import the AI agents and call them directly instead of running them as processes. Only for agents you trust, like the example agents.'
+    )
+    parser.add_argument(
+        '--zygote',
+        default=None,
+        help='Path of the socket of a running Zygote.py. The AI agents are forked from it instead of started as new interpreters, so their imports are already loaded.'
+    )
     parser.add_argument(
         '-v',
         '--visualizer',
@@ -136,19 +196,30 @@ def validate_command_line_arguments(cmd_line_args: argparse.Namespace) -> str:
     if not os.path.exists(cmd_line_args.map_json_file):
         return f'Map file not found: {cmd_line_args.map_json_file}'
     
-    # Agent 1: Must have either AI agent file or be human
-    if not cmd_line_args.agent_1_is_human:
+    # Agent 1: Must have either AI agent file or socket, or be human
+    if not cmd_line_args.agent_1_is_human and not cmd_line_args.agent_1_socket:
         if not cmd_line_args.ai_agent_file_1:
-            return 'Agent 1 must either be human (--agent_1_is_human) or have an AI agent file (-a1)'
+            return 'Agent 1 must either be human (--agent_1_is_human) or have an AI agent file (-a1) or socket (--agent_1_socket)'
         if not os.path.exists(cmd_line_args.ai_agent_file_1):
             return f'AI agent 1 file not found: {cmd_line_args.ai_agent_file_1}'
     
-    # Agent 2: Must have either AI agent file or be human
-    if not cmd_line_args.agent_2_is_human:
+    # Agent 2: Must have either AI agent file or socket, or be human
+    if not cmd_line_args.agent_2_is_human and not cmd_line_args.agent_2_socket:
         if not cmd_line_args.ai_agent_file_2:
-            return 'Agent 2 must either be human (--agent_2_is_human) or have an AI agent file (-a2)'
+            return 'Agent 2 must either be human (--agent_2_is_human) or have an AI agent file (-a2) or socket (--agent_2_socket)'
         if not os.path.exists(cmd_line_args.ai_agent_file_2):
             return f'AI agent 2 file not found: {cmd_line_args.ai_agent_file_2}'
+
+    if cmd_line_args.zygote and cmd_line_args.in_process:
+        return '--zygote and --in_process can\'t be used together'
+    if (cmd_line_args.agent_1_socket or cmd_line_args.agent_2_socket) and cmd_line_args.in_process:
+        return '--agent_1_socket and --agent_2_socket can\'t be used with --in_process'
+    if cmd_line_args.listen and not (cmd_line_args.agent_1_socket or cmd_line_args.agent_2_socket):
+        return '--listen only works with --agent_1_socket or --agent_2_socket'
+    if cmd_line_args.shared_memory and cmd_line_args.in_process:
+        return '--shared_memory and --in_process can\'t be used together'
+    if cmd_line_args.zygote and not os.path.exists(cmd_line_args.zygote):
+        return f'Zygote socket not found: {cmd_line_args.zygote} (start one with Zygote.py)'
     
     return ''
 
@@ -169,18 +240,21 @@ if __name__ == '__main__':
         print(err)
         exit(1)
 
+    GameLog.configure(
+        level = getattr(GameLog, cmd_line_args.log_level.upper()),
+        categories = cmd_line_args.log_categories,
+        json_lines = cmd_line_args.log_json
+    )
+    GameLog.flush_on_sigterm()
+
     # Create AI agents
     ai_agent_1 = None
     if not cmd_line_args.agent_1_is_human:
         try:
-            ai_agent_1 = subprocess.Popen(
-                [sys.executable, cmd_line_args.ai_agent_file_1],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1
-            )
+            if cmd_line_args.in_process:
+                ai_agent_1 = InProcessAgent(cmd_line_args.ai_agent_file_1, 1, 'log_agent_1.txt', cmd_line_args.agent_log_max_bytes)
+            else:
+                ai_agent_1 = AgentProcess(cmd_line_args.ai_agent_file_1, 1, 'log_agent_1.txt', cmd_line_args.agent_log_max_bytes, cmd_line_args.zygote, cmd_line_args.shared_memory, cmd_line_args.agent_1_socket, cmd_line_args.listen, cmd_line_args.init_timeout)
         except Exception as e:
             print(f"Failed to start Agent 1: {e}")
             exit(1)
@@ -188,65 +262,37 @@ if __name__ == '__main__':
     ai_agent_2 = None
     if not cmd_line_args.agent_2_is_human:
         try:
-            ai_agent_2 = subprocess.Popen(
-                [sys.executable, cmd_line_args.ai_agent_file_2],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1
-            )
+            if cmd_line_args.in_process:
+                ai_agent_2 = InProcessAgent(cmd_line_args.ai_agent_file_2, 2, 'log_agent_2.txt', cmd_line_args.agent_log_max_bytes)
+            else:
+                ai_agent_2 = AgentProcess(cmd_line_args.ai_agent_file_2, 2, 'log_agent_2.txt', cmd_line_args.agent_log_max_bytes, cmd_line_args.zygote, cmd_line_args.shared_memory, cmd_line_args.agent_2_socket, cmd_line_args.listen, cmd_line_args.init_timeout)
         except Exception as e:
             print(f"Failed to start Agent 2: {e}")
+            if ai_agent_1:
+                ai_agent_1.terminate()
             exit(1)
 
     # Initialize the game
-    game = Game(map_json_file_path = cmd_line_args.map_json_file)
+    game = Game(map_json_file_path = cmd_line_args.map_json_file, engine = cmd_line_args.engine, full_state = cmd_line_args.full_state, seed = cmd_line_args.seed)
 
-    # Send initial game state to agents, then get team names
-    team_name_r = ""
-    if ai_agent_1:
-        try:
-            ai_agent_1.stdin.write("--YOU ARE RED--\n")
-            ai_agent_1.stdin.write(game.game_state_to_json() + "\n--END INITIAL GAME STATE--\n")
-            ai_agent_1.stdin.flush()
-            team_name_r = ai_agent_1.stdout.readline().strip()
-            if not team_name_r:
-                log_msg('Agent 1 failed to provide team name!')
-                stderr_output = ai_agent_1.stderr.read()
-                if stderr_output:
-                    log_msg(f'Agent 1 stderr: {stderr_output}')
-                team_name_r = "Agent 1 (Red) - ERROR"
-        except Exception as e:
-            log_msg(f'Error initializing Agent 1: {e}')
-            team_name_r = "Agent 1 (Red) - ERROR"
-    else:
-        team_name_r = "Human Player (Red)"
-    
-    team_name_b = ""
-    if ai_agent_2:
-        try:
-            ai_agent_2.stdin.write("--YOU ARE BLUE--\n")
-            ai_agent_2.stdin.write(game.game_state_to_json() + "\n--END INITIAL GAME STATE--\n")
-            ai_agent_2.stdin.flush()
-            team_name_b = ai_agent_2.stdout.readline().strip()
-            if not team_name_b:
-                log_msg('Agent 2 failed to provide team name!')
-                stderr_output = ai_agent_2.stderr.read()
-                if stderr_output:
-                    log_msg(f'Agent 2 stderr: {stderr_output}')
-                team_name_b = "Agent 2 (Blue) - ERROR"
-        except Exception as e:
-            log_msg(f'Error initializing Agent 2: {e}')
-            team_name_b = "Agent 2 (Blue) - ERROR"
-    else:
-        team_name_b = "Human Player (Blue)"
+    # Send initial game state to both agents, then get team names, so the agents initialize at the same time.
+    # The agents' copy also lists the wire formats they can ask for. In-process agents are given the game instead.
+    agent_initial_state = game if cmd_line_args.in_process else json.dumps({**game.game_state_to_dict(), "WireFormats": WireFormat.FORMATS})
+    for agent_number, ai_agent, team_line in [(1, ai_agent_1, "--YOU ARE RED--"), (2, ai_agent_2, "--YOU ARE BLUE--")]:
+        if ai_agent:
+            try:
+                ai_agent.send_initial_state(team_line, agent_initial_state)
+            except Exception as e:
+                GameLog.error(GameLog.AGENT, 'Error initializing Agent {}: {}', agent_number, e)
+
+    team_name_r = ai_agent_1.get_team_name("Red", cmd_line_args.init_timeout) if ai_agent_1 else "Human Player (Red)"
+    team_name_b = ai_agent_2.get_team_name("Blue", cmd_line_args.init_timeout) if ai_agent_2 else "Human Player (Blue)"
 
     # Send initial game state and team names to the visualizer (or other parent process)
     game.team_name_r = team_name_r
     game.team_name_b = team_name_b
     print("--BEGIN INITIAL GAME STATE--")
-    print(game.game_state_to_json())
+    print(game.initial_state_to_json())
     print("--END INITIAL GAME STATE--")
     print(f"--RED TEAM NAME: {team_name_r}--")
     print(f"--BLUE TEAM NAME: {team_name_b}--")
@@ -261,10 +307,13 @@ if __name__ == '__main__':
         case 'tie': print(f"--WINNER: TIE--")
         case _:     print("--RAN OUT OF TURNS--")
 
+    # How long the agents took to answer, after the result so the visualizer doesn't have to read it
+    for agent_number, ai_agent in [(1, ai_agent_1), (2, ai_agent_2)]:
+        if ai_agent:
+            print(f"--AGENT {agent_number} TIMES: {json.dumps(ai_agent.think_time_stats())}--")
+
     # Clean up subprocesses
     if ai_agent_1:
         ai_agent_1.terminate()
-        ai_agent_1.wait()
     if ai_agent_2:
-        ai_agent_2.terminate()
-        ai_agent_2.wait()
\ No newline at end of file
+        ai_agent_2.terminate()
\ No newline at end of file
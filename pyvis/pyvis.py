@@ -105,7 +105,8 @@ class PyQtExample(QWidget):
     def turn(self):
         data = self.rx()
         try:
-            self.board = BoardState( json.loads(data) )
+            # the floor tiles are only sent in the initial game state
+            self.board = BoardState( {'FloorTiles': self.board.floor, **json.loads(data)} )
             self.current_turn.setText(f"{self.board.turn}")
             self.update_field()
             return True